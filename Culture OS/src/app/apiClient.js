@@ -400,17 +400,18 @@ class ThunaiAPIClient {
 
     async getDailyNotifications() {
         try {
-            const today = new Date().toISOString().split('T')[0];
-            const moments = await this.getMomentsForNotification(today);
+            // Served from the API's precomputed daily digest (server timezone decides "today")
+            const response = await this.client.get('/moments/notifications/today');
+            const moments = response.data;
             
             return moments.map(moment => ({
                 id: moment.id,
-                title: moment.title,
-                category: moment.moment_category,
-                celebrant_name: moment.celebrant_name || 'Team member',
-                celebration_date: moment.celebration_date,
-                notification_days: moment.notification_days,
-                greeting_prompt: this.getGreetingPrompt(moment.moment_category, moment.celebrant_name)
+                title: moment.description || `${moment.person_name} - ${moment.moment_type}`,
+                category: moment.category,
+                celebrant_name: moment.celebrant_name || moment.person_name || 'Team member',
+                celebrant_teams_id: moment.celebrant_teams_id,
+                celebration_date: moment.moment_date,
+                greeting_prompt: this.getGreetingPrompt(moment.category, moment.celebrant_name || moment.person_name)
             }));
 
         } catch (error) {
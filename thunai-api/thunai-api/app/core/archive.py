@@ -0,0 +1,125 @@
+"""Cold storage for finished moments and their greetings.
+
+Archived rows live in a sibling SQLite file (`thunai_culture_archive.db` next
+to `thunai_culture.db`, likewise per tenant) with the same columns as the hot
+tables plus `archived_at`. Connections ATTACH it as `archive` only when a read
+actually needs archived rows. Every archival run is recorded in `archive_runs`
+in the hot database; the latest cutoff of a run that moved anything is the
+boundary before which history queries have to look in the archive too. They
+only do so when the rows they ask for can actually be archived.
+"""
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from app.core.cache import cached
+from app.core.database import db_manager
+from app.core.storage import StorageConnection
+from app.core.projection import select_list
+from app.core.counters import Total, bounded_count
+
+ARCHIVE_ALIAS = "archive"
+ARCHIVED_TABLES = ("greetings", "moments")
+# Archive table -> columns history queries look archived rows up by
+ARCHIVE_INDEXES = {"greetings": ("moment_id", "user_id"), "moments": ("moment_date", "person_name")}
+
+
+def archive_db_path(tenant_id: Optional[str] = None) -> str:
+    db_path = Path(db_manager.tenant_db_path(tenant_id or db_manager.current_tenant()))
+    return str(db_path.with_name(f"{db_path.stem}_archive{db_path.suffix}"))
+
+
+def archive_supported() -> bool:
+    # In-memory databases have no file to keep a sibling archive next to
+    return db_manager.dialect == "sqlite" and not db_manager.in_memory
+
+
+async def attach_archive(connection: StorageConnection, create: bool = False) -> bool:
+    """Attach the tenant's archive database to a connection, if there is one"""
+    if connection.dialect != "sqlite" or not archive_supported():
+        return False
+    path = archive_db_path()
+    if not create and not Path(path).exists():
+        return False
+    databases = await connection.fetch_all("PRAGMA database_list")
+    if any(row["name"] == ARCHIVE_ALIAS for row in databases):
+        return True
+    await connection.execute(f"ATTACH DATABASE ? AS {ARCHIVE_ALIAS}", (path,))
+    return True
+
+
+async def _attach_before_transaction(connection: StorageConnection):
+    # SQLite may refuse to ATTACH once a transaction's first write began it, so a
+    # transaction whose reads could reach archived rows gets the archive up front
+    if archive_supported() and await archive_boundary() is not None:
+        await attach_archive(connection)
+
+
+async def table_columns(connection: StorageConnection, table: str, schema: str = "main") -> List[str]:
+    rows = await connection.fetch_all(f"PRAGMA {schema}.table_info({table})")
+    return [row["name"] for row in rows]
+
+
+async def archive_boundary() -> Optional[date]:
+    """Latest archival cutoff: rows dated before it may only exist in the archive.
+
+    Runs that moved nothing leave it where it was (None until rows were archived).
+    """
+    if not archive_supported():
+        return None
+
+    async def load():
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_value("SELECT MAX(cutoff_date) FROM archive_runs WHERE moments_moved > 0")
+
+    boundary = await cached(("archive_runs",), ("archive_boundary",), load)
+    return date.fromisoformat(str(boundary)[:10]) if boundary else None
+
+
+async def fetch_with_archive(connection: StorageConnection, table: str, where: str,
+                             params: List[Any], order_by: str,
+                             limit: Optional[int] = None, skip: int = 0,
+                             fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """SELECT hot and archived rows of `table` matching `where` as one result.
+
+    `order_by` must use bare column names, as it applies to the compound select.
+    """
+    page = " LIMIT ? OFFSET ?" if limit is not None else ""
+    page_params = [limit, skip] if limit is not None else []
+    archived = await table_columns(connection, table, ARCHIVE_ALIAS) if await attach_archive(connection) else []
+    if not archived:
+        return await connection.fetch_all(
+            f"SELECT {select_list(fields)} FROM {table} WHERE {where} ORDER BY {order_by}{page}",
+            [*params, *page_params]
+        )
+    columns = await table_columns(connection, table)
+    if fields:
+        # The compound select can only be ordered by columns it returns
+        order_columns = [part.split()[0] for part in order_by.split(",")]
+        columns = [column for column in dict.fromkeys([*fields, *order_columns]) if column in columns]
+    # Columns added to the hot table since the last archival run read as NULL
+    archived_select = ", ".join(c if c in archived else f"NULL AS {c}" for c in columns)
+    query = (
+        f"SELECT {', '.join(columns)} FROM main.{table} WHERE {where} "
+        f"UNION ALL SELECT {archived_select} FROM {ARCHIVE_ALIAS}.{table} WHERE {where} "
+        f"ORDER BY {order_by}{page}"
+    )
+    return await connection.fetch_all(query, [*params, *params, *page_params])
+
+
+async def has_archived_rows(connection: StorageConnection, table: str, where: str, params: List[Any]) -> bool:
+    """Whether any archived row of `table` matches `where`"""
+    if not await attach_archive(connection) or not await table_columns(connection, table, ARCHIVE_ALIAS):
+        return False
+    query = f"SELECT 1 FROM {ARCHIVE_ALIAS}.{table} WHERE {where} LIMIT 1"
+    return await connection.fetch_value(query, params) is not None
+
+
+async def count_archived_rows(connection: StorageConnection, table: str, where: str,
+                              params: List[Any]) -> Total:
+    """Bounded count of the archived rows of `table` matching `where`"""
+    if not await attach_archive(connection) or not await table_columns(connection, table, ARCHIVE_ALIAS):
+        return Total(0)
+    return await bounded_count(connection, f"SELECT 1 FROM {ARCHIVE_ALIAS}.{table} WHERE {where}", params)
+
+
+db_manager.add_transaction_setup(_attach_before_transaction)
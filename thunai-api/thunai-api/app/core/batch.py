@@ -0,0 +1,166 @@
+"""Executes the sub-requests of a `POST /api/v1/batch` call.
+
+Sub-requests are dispatched straight to the app's router (with its
+exception handlers), not back through the middleware stack: the batch
+itself already passed tenant routing, admission control and idempotency,
+and its response is encoded once as a whole. Sub-requests inherit the
+batch's headers (admin key, tenant) unless they override them.
+
+Consecutive reads run concurrently; every write waits for the reads before
+it and runs alone, so later sub-requests see its effects. In transactional
+mode everything runs in order on one connection and is committed once; the
+first failing sub-request rolls the whole batch back.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from starlette.middleware.exceptions import ExceptionMiddleware
+from starlette.types import ASGIApp, Message, Scope
+from app.core.database import db_manager
+
+API_PREFIX = "/api/v1"
+READ_METHODS = {"GET", "HEAD"}
+# Headers that describe the batch body, not a sub-request's
+_BATCH_ONLY_HEADERS = {b"content-length", b"content-type", b"idempotency-key", b"accept-encoding"}
+
+
+class BatchError(ValueError):
+    pass
+
+
+class _RolledBack(Exception):
+    pass
+
+
+def _dispatcher(app) -> ASGIApp:
+    handlers = {key: handler for key, handler in app.exception_handlers.items() if key not in (500, Exception)}
+    return ExceptionMiddleware(app.router, handlers=handlers)
+
+
+def resolve_path(path: str, batch_path: str) -> Tuple[str, str]:
+    """Absolute API path and query string for a sub-request path"""
+    path, _, query_string = path.partition("?")
+    if not path.startswith("/api/"):
+        path = API_PREFIX + ("" if path.startswith("/") else "/") + path
+    if path.rstrip("/") == batch_path.rstrip("/"):
+        raise BatchError("Batches cannot be nested")
+    return path, query_string
+
+
+class BatchExecutor:
+    """Runs one batch on behalf of the request that carried it"""
+
+    def __init__(self, scope: Scope):
+        self._scope = scope
+        self._app = _dispatcher(scope["app"])
+
+    def _sub_scope(self, method: str, path: str, query_string: str, headers: Dict[str, str],
+                   body: bytes) -> Scope:
+        scope = {key: value for key, value in self._scope.items() if key not in ("route", "endpoint", "path_params")}
+        overrides = {name.lower().encode("latin-1"): value.encode("latin-1") for name, value in headers.items()}
+        merged = [
+            (name, value) for name, value in self._scope.get("headers", [])
+            if name not in _BATCH_ONLY_HEADERS and name not in overrides
+        ]
+        merged.extend(overrides.items())
+        if body:
+            merged.append((b"content-type", b"application/json"))
+            merged.append((b"content-length", str(len(body)).encode("latin-1")))
+        scope.update({
+            "method": method,
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": query_string.encode("latin-1"),
+            "headers": merged,
+        })
+        return scope
+
+    async def _run(self, index: int, sub: Dict[str, Any]) -> Dict[str, Any]:
+        method = sub['method'].upper()
+        path, query_string = resolve_path(sub['path'], self._scope["path"])
+        if sub.get('query'):
+            extra = urlencode(sub['query'], doseq=True)
+            query_string = f"{query_string}&{extra}" if query_string else extra
+        body = json.dumps(sub['body']).encode("utf-8") if sub.get('body') is not None else b""
+        scope = self._sub_scope(method, path, query_string, sub.get('headers') or {}, body)
+
+        sent = False
+
+        async def receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        status_code = 500
+        content_type = ""
+        chunks: List[bytes] = []
+
+        async def send(message: Message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self._app(scope, receive, send)
+        except Exception as e:
+            return self._result(index, sub, 500, {"detail": f"{type(e).__name__}: {e}"})
+        raw = b"".join(chunks)
+        if "json" in content_type:
+            payload = json.loads(raw) if raw else None
+        else:
+            payload = raw.decode("utf-8", errors="replace")
+        return self._result(index, sub, status_code, payload)
+
+    @staticmethod
+    def _result(index: int, sub: Dict[str, Any], status_code: int, body: Any) -> Dict[str, Any]:
+        return {"id": sub.get('id') or str(index), "status": status_code, "body": body}
+
+    async def run(self, requests: List[Dict[str, Any]], transactional: bool = False) -> Dict[str, Any]:
+        for sub in requests:
+            resolve_path(sub['path'], self._scope["path"])
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        if transactional:
+            committed = await self._run_transaction(requests, results)
+        else:
+            await self._run_pipelined(requests, results)
+            committed = None
+        return {"transactional": transactional, "committed": committed, "results": results}
+
+    async def _run_pipelined(self, requests: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]]):
+        reads: List[int] = []
+
+        async def flush_reads():
+            done = await asyncio.gather(*(self._run(index, requests[index]) for index in reads))
+            for index, result in zip(reads, done):
+                results[index] = result
+            reads.clear()
+
+        for index, sub in enumerate(requests):
+            if sub['method'].upper() in READ_METHODS:
+                reads.append(index)
+                continue
+            await flush_reads()
+            results[index] = await self._run(index, sub)
+        await flush_reads()
+
+    async def _run_transaction(self, requests: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]]) -> bool:
+        try:
+            async with db_manager.transaction():
+                for index, sub in enumerate(requests):
+                    results[index] = await self._run(index, sub)
+                    if results[index]['status'] >= 400:
+                        raise _RolledBack()
+            return True
+        except _RolledBack:
+            for index, sub in enumerate(requests):
+                if results[index] is None:
+                    results[index] = self._result(index, sub, 424, {"detail": "Not run: the batch was rolled back"})
+            return False
@@ -0,0 +1,191 @@
+"""Process-local read cache kept coherent across worker processes.
+
+Every cached table carries a write version in `table_versions`, bumped by
+triggers on insert, update and delete. Each worker keeps one extra watcher
+connection per database and polls `PRAGMA data_version`, which only changes
+when another connection has committed. Only then are the table versions
+re-read, so an unchanged database costs a single pragma per check. Cached
+entries remember the versions of the tables they were built from and are
+discarded as soon as any of them moves, whichever process did the write.
+
+Each table also has a rewrite version (`<table>:rewrites`), bumped only by
+updates and deletes, for structures that follow inserts incrementally and
+only have to start over when existing rows change.
+"""
+import asyncio
+import time
+import aiosqlite
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.database import db_manager, TenantScoped
+from app.core.storage import StorageConnection, connect_sqlite
+
+VERSION_TABLE = "table_versions"
+VERSIONED_TABLES = (
+    "users", "moments", "greetings", "accolades", "gossips", "quests", "thoughts",
+    "notification_digest", "archive_runs",
+)
+
+
+def rewrite_version_key(table: str) -> str:
+    """Version key bumped by updates and deletes of `table` only"""
+    return f"{table}:rewrites"
+
+
+async def ensure_version_tracking(connection: StorageConnection):
+    """Create the version table and its triggers for every existing table"""
+    if connection.dialect != "sqlite":
+        return
+    await connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"
+    )
+    rows = await connection.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row["name"] for row in rows}
+    for table in VERSIONED_TABLES:
+        if table not in existing:
+            continue
+        for key in (table, rewrite_version_key(table)):
+            await connection.execute(
+                f"INSERT OR IGNORE INTO {VERSION_TABLE} (table_name, version) VALUES (?, 0)", (key,)
+            )
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            await connection.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN "
+                f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE table_name = '{table}'; "
+                "END"
+            )
+        for event in ("UPDATE", "DELETE"):
+            await connection.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_rewrite_version_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN "
+                f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE table_name = '{rewrite_version_key(table)}'; "
+                "END"
+            )
+    await connection.commit()
+
+
+class TableVersionTracker:
+    """Watches one database file for commits made by any other connection"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.versions: Dict[str, int] = {}
+        self.checks = 0
+        self.refreshes = 0
+        self._connection: Optional[aiosqlite.Connection] = None
+        self._data_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def current_versions(self) -> Dict[str, int]:
+        interval = settings.query_cache_check_interval_ms / 1000
+        if interval and time.monotonic() - self._checked_at < interval:
+            return self.versions
+        async with self._lock:
+            if interval and time.monotonic() - self._checked_at < interval:
+                return self.versions
+            if self._connection is None:
+                self._connection = await connect_sqlite(self.db_path)
+            self.checks += 1
+            cursor = await self._connection.execute("PRAGMA data_version")
+            data_version = (await cursor.fetchone())[0]
+            await cursor.close()
+            if data_version != self._data_version:
+                cursor = await self._connection.execute(f"SELECT table_name, version FROM {VERSION_TABLE}")
+                self.versions = {name: version for name, version in await cursor.fetchall()}
+                await cursor.close()
+                self._data_version = data_version
+                self.refreshes += 1
+            self._checked_at = time.monotonic()
+            return self.versions
+
+    async def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
+
+
+class QueryCache:
+    """LRU of query results tagged with the table versions they were read at"""
+
+    def __init__(self, tenant_id: str):
+        self.tracker = TableVersionTracker(db_manager.tenant_db_path(tenant_id))
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], Any]]" = OrderedDict()
+
+    async def get_or_load(self, tables: Sequence[str], key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        versions = await self.tracker.current_versions()
+        if any(table not in versions for table in tables):
+            # Untracked table: nothing would ever invalidate the entry
+            return await loader()
+        stamp = tuple(versions[table] for table in tables)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = await loader()
+        self._entries[key] = (stamp, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.query_cache_max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "version_checks": self.tracker.checks,
+            "version_refreshes": self.tracker.refreshes,
+            "table_versions": dict(self.tracker.versions),
+        }
+
+
+_caches: TenantScoped[QueryCache] = TenantScoped(QueryCache, release=lambda cache: cache.tracker.close())
+
+
+def cache_enabled() -> bool:
+    # Inside a shared transaction reads may see uncommitted writes the versions don't reflect yet
+    return settings.query_cache_enabled and db_manager.dialect == "sqlite" and not db_manager.in_transaction()
+
+
+async def _tenant_cache() -> QueryCache:
+    # The tracker reads the database on its own connection, so the pool must have initialized it first
+    await db_manager.open_tenant()
+    return _caches.get()
+
+
+async def cached(tables: Sequence[str], key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """Return `loader()`'s result, reusing it until one of `tables` is written"""
+    if not cache_enabled():
+        return await loader()
+    return await (await _tenant_cache()).get_or_load(tables, key, loader)
+
+
+async def current_table_versions() -> Optional[Dict[str, int]]:
+    """Current write versions for the tenant's tables, or None when untracked"""
+    if not cache_enabled():
+        return None
+    return await (await _tenant_cache()).tracker.current_versions()
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {tenant_id: cache.stats() for tenant_id, cache in _caches.items()}
+
+
+async def close_caches():
+    for tenant_id, _ in _caches.items():
+        await _caches.release(tenant_id)
+
+
+db_manager.add_initializer(ensure_version_tracking)
@@ -0,0 +1,96 @@
+"""Single-flight coalescing of identical concurrent service calls.
+
+The first caller of a coalesced method runs it; identical calls that arrive
+while it is in flight (same tenant, method and arguments) await the same
+result instead of opening their own connection and running the same query.
+With `COALESCE_TTL_MS` set, a finished result is also reused for that long.
+Every caller gets its own copy of the shared result, so one caller editing
+what it got back cannot change another's.
+"""
+import asyncio
+import copy
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from app.core.config import settings
+from app.core.database import db_manager
+
+
+class SingleFlight:
+    """Shares one in-flight computation between callers with the same key"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, name: str) -> Dict[str, int]:
+        counters = self._stats.get(name)
+        if counters is None:
+            counters = self._stats[name] = {"calls": 0, "executions": 0, "collapsed": 0, "ttl_hits": 0}
+        return counters
+
+    async def do(self, name: str, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        counters = self._counters(name)
+        counters["calls"] += 1
+        ttl = settings.coalesce_ttl_ms / 1000
+
+        if ttl:
+            recent = self._recent.get(key)
+            if recent is not None:
+                if time.monotonic() < recent[0]:
+                    counters["ttl_hits"] += 1
+                    return copy.deepcopy(recent[1])
+                del self._recent[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            counters["collapsed"] += 1
+        else:
+            counters["executions"] += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key, ttl))
+        # Shielded so one caller going away doesn't cancel the others' result
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _finished(self, key: Hashable, ttl: float, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if ttl and not task.cancelled() and task.exception() is None:
+            self._recent[key] = (time.monotonic() + ttl, task.result())
+            if len(self._recent) > settings.query_cache_max_entries:
+                now = time.monotonic()
+                self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "ttl_ms": settings.coalesce_ttl_ms,
+            "methods": {name: dict(counters) for name, counters in self._stats.items()},
+        }
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Coalesce concurrent calls of a service method with identical arguments"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if not settings.coalesce_enabled or db_manager.in_transaction():
+            return await func(self, *args, **kwargs)
+        key = (db_manager.current_tenant(), name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return await func(self, *args, **kwargs)
+        return await single_flight.do(name, key, lambda: func(self, *args, **kwargs))
+
+    return wrapper
+
+
+def coalesce_stats() -> Dict[str, Any]:
+    return single_flight.stats()
@@ -1,26 +1,175 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 
 class Settings(BaseSettings):
-    # SQLite database path
-    database_url: str = str(Path(__file__).parent.parent.parent.parent / "database" / "thunai_culture.db")
+    # SQLite database path (repository-level database/ folder) or a postgresql:// DSN
+    database_url: str = str(Path(__file__).parent.parent.parent.parent.parent / "database" / "thunai_culture.db")
+    # SQLite only: "file" (database_url), "memory" (an in-process database built from
+    # the schema and database_seed_sql when the app starts) or "template" (an in-process
+    # clone of a template database built once from the schema and seed), for tests and benchmarks
+    database_mode: str = "file"
+    database_seed_sql: Optional[str] = None
+    database_template_path: str = str(
+        Path(__file__).parent.parent.parent.parent.parent / "database" / "templates" / "thunai_culture_template.db"
+    )
     app_name: str = "Thunai Culture OS API"
     debug: bool = True
-    
+
     # Server configuration
     host: str = "0.0.0.0"
     port: int = 8000
-    
+
     # CORS configuration
     allowed_origins: list = ["http://localhost:3978", "http://127.0.0.1:3978"]
-    
+
     # Logging configuration
     log_level: str = "INFO"
     enable_debug_logs: bool = True
-    
+
+    # Timezone used for "today" and scheduled jobs (IANA name)
+    timezone: str = "UTC"
+
+    # Admin endpoints (closed when no key is configured; ADMIN_AUTH_DISABLED=true opens
+    # them without a key, for local development only)
+    admin_api_key: Optional[str] = None
+    admin_auth_disabled: bool = False
+
+    # Connection pool configuration
+    db_pool_max_idle: int = 4
+    sqlite_busy_timeout_ms: int = 5000
+
+    # PostgreSQL backend (used when database_url starts with postgresql://)
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    pg_statement_cache_size: int = 256
+
+    # Process-local query cache, invalidated across workers via PRAGMA data_version
+    query_cache_enabled: bool = True
+    query_cache_max_entries: int = 2048
+    query_cache_check_interval_ms: int = 0
+    # Without table versions (PostgreSQL, cache off) the user name index picks up
+    # new users by id on every scan and is reloaded in full after this many seconds
+    user_name_index_reload_s: int = 300
+
+    # Single-flight coalescing of identical concurrent service reads; a non-zero
+    # TTL also reuses a finished result for that long
+    coalesce_enabled: bool = True
+    coalesce_ttl_ms: int = 0
+
+    # Negotiated response encodings (brotli and MessagePack need the optional
+    # `brotli` and `msgpack` packages); bodies below the threshold stay uncompressed
+    response_encoding_enabled: bool = True
+    compression_min_bytes: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+
+    # Archival of finished moments (inactive or notified) older than the retention
+    # window into <database>_archive.db; runs daily at 03:00 local time once enabled
+    archive_enabled: bool = False
+    archive_retention_days: int = 365
+    archive_batch_size: int = 500
+
+    # Database maintenance (ANALYZE, PRAGMA optimize, WAL checkpoint, incremental
+    # vacuum), run once per day inside the quiet window (HH:MM local time)
+    maintenance_enabled: bool = True
+    maintenance_window_start: str = "02:00"
+    maintenance_window_end: str = "05:00"
+    maintenance_time_budget_ms: int = 30000
+    maintenance_analysis_limit: int = 1000
+    maintenance_vacuum_pages: int = 500
+    # Switching an existing database to incremental auto-vacuum needs one full VACUUM
+    maintenance_enable_incremental_vacuum: bool = False
+
+    # Online backups with the SQLite backup API, verified with an integrity check;
+    # taken daily at backup_time (HH:MM local) and pruned to the newest N per tenant;
+    # off by default so a deployment opts in along with a backup_dir it has sized
+    backup_enabled: bool = False
+    backup_dir: str = str(Path(__file__).parent.parent.parent.parent.parent / "database" / "backups")
+    backup_time: str = "01:30"
+    backup_retention_count: int = 7
+    backup_step_pages: int = 256
+    backup_step_sleep_ms: int = 5
+
+    # Background job queue: bounded worker pool started with the app; jobs whose
+    # heartbeat is older than job_stale_after_s are requeued (or failed) on restart
+    job_workers: int = 2
+    job_poll_interval_s: float = 2.0
+    job_heartbeat_interval_s: float = 5.0
+    job_stale_after_s: float = 60.0
+    job_max_attempts: int = 3
+
+    # Idempotency-Key support for POST requests: first responses are kept for
+    # idempotency_ttl_s; concurrent retries wait up to idempotency_wait_timeout_ms
+    idempotency_enabled: bool = True
+    idempotency_header: str = "Idempotency-Key"
+    idempotency_ttl_s: int = 86400
+    idempotency_lock_timeout_s: int = 60
+    idempotency_wait_timeout_ms: int = 10000
+
+    # POST /api/v1/batch: most sub-requests accepted in one call
+    batch_max_requests: int = 50
+
+    # X-Total-Count on list routes: exact from the trigger-maintained row counts;
+    # counts nothing maintains (or archived rows) stop at count_estimate_limit
+    count_estimate_limit: int = 10000
+
+    # Columnar (Arrow IPC / Parquet) export of moments, greetings and users, read
+    # export_batch_rows at a time; export jobs write files under export_dir
+    export_batch_rows: int = 10000
+    export_dir: str = str(Path(__file__).parent.parent.parent.parent.parent / "database" / "exports")
+    export_parquet_compression: str = "snappy"
+
+    # Sampling profiler for single requests: admins add ?profile=1, and
+    # profile_sample_rate profiles that fraction of all API requests; the last
+    # profile_history profiles of each worker are kept for /api/v1/admin/profiles
+    profiling_enabled: bool = True
+    profile_query_param: str = "profile"
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5.0
+    profile_history: int = 20
+
+    # Recognition leaderboards: rolling windows (days, plus "all") kept ranked in
+    # memory per worker, backed by daily buckets folded in batches of leaderboard_fold_batch
+    leaderboard_windows: list = [7, 30, 90]
+    leaderboard_fold_batch: int = 5000
+
+    # Compiled greeting cards (Teams rejects Adaptive Cards much above ~28 KB)
+    greeting_card_max_bytes: int = 24000
+    greeting_card_cache_size: int = 256
+
+    # Admission control: token buckets per client and route class (read/write),
+    # plus a global cap on concurrent write requests; excess load gets 429
+    rate_limit_enabled: bool = True
+    rate_limit_client_header: str = "X-Client-ID"
+    # Peer addresses (e.g. the bot's reverse proxy) whose client header is trusted;
+    # everyone else is keyed on their own address, whatever header they send
+    rate_limit_trusted_proxies: list = []
+    rate_limit_read_per_second: float = 100.0
+    rate_limit_read_burst: int = 200
+    rate_limit_write_per_second: float = 20.0
+    rate_limit_write_burst: int = 40
+    max_concurrent_writes: int = 4
+    write_admission_timeout_ms: int = 250
+
+    # Near-duplicate greeting detection (MinHash/LSH per moment): "off", "flag"
+    # (store and record) or "collapse" (store, link it to the original in
+    # greeting_duplicates and fold its sender into that card entry)
+    greeting_dedup_mode: str = "flag"
+    greeting_dedup_threshold: float = 0.8
+    greeting_dedup_num_perm: int = 64
+    greeting_dedup_cache_size: int = 256
+
+    # Multi-tenant configuration (one SQLite database per Teams tenant)
+    multi_tenant_enabled: bool = False
+    tenant_header: str = "X-Tenant-ID"
+    tenant_database_dir: str = str(Path(__file__).parent.parent.parent.parent.parent / "database" / "tenants")
+    tenant_auto_provision: bool = False
+    max_open_tenants: int = 32
+
     class Config:
         env_file = ".env"
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,153 @@
+"""Row counts maintained on write, behind the X-Total-Count header.
+
+`row_counts` holds one row per counted table (with an empty column name) and
+one per value of each column list routes filter on, kept current by triggers
+on insert, delete and updates of those columns. Reading a total is then a
+primary-key lookup instead of a scan. The counts are seeded from the table
+in the same transaction that creates the triggers, and reseeded whenever the
+set of counted columns changes.
+
+Where nothing is maintained (PostgreSQL, rows in the archive database, other
+filters) totals come from a count that stops at `count_estimate_limit`; a
+total that hit the limit is reported as an estimate (a lower bound).
+"""
+import zlib
+from typing import Any, NamedTuple, Optional, Sequence
+from app.core.cache import cached
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.storage import StorageConnection
+
+COUNTER_TABLE = "row_counts"
+# Table -> columns whose per-value counts are maintained
+COUNTED_COLUMNS = {
+    "users": ("is_admin",),
+    "moments": ("moment_type", "is_active", "person_name"),
+    "greetings": ("moment_id", "user_id"),
+    "accolades": ("accolade_type", "user_id"),
+    "gossips": ("gossip_type",),
+    "quests": ("quest_type",),
+    "thoughts": ("thought_type",),
+}
+
+
+class Total(NamedTuple):
+    """A row count; `exact` is False when counting stopped at the estimate limit"""
+    value: int
+    exact: bool = True
+
+    def plus(self, other: "Total") -> "Total":
+        return Total(self.value + other.value, self.exact and other.exact)
+
+
+def counter_value(value: Any) -> str:
+    """Key a column value the way the triggers store it (CAST(... AS TEXT))"""
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+
+def _signature(columns: Sequence[str]) -> str:
+    return format(zlib.crc32(",".join(columns).encode("utf-8")), "08x")
+
+
+def _upsert(table: str, column: str, value_sql: str, condition: str, delta: int) -> str:
+    return (
+        f"INSERT INTO {COUNTER_TABLE} (table_name, column_name, value, row_count) "
+        f"SELECT '{table}', '{column}', {value_sql}, {delta} WHERE {condition} "
+        f"ON CONFLICT (table_name, column_name, value) DO UPDATE SET row_count = row_count + {delta};"
+    )
+
+
+def _trigger_statements(table: str, columns: Sequence[str], prefix: str):
+    insert = [_upsert(table, "", "''", "1", 1)]
+    insert += [_upsert(table, c, f"CAST(NEW.{c} AS TEXT)", f"NEW.{c} IS NOT NULL", 1) for c in columns]
+    delete = [_upsert(table, "", "''", "1", -1)]
+    delete += [_upsert(table, c, f"CAST(OLD.{c} AS TEXT)", f"OLD.{c} IS NOT NULL", -1) for c in columns]
+    update = []
+    for c in columns:
+        changed = f"OLD.{c} IS NOT NEW.{c}"
+        update.append(_upsert(table, c, f"CAST(OLD.{c} AS TEXT)", f"OLD.{c} IS NOT NULL AND {changed}", -1))
+        update.append(_upsert(table, c, f"CAST(NEW.{c} AS TEXT)", f"NEW.{c} IS NOT NULL AND {changed}", 1))
+    yield f"CREATE TRIGGER {prefix}_insert AFTER INSERT ON {table} BEGIN {' '.join(insert)} END"
+    yield f"CREATE TRIGGER {prefix}_delete AFTER DELETE ON {table} BEGIN {' '.join(delete)} END"
+    if update:
+        yield (
+            f"CREATE TRIGGER {prefix}_update AFTER UPDATE OF {', '.join(columns)} ON {table} "
+            f"BEGIN {' '.join(update)} END"
+        )
+
+
+async def ensure_row_counters(connection: StorageConnection):
+    """Create the counter table and, where missing or outdated, seed the counts and their triggers"""
+    if connection.dialect != "sqlite":
+        return
+    await connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} ("
+        "table_name TEXT NOT NULL, column_name TEXT NOT NULL, value TEXT NOT NULL, "
+        "row_count INTEGER NOT NULL, PRIMARY KEY (table_name, column_name, value))"
+    )
+    rows = await connection.fetch_all("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    existing = {row["name"] for row in rows if row["type"] == "table"}
+    triggers = {row["name"] for row in rows if row["type"] == "trigger"}
+    for table, columns in COUNTED_COLUMNS.items():
+        if table not in existing:
+            continue
+        table_columns = {row["name"] for row in await connection.fetch_all(f"PRAGMA table_info({table})")}
+        columns = tuple(c for c in columns if c in table_columns)
+        prefix = f"{table}_counts_{_signature(columns)}"
+        if f"{prefix}_insert" in triggers:
+            continue
+        # Seed and swap triggers in one write transaction, so no write falls in between
+        await connection.execute(f"DELETE FROM {COUNTER_TABLE} WHERE table_name = ?", (table,))
+        await connection.execute(
+            f"INSERT INTO {COUNTER_TABLE} (table_name, column_name, value, row_count) "
+            f"SELECT ?, '', '', COUNT(*) FROM {table}", (table,)
+        )
+        for column in columns:
+            await connection.execute(
+                f"INSERT INTO {COUNTER_TABLE} (table_name, column_name, value, row_count) "
+                f"SELECT ?, ?, CAST({column} AS TEXT), COUNT(*) FROM {table} "
+                f"WHERE {column} IS NOT NULL GROUP BY CAST({column} AS TEXT)", (table, column)
+            )
+        for name in triggers:
+            if name.startswith(f"{table}_counts_"):
+                await connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for statement in _trigger_statements(table, columns, prefix):
+            await connection.execute(statement)
+        await connection.commit()
+        if settings.enable_debug_logs:
+            print(f"Seeded row counts for {table} ({', '.join(columns) or 'total only'})")
+
+
+def is_counted(table: str, column: Optional[str] = None) -> bool:
+    return db_manager.dialect == "sqlite" and table in COUNTED_COLUMNS and (
+        column is None or column in COUNTED_COLUMNS[table]
+    )
+
+
+async def maintained_count(table: str, column: Optional[str] = None, value: Any = None) -> int:
+    """Rows of `table` (with `column` = `value`) from the maintained counts"""
+    key = ("" if column is None else column, "" if column is None else counter_value(value))
+
+    async def load():
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_value(
+                f"SELECT row_count FROM {COUNTER_TABLE} WHERE table_name = ? AND column_name = ? AND value = ?",
+                (table, *key)
+            )
+
+    # The counts move exactly when the table does, so its version keys the cache
+    return await cached((table,), (COUNTER_TABLE, table, *key), load) or 0
+
+
+async def bounded_count(connection: StorageConnection, query: str, params: Sequence[Any] = ()) -> Total:
+    """Count the rows `query` returns, stopping after `count_estimate_limit`"""
+    limit = settings.count_estimate_limit
+    counted = await connection.fetch_value(
+        f"SELECT COUNT(*) FROM ({query} LIMIT ?) AS bounded", (*params, limit + 1)
+    ) or 0
+    return Total(limit, exact=False) if counted > limit else Total(counted)
+
+
+db_manager.add_initializer(ensure_row_counters)
@@ -1,33 +1,551 @@
+import asyncio
+import functools
+import os
+import re
+import time
+import uuid
+import weakref
+import zlib
 import aiosqlite
+from collections import OrderedDict
+from contextvars import ContextVar
 from pathlib import Path
 from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Generic, TypeVar
+from app.core.config import settings
+from app.core.schema import BASE_SCHEMA, POSTGRES_SCHEMA, SCHEMA_UPGRADES
+from app.core.storage import (
+    SQLiteConnection, StorageConnection, SharedTransactionConnection, PostgresBackend,
+    connect_sqlite, is_postgres_url, memory_database_uri, sqlite_path_from_url
+)
+
+T = TypeVar("T")
+
+DEFAULT_TENANT = "default"
+DATABASE_MODES = ("file", "memory", "template")
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+_current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+_current_transaction: ContextVar[Optional[SharedTransactionConnection]] = ContextVar("current_transaction", default=None)
+
+
+class TenantNotFoundError(LookupError):
+    """Raised when a request targets a tenant whose database has not been provisioned"""
+
+
+class TenantMetrics:
+    """Per-tenant connection and request counters"""
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.requests = 0
+        self.acquisitions = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.in_use = 0
+        self.pool_opens = 0
+        self.evictions = 0
+        self.total_hold_ms = 0.0
+        self.last_used_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tenant_id": self.tenant_id,
+            "requests": self.requests,
+            "acquisitions": self.acquisitions,
+            "connections_opened": self.connections_opened,
+            "connections_closed": self.connections_closed,
+            "in_use": self.in_use,
+            "pool_opens": self.pool_opens,
+            "evictions": self.evictions,
+            "avg_hold_ms": round(self.total_hold_ms / self.acquisitions, 3) if self.acquisitions else 0.0,
+            "last_used_at": self.last_used_at,
+        }
+
+
+class ConnectionPool:
+    """Keeps up to `max_idle` open aiosqlite connections for one database file.
+
+    Connections are opened on demand and never capped, so nested
+    `get_connection()` calls inside a repository cannot deadlock.
+    """
+
+    def __init__(self, db_path: str, metrics: TenantMetrics, max_idle: int,
+                 keeper: Optional[aiosqlite.Connection] = None):
+        self.db_path = db_path
+        self.metrics = metrics
+        self._max_idle = max_idle
+        self._idle: List[aiosqlite.Connection] = []
+        self._closed = False
+        # Holds an in-memory database open while the pool lives
+        self._keeper = keeper
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    async def _open(self) -> aiosqlite.Connection:
+        connection = await connect_sqlite(self.db_path)
+        # Enable foreign key constraints
+        await connection.execute("PRAGMA foreign_keys = ON")
+        await connection.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+        # Set row factory to return dict-like objects
+        connection.row_factory = aiosqlite.Row
+        self.metrics.connections_opened += 1
+        return connection
+
+    async def _discard(self, connection: aiosqlite.Connection):
+        self.metrics.connections_closed += 1
+        await connection.close()
+
+    @asynccontextmanager
+    async def connection(self):
+        connection = self._idle.pop() if self._idle else await self._open()
+        self.metrics.acquisitions += 1
+        self.metrics.in_use += 1
+        started = time.perf_counter()
+        try:
+            yield SQLiteConnection(connection)
+        finally:
+            self.metrics.in_use -= 1
+            self.metrics.total_hold_ms += (time.perf_counter() - started) * 1000
+            self.metrics.last_used_at = time.time()
+            await self._release(connection)
+
+    async def _release(self, connection: aiosqlite.Connection):
+        try:
+            if connection.in_transaction:
+                await connection.rollback()
+        except Exception:
+            await self._discard(connection)
+            return
+        if self._closed or len(self._idle) >= self._max_idle:
+            await self._discard(connection)
+        else:
+            self._idle.append(connection)
+
+    async def close(self):
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+        if self._keeper is not None:
+            keeper, self._keeper = self._keeper, None
+            await keeper.close()
 
 
 class DatabaseManager:
     def __init__(self):
-        # SQLite database path
-        self._db_path = str(Path(__file__).parent.parent.parent.parent.parent / "database" / "thunai_culture.db")
-    
+        self._pools: "OrderedDict[str, ConnectionPool]" = OrderedDict()
+        self._metrics: Dict[str, TenantMetrics] = {}
+        self._postgres: Optional[PostgresBackend] = None
+        self._initializers: List[Callable[[StorageConnection], Awaitable[None]]] = []
+        self._transaction_setups: List[Callable[[StorageConnection], Awaitable[None]]] = []
+        # Names this process's in-memory databases; renewed by every create_pool()
+        self._memory_prefix = f"thunai-{uuid.uuid4().hex[:12]}"
+        self._template_path: Optional[str] = None
+        self._memory_lock = asyncio.Lock()
+        self._opening: Dict[str, "asyncio.Future[ConnectionPool]"] = {}
+        # Bumped by every create_pool(), so per-tenant state built for earlier databases is dropped
+        self.generation = 0
+
+    def add_initializer(self, initializer: Callable[[StorageConnection], Awaitable[None]]):
+        """Run `initializer` once on every database when its pool is opened"""
+        self._initializers.append(initializer)
+
+    def add_transaction_setup(self, setup: Callable[[StorageConnection], Awaitable[None]]):
+        """Run `setup` on a transaction's connection before its first statement"""
+        self._transaction_setups.append(setup)
+
+    async def _initialize(self, connection: StorageConnection):
+        for statement in SCHEMA_UPGRADES:
+            await connection.execute(statement)
+        for initializer in self._initializers:
+            await initializer(connection)
+        if connection.in_transaction:
+            await connection.commit()
+
+    @property
+    def dialect(self) -> str:
+        return "postgresql" if is_postgres_url(settings.database_url) else "sqlite"
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether databases live in process memory ("memory" and "template" modes)"""
+        return settings.database_mode in ("memory", "template") and self.dialect == "sqlite"
+
+    @property
+    def _db_path(self) -> str:
+        return sqlite_path_from_url(settings.database_url)
+
+    # ------------------------------------------------------------------
+    # Tenant routing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def current_tenant() -> str:
+        return _current_tenant.get()
+
+    @staticmethod
+    def set_current_tenant(tenant_id: str):
+        return _current_tenant.set(tenant_id)
+
+    @staticmethod
+    def reset_current_tenant(token):
+        _current_tenant.reset(token)
+
+    @staticmethod
+    def is_valid_tenant_id(tenant_id: str) -> bool:
+        return bool(TENANT_ID_PATTERN.match(tenant_id))
+
+    def tenant_db_path(self, tenant_id: str) -> str:
+        if self.in_memory:
+            if tenant_id != DEFAULT_TENANT and not self.is_valid_tenant_id(tenant_id):
+                raise ValueError(f"Invalid tenant id: {tenant_id}")
+            return memory_database_uri(f"{self._memory_prefix}-{tenant_id}")
+        if tenant_id == DEFAULT_TENANT:
+            return self._db_path
+        if not self.is_valid_tenant_id(tenant_id):
+            raise ValueError(f"Invalid tenant id: {tenant_id}")
+        return str(Path(settings.tenant_database_dir) / f"{tenant_id}.db")
+
+    def tenant_exists(self, tenant_id: str) -> bool:
+        if self.in_memory:
+            return tenant_id in self._pools
+        return tenant_id in self._pools or Path(self.tenant_db_path(tenant_id)).exists()
+
+    def metrics_for(self, tenant_id: str) -> TenantMetrics:
+        metrics = self._metrics.get(tenant_id)
+        if metrics is None:
+            metrics = self._metrics[tenant_id] = TenantMetrics(tenant_id)
+        return metrics
+
+    def list_tenants(self) -> List[str]:
+        tenants = {DEFAULT_TENANT}
+        tenant_dir = Path(settings.tenant_database_dir)
+        if settings.multi_tenant_enabled and tenant_dir.exists():
+            tenants.update(path.stem for path in tenant_dir.glob("*.db"))
+        tenants.update(self._pools)
+        return sorted(tenants)
+
+    def open_tenants(self) -> List[str]:
+        return list(self._pools) if self._postgres is None else [DEFAULT_TENANT]
+
+    def tenant_status(self, tenant_id: str) -> Dict[str, Any]:
+        pool = self._pools.get(tenant_id)
+        status = self.metrics_for(tenant_id).as_dict()
+        status["database_path"] = self.tenant_db_path(tenant_id)
+        status["database_mode"] = settings.database_mode if self.dialect == "sqlite" else "postgresql"
+        status["pool_open"] = pool is not None
+        status["idle_connections"] = pool.idle_count if pool else 0
+        return status
+
+    async def provision_tenant(self, tenant_id: str) -> Dict[str, Any]:
+        """Create a tenant database file with the base schema"""
+        if self.in_memory:
+            if tenant_id in self._pools:
+                raise FileExistsError(f"Tenant '{tenant_id}' already exists")
+            await self._get_pool(tenant_id, provision=True)
+            return self.tenant_status(tenant_id)
+        db_path = Path(self.tenant_db_path(tenant_id))
+        if db_path.exists():
+            raise FileExistsError(f"Tenant '{tenant_id}' already exists")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiosqlite.connect(str(db_path)) as connection:
+            await connection.executescript(BASE_SCHEMA)
+            await connection.commit()
+        if settings.enable_debug_logs:
+            print(f"Provisioned tenant database: {db_path}")
+        return self.tenant_status(tenant_id)
+
+    async def _populate(self, connection: aiosqlite.Connection):
+        """Create the full schema and load `database_seed_sql` into a new in-memory or template database"""
+        await connection.executescript(BASE_SCHEMA)
+        for statement in SCHEMA_UPGRADES:
+            await connection.execute(statement)
+        if settings.database_seed_sql:
+            await connection.executescript(Path(settings.database_seed_sql).read_text(encoding="utf-8"))
+        await connection.commit()
+
+    async def _ensure_template(self) -> str:
+        """Path of the template database, (re)built when the schema or the seed changed"""
+        if self._template_path is not None:
+            return self._template_path
+        path = Path(settings.database_template_path)
+        seed = Path(settings.database_seed_sql).read_text(encoding="utf-8") if settings.database_seed_sql else ""
+        fingerprint = zlib.crc32("\n".join([BASE_SCHEMA, *SCHEMA_UPGRADES, seed]).encode("utf-8")) & 0x7FFFFFFF
+        if path.exists():
+            async with connect_sqlite(str(path)) as connection:
+                cursor = await connection.execute("PRAGMA user_version")
+                built = (await cursor.fetchone())[0]
+            if built == fingerprint:
+                self._template_path = str(path)
+                return self._template_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Built aside and swapped in, so concurrent processes never clone a half-built template
+        building = path.with_name(f"{path.stem}.{os.getpid()}.building")
+        building.unlink(missing_ok=True)
+        async with connect_sqlite(str(building)) as connection:
+            connection.row_factory = aiosqlite.Row
+            await self._populate(connection)
+            await self._initialize(SQLiteConnection(connection))
+            await connection.execute(f"PRAGMA user_version = {fingerprint}")
+            await connection.commit()
+        os.replace(building, path)
+        if settings.enable_debug_logs:
+            print(f"Built template database: {path}")
+        self._template_path = str(path)
+        return self._template_path
+
+    async def _create_memory_database(self, db_path: str) -> aiosqlite.Connection:
+        """Create an in-memory database from the schema or as a clone of the template.
+
+        The returned connection keeps it alive; it is gone once that closes.
+        """
+        keeper = await connect_sqlite(db_path)
+        try:
+            if settings.database_mode == "template":
+                async with connect_sqlite(await self._ensure_template()) as template:
+                    await template.backup(keeper)
+            else:
+                await self._populate(keeper)
+        except BaseException:
+            await keeper.close()
+            raise
+        return keeper
+
+    async def open_tenant(self, tenant_id: Optional[str] = None):
+        """Open the tenant's database (provisioning it if allowed), so its schema is in place"""
+        if self._postgres is None:
+            await self._get_pool(tenant_id or self.current_tenant())
+
+    async def _get_pool(self, tenant_id: str, provision: bool = False) -> ConnectionPool:
+        pool = self._pools.get(tenant_id)
+        if pool is not None:
+            self._pools.move_to_end(tenant_id)
+            return pool
+
+        # Requests for a tenant that is still being opened wait for that pool instead of
+        # opening their own, and a pool is only registered once its schema is initialized
+        opening = self._opening.get(tenant_id)
+        if opening is not None:
+            return await asyncio.shield(opening)
+        opening = self._opening[tenant_id] = asyncio.get_running_loop().create_future()
+        try:
+            pool = await self._open_pool(tenant_id, provision)
+        except Exception as error:
+            opening.set_exception(error)
+            # Nobody may be waiting; don't let the loop report it a second time
+            opening.exception()
+            raise
+        except BaseException:
+            opening.cancel()
+            raise
+        else:
+            opening.set_result(pool)
+        finally:
+            del self._opening[tenant_id]
+        return pool
+
+    async def _open_pool(self, tenant_id: str, provision: bool) -> ConnectionPool:
+        db_path = self.tenant_db_path(tenant_id)
+        keeper = None
+        if self.in_memory:
+            if tenant_id != DEFAULT_TENANT and not (provision or settings.tenant_auto_provision):
+                raise TenantNotFoundError(f"Tenant '{tenant_id}' is not provisioned")
+            # Tenants opening side by side must not build the template at the same time
+            async with self._memory_lock:
+                keeper = await self._create_memory_database(db_path)
+        elif not Path(db_path).exists():
+            if tenant_id == DEFAULT_TENANT:
+                raise RuntimeError(f"Database file not found: {db_path}")
+            if not settings.tenant_auto_provision:
+                raise TenantNotFoundError(f"Tenant '{tenant_id}' is not provisioned")
+            try:
+                await self.provision_tenant(tenant_id)
+            except FileExistsError:
+                pass
+
+        metrics = self.metrics_for(tenant_id)
+        metrics.pool_opens += 1
+        pool = ConnectionPool(db_path, metrics, settings.db_pool_max_idle, keeper)
+        try:
+            async with pool.connection() as connection:
+                await self._initialize(connection)
+        except BaseException:
+            await pool.close()
+            raise
+        self._pools[tenant_id] = pool
+        await self._evict_least_recently_used()
+        return pool
+
+    async def _evict_least_recently_used(self):
+        # The default database is pinned; only tenant pools are evicted
+        while len(self._pools) > max(settings.max_open_tenants, 1) + 1:
+            victim = next((t for t in self._pools if t != DEFAULT_TENANT), None)
+            if victim is None:
+                return
+            pool = self._pools.pop(victim)
+            pool.metrics.evictions += 1
+            await pool.close()
+            # In-process state built for that database (caches, indexes) goes with it
+            for scoped in list(_tenant_scoped):
+                await scoped.release(victim)
+
+    # ------------------------------------------------------------------
+    # Pool lifecycle
+    # ------------------------------------------------------------------
+
     async def create_pool(self):
+        self.generation += 1
+        if self.dialect == "postgresql":
+            if settings.multi_tenant_enabled:
+                raise RuntimeError("Multi-tenant mode is only supported with the SQLite backend")
+            self._postgres = PostgresBackend(
+                settings.database_url,
+                min_size=settings.db_pool_min_size,
+                max_size=settings.db_pool_max_size,
+                statement_cache_size=settings.pg_statement_cache_size,
+            )
+            await self._postgres.open(POSTGRES_SCHEMA)
+            async with self._postgres.connection() as connection:
+                await self._initialize(connection)
+            if settings.enable_debug_logs:
+                print("Using PostgreSQL database")
+            return
+
+        if settings.database_mode not in DATABASE_MODES:
+            raise RuntimeError(f"Unknown database_mode '{settings.database_mode}'. Use one of: {', '.join(DATABASE_MODES)}")
+        if self.in_memory:
+            self._memory_prefix = f"thunai-{uuid.uuid4().hex[:12]}"
+            self._template_path = None
+            await self._get_pool(DEFAULT_TENANT)
+            if settings.enable_debug_logs:
+                print(f"Using in-memory SQLite database ({settings.database_mode} mode)")
+            return
+
         # For SQLite, ensure database file exists
         if not Path(self._db_path).exists():
             raise RuntimeError(f"Database file not found: {self._db_path}")
-        from app.core.config import settings
+        await self._get_pool(DEFAULT_TENANT)
+        if settings.multi_tenant_enabled:
+            Path(settings.tenant_database_dir).mkdir(parents=True, exist_ok=True)
         if settings.enable_debug_logs:
             print(f"Using SQLite database: {self._db_path}")
-    
+
     async def close_pool(self):
-        # No pool to close for SQLite
-        pass
-    
+        if self._postgres is not None:
+            backend, self._postgres = self._postgres, None
+            await backend.close()
+        pools, self._pools = list(self._pools.values()), OrderedDict()
+        for pool in pools:
+            await pool.close()
+
     @asynccontextmanager
     async def get_connection(self):
-        async with aiosqlite.connect(self._db_path) as connection:
-            # Enable foreign key constraints
-            await connection.execute("PRAGMA foreign_keys = ON")
-            # Set row factory to return dict-like objects
-            connection.row_factory = aiosqlite.Row
+        shared = _current_transaction.get()
+        if shared is not None:
+            yield shared
+            return
+        if self._postgres is not None:
+            async with self._postgres.connection() as connection:
+                yield connection
+            return
+        pool = await self._get_pool(self.current_tenant())
+        async with pool.connection() as connection:
             yield connection
 
+    @staticmethod
+    def in_transaction() -> bool:
+        """Whether the current context runs inside `transaction()`"""
+        return _current_transaction.get() is not None
+
+    async def after_commit(self, hook: Callable[..., Awaitable[Any]], *args: Any):
+        """Run `hook(*args)` once the current transaction commits (never if it rolls back), or now outside one.
+
+        For in-process state (indexes, compiled caches) that must only ever
+        reflect committed rows.
+        """
+        shared = _current_transaction.get()
+        if shared is None:
+            await hook(*args)
+        else:
+            shared.after_commit(functools.partial(hook, *args))
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run every `get_connection()` in this context on one connection, committed once at the end.
+
+        Rolled back if the block raises or any repository asked for a rollback.
+        """
+        if _current_transaction.get() is not None:
+            yield _current_transaction.get()
+            return
+        committed = False
+        async with self.get_connection() as connection:
+            for setup in self._transaction_setups:
+                await setup(connection)
+            shared = SharedTransactionConnection(connection)
+            token = _current_transaction.set(shared)
+            try:
+                yield shared
+            except BaseException:
+                await connection.rollback()
+                raise
+            else:
+                if shared.rollback_only:
+                    await connection.rollback()
+                else:
+                    await connection.commit()
+                    committed = True
+            finally:
+                _current_transaction.reset(token)
+        if committed:
+            for hook in shared.after_commit_hooks:
+                await hook()
+
+
+db_manager = DatabaseManager()
+
+# Every TenantScoped, so an evicted tenant's state can be released
+_tenant_scoped: "weakref.WeakSet[TenantScoped]" = weakref.WeakSet()
+
+
+class TenantScoped(Generic[T]):
+    """Keeps one instance of an in-process structure per tenant database"""
+
+    def __init__(self, factory: Callable[[str], T], release: Optional[Callable[[T], Awaitable[None]]] = None):
+        self._factory = factory
+        self._release = release
+        self._instances: Dict[str, T] = {}
+        self._generation = db_manager.generation
+        _tenant_scoped.add(self)
+
+    def get(self, tenant_id: Optional[str] = None) -> T:
+        if self._generation != db_manager.generation:
+            # The databases were reopened (e.g. a fresh in-memory clone per test)
+            self._instances.clear()
+            self._generation = db_manager.generation
+        tenant_id = tenant_id or db_manager.current_tenant()
+        instance = self._instances.get(tenant_id)
+        if instance is None:
+            instance = self._instances[tenant_id] = self._factory(tenant_id)
+        return instance
+
+    def set(self, instance: T, tenant_id: Optional[str] = None) -> T:
+        """Replace the tenant's instance (e.g. with one rebuilt from the database)"""
+        self.get(tenant_id)
+        self._instances[tenant_id or db_manager.current_tenant()] = instance
+        return instance
+
+    def items(self):
+        return list(self._instances.items())
+
+    def pop(self, tenant_id: str) -> Optional[T]:
+        return self._instances.pop(tenant_id, None)
 
-db_manager = DatabaseManager()
\ No newline at end of file
+    async def release(self, tenant_id: str):
+        """Drop the tenant's instance, closing it with `release` when one was given"""
+        instance = self._instances.pop(tenant_id, None)
+        if instance is not None and self._release is not None:
+            await self._release(instance)
@@ -0,0 +1,212 @@
+"""Negotiated response encodings for API responses.
+
+Two independent steps, both driven by request headers:
+
+- Representation (`Accept`): `application/msgpack` re-encodes a JSON body as
+  MessagePack, and `application/vnd.columnar+json` turns a JSON list of
+  objects into `{"columns": [...], "rows": [[...], ...]}` so every key is
+  sent once instead of once per row.
+- Compression (`Accept-Encoding`): brotli or gzip, only for bodies of at
+  least `compression_min_bytes`.
+
+brotli and msgpack are optional; without them those encodings are simply
+not offered. Streaming responses (no Content-Length) pass through as is.
+"""
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+COLUMNAR_TYPE = "application/vnd.columnar+json"
+COMPRESSIBLE_TYPES = ("application/json", "application/vnd.", "application/msgpack", "text/")
+
+
+def _parse_header_list(value: str) -> Dict[str, float]:
+    """Parse `a, b;q=0.5` into {"a": 1.0, "b": 0.5}"""
+    result = {}
+    for item in value.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        result[parts[0].lower()] = quality
+    return result
+
+
+def choose_representation(accept: str) -> Optional[str]:
+    accepted = _parse_header_list(accept)
+    if msgpack is not None and any(accepted.get(media_type, 0) > 0 for media_type in MSGPACK_TYPES):
+        return "msgpack"
+    if accepted.get(COLUMNAR_TYPE, 0) > 0:
+        return "columnar"
+    return None
+
+
+def choose_compression(accept_encoding: str) -> Optional[str]:
+    accepted = _parse_header_list(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns: List[str] = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    return {"columns": columns, "rows": [[row.get(column) for column in columns] for row in rows]}
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=settings.brotli_quality)
+    return gzip.compress(body, compresslevel=settings.gzip_level)
+
+
+class EncodingStats:
+    """Bytes before and after encoding, per route"""
+
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, raw_bytes: int, sent_bytes: int, encoded: bool):
+        counters = self.routes.get(route)
+        if counters is None:
+            counters = self.routes[route] = {"responses": 0, "encoded": 0, "raw_bytes": 0, "sent_bytes": 0}
+        counters["responses"] += 1
+        counters["encoded"] += int(encoded)
+        counters["raw_bytes"] += raw_bytes
+        counters["sent_bytes"] += sent_bytes
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            route: {**counters, "bytes_saved": counters["raw_bytes"] - counters["sent_bytes"]}
+            for route, counters in sorted(self.routes.items())
+        }
+
+
+encoding_stats = EncodingStats()
+
+
+class ResponseEncodingMiddleware:
+    """Applies the negotiated representation and compression to buffered responses"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.response_encoding_enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name: value.decode("latin-1") for name, value in scope.get("headers", [])}
+        representation = choose_representation(headers.get(b"accept", ""))
+        compression = choose_compression(headers.get(b"accept-encoding", ""))
+        if representation is None and compression is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(raw=message["headers"])
+                content_type = response_headers.get("content-type", "")
+                if (message["status"] in (204, 304) or "content-length" not in response_headers
+                        or "content-encoding" in response_headers
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._send_encoded(scope, send, start, b"".join(chunks), representation, compression)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _route_name(scope: Scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            return f"{scope['method']} {scope['path']}"
+        # Route paths of included routers lack the /api/v1 prefix; take it from the request path
+        segments = scope["path"].split("/")
+        prefix = "/".join(segments[:len(segments) - route.path.count("/")])
+        return f"{scope['method']} {prefix}{route.path}"
+
+    async def _send_encoded(self, scope: Scope, send: Send, start: Message, body: bytes,
+                            representation: Optional[str], compression: Optional[str]):
+        headers = MutableHeaders(raw=start["headers"])
+        raw_size = len(body)
+        vary = [value.strip() for value in headers.get("vary", "").split(",") if value.strip()]
+
+        if representation and start["status"] == 200 and headers.get("content-type", "").startswith("application/json"):
+            body, content_type = self._represent(body, representation)
+            if content_type:
+                headers["content-type"] = content_type
+            vary.append("Accept")
+
+        if compression:
+            vary.append("Accept-Encoding")
+            if len(body) >= settings.compression_min_bytes:
+                body = compress(body, compression)
+                headers["content-encoding"] = compression
+
+        headers["content-length"] = str(len(body))
+        headers["vary"] = ", ".join(dict.fromkeys(vary))
+        encoding_stats.record(self._route_name(scope), raw_size, len(body), len(body) != raw_size)
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _represent(body: bytes, representation: str) -> Tuple[bytes, Optional[str]]:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body, None
+        if representation == "msgpack":
+            return msgpack.packb(data, use_bin_type=True), "application/msgpack"
+        if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+            return json.dumps(to_columnar(data), separators=(",", ":")).encode("utf-8"), COLUMNAR_TYPE
+        return body, None
+
+
+def get_encoding_stats() -> Dict[str, Any]:
+    return {
+        "brotli_available": brotli is not None,
+        "msgpack_available": msgpack is not None,
+        "compression_min_bytes": settings.compression_min_bytes,
+        "routes": encoding_stats.as_dict(),
+    }
@@ -0,0 +1,234 @@
+"""Columnar export of moments, greetings and users as Arrow IPC or Parquet.
+
+Rows are read in id order, `export_batch_rows` at a time (keyset paging, no
+OFFSET), converted to one Arrow record batch and written out before the next
+batch is read, so memory stays bounded by the batch size whatever the table
+size. In Parquet every batch becomes a row group.
+
+An export covers ids up to the table's highest id when it starts, its
+watermark; passing that back as `since_id` exports only rows added since.
+`since` additionally keeps rows created at or after a timestamp. Exports are
+streamed over HTTP or written under `export_dir` (through a `.partial` file,
+renamed when complete) by the `export` job. Moments and greetings already
+moved to the archive database are not included.
+
+pyarrow is optional; without it exports fail with ExportError.
+"""
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+from app.core.config import settings
+from app.repositories.export_repository import ExportRepository
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_WATERMARK_HEADER = "X-Export-Watermark"
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+# Table -> column -> type (matching the base schema)
+EXPORT_TABLES: Dict[str, Dict[str, str]] = {
+    "moments": {
+        "id": "int", "person_name": "text", "moment_type": "text", "moment_date": "date",
+        "description": "text", "created_by": "text", "created_at": "timestamp", "updated_at": "timestamp",
+        "is_active": "bool", "notification_sent": "bool", "tags": "text", "user_id": "int",
+    },
+    "greetings": {
+        "id": "int", "moment_id": "int", "user_id": "text", "moment_type": "text", "greeting_text": "text",
+        "greeting_from_name": "text", "is_active": "bool", "created_at": "timestamp",
+    },
+    "users": {
+        "id": "int", "teams_user_id": "text", "name": "text", "email": "text", "is_admin": "bool",
+        "created_at": "timestamp", "updated_at": "timestamp",
+    },
+}
+
+
+def columnar_available() -> bool:
+    return pyarrow is not None
+
+
+class ExportError(ValueError):
+    """Raised for an export that can't be produced (unknown table, column or format, or no pyarrow)"""
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _to_timestamp(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    return None if value is None else bool(value)
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {"date": _to_date, "timestamp": _to_timestamp, "bool": _to_bool}
+
+
+def _arrow_type(kind: str):
+    return {
+        "int": pyarrow.int64(), "text": pyarrow.string(), "bool": pyarrow.bool_(),
+        "date": pyarrow.date32(), "timestamp": pyarrow.timestamp("us"),
+    }[kind]
+
+
+class _ChunkSink:
+    """Write-only file object handing back what was written since the last `drain()`"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class ColumnarExport:
+    """One export of a table: which columns, which rows, which format"""
+
+    def __init__(self, table: str, export_format: str = "arrow", columns: Optional[Sequence[str]] = None,
+                 since_id: int = 0, since: Optional[datetime] = None):
+        if pyarrow is None:
+            raise ExportError("Columnar export needs the optional pyarrow package")
+        if table not in EXPORT_TABLES:
+            raise ExportError(f"Unknown table: {table}. Available: {', '.join(EXPORT_TABLES)}")
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown format: {export_format}. Available: {', '.join(EXPORT_FORMATS)}")
+        types = EXPORT_TABLES[table]
+        unknown = [column for column in columns or () if column not in types]
+        if unknown:
+            raise ExportError(f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(types)}")
+        # id always comes first: it is the keyset and the watermark
+        self.columns = list(dict.fromkeys(["id", *(columns or types)]))
+        self.table = table
+        self.format = export_format
+        self.since_id = since_id
+        self.since = since
+        self.schema = pyarrow.schema([(column, _arrow_type(types[column])) for column in self.columns])
+        self.repository = ExportRepository(table)
+        self.watermark: Optional[int] = None
+        self.rows = 0
+        self.batches = 0
+        self.last_id = since_id
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_FORMATS[self.format][0]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.table}-{self.since_id}-{self.watermark}.{EXPORT_FORMATS[self.format][1]}"
+
+    async def prepare(self) -> int:
+        """Fix the watermark (the table's highest id now) before any rows are read"""
+        self.watermark = await self.repository.find_max_id(self.since_id)
+        return self.watermark
+
+    def _record_batch(self, rows: List[Dict[str, Any]]):
+        types = EXPORT_TABLES[self.table]
+        arrays = []
+        for column, field in zip(self.columns, self.schema):
+            convert = _CONVERTERS.get(types[column])
+            values = [row[column] for row in rows]
+            arrays.append(pyarrow.array([convert(v) for v in values] if convert else values, type=field.type))
+        return pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def _writer(self, sink):
+        if self.format == "parquet":
+            return pyarrow.parquet.ParquetWriter(sink, self.schema, compression=settings.export_parquet_compression)
+        return pyarrow.ipc.new_stream(sink, self.schema)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The encoded export, one chunk per record batch (call `prepare()` first)"""
+        if self.watermark is None:
+            await self.prepare()
+        sink = _ChunkSink()
+        writer = self._writer(pyarrow.PythonFile(sink, mode="w"))
+        try:
+            while self.last_id < self.watermark:
+                rows = await self.repository.find_batch(
+                    self.columns, self.last_id, self.watermark, settings.export_batch_rows, self.since
+                )
+                if not rows:
+                    break
+                writer.write_batch(self._record_batch(rows))
+                self.rows += len(rows)
+                self.batches += 1
+                self.last_id = rows[-1]['id']
+                yield sink.drain()
+        finally:
+            writer.close()
+        self.last_id = self.watermark
+        yield sink.drain()
+
+    @property
+    def progress(self) -> float:
+        span = (self.watermark or 0) - self.since_id
+        return (self.last_id - self.since_id) / span if span > 0 else 1.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "table": self.table,
+            "format": self.format,
+            "columns": self.columns,
+            "since_id": self.since_id,
+            "since": self.since.isoformat() if self.since else None,
+            "watermark": self.watermark,
+            "rows": self.rows,
+            "batches": self.batches,
+        }
+
+
+def export_path(name: str) -> Path:
+    """Resolve a file name under `export_dir`, refusing anything that would leave it"""
+    root = Path(settings.export_dir).resolve()
+    path = (root / name).resolve()
+    if root not in path.parents:
+        raise ExportError(f"Export path must stay inside the export directory: {name}")
+    return path
+
+
+async def write_export(export: ColumnarExport, name: Optional[str] = None,
+                       on_batch: Optional[Callable[[ColumnarExport], Any]] = None) -> Dict[str, Any]:
+    """Write an export to a file under `export_dir`; returns its summary with the path and size"""
+    await export.prepare()
+    path = export_path(name or export.filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    try:
+        with open(partial, "wb") as target:
+            async for chunk in export.chunks():
+                target.write(chunk)
+                if on_batch is not None:
+                    await on_batch(export)
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    if settings.enable_debug_logs:
+        print(f"Exported {export.rows} {export.table} rows to {path}")
+    return {**export.summary(), "path": str(path), "bytes": path.stat().st_size}
@@ -0,0 +1,228 @@
+"""Idempotency-Key support for POST requests.
+
+The first request with a given key reserves it in `idempotency_keys`, runs,
+and stores its status, content type and body (zlib-compressed when that
+pays off). Retries with the same key get the stored response back without
+reaching the route, so nothing is queried or written twice. A retry that
+arrives while the first request is still running waits for it: on an
+in-process event when both hit the same worker, otherwise by polling the
+table, and gets 409 if the first request takes longer than
+`idempotency_wait_timeout_ms`. Server errors (5xx), refusals that ask the
+client to come back (401, 403, 408, 409, 425, 429) and responses from
+requests that matched no route are not stored; the key is released so the
+retry runs. Reusing a key for a different request is a 422.
+"""
+import asyncio
+import base64
+import hashlib
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.database import db_manager
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+MAX_KEY_LENGTH = 255
+COMPRESS_MIN_BYTES = 256
+POLL_INTERVAL_S = 0.05
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Not an answer to the request but a "not now" or "not like this": the retry must run
+UNSTORED_STATUSES = frozenset({401, 403, 408, 409, 425, 429})
+
+# Counters shared by every middleware instance (one per app), exposed on the admin router
+idempotency_stats: Dict[str, int] = {"executed": 0, "replayed": 0, "waited": 0, "conflicts": 0}
+
+
+def encode_body(body: bytes) -> Tuple[str, bool]:
+    """Stored form of a response body: (text, compressed)"""
+    if len(body) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(body, 6)
+        if len(packed) * 4 // 3 < len(body):
+            return base64.b64encode(packed).decode("ascii"), True
+    return body.decode("utf-8", errors="surrogateescape"), False
+
+
+def decode_body(stored: Optional[str], compressed: bool) -> bytes:
+    if not stored:
+        return b""
+    if compressed:
+        return zlib.decompress(base64.b64decode(stored))
+    return stored.encode("utf-8", errors="surrogateescape")
+
+
+class IdempotencyMiddleware:
+    """Answers retried POST requests carrying an Idempotency-Key from the stored first response"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.repository = IdempotencyRepository()
+        self._header = settings.idempotency_header.lower().encode("latin-1")
+        # (tenant, key) -> set when the request holding the key in this worker finishes
+        self._in_flight: Dict[Tuple[str, str], asyncio.Event] = {}
+        self.stats = idempotency_stats
+
+    def _key(self, scope: Scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == self._header:
+                return value.decode("latin-1").strip() or None
+        return None
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _fingerprint(scope: Scope, body: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{scope['method']} {scope['path']}?".encode("latin-1"))
+        digest.update(scope.get("query_string", b""))
+        digest.update(b"\0")
+        digest.update(body)
+        return digest.hexdigest()
+
+    async def _wait_for(self, tenant_key: Tuple[str, str], key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Wait for the request holding `key` to store its response"""
+        deadline = time.monotonic() + settings.idempotency_wait_timeout_ms / 1000
+        while True:
+            stored = await self.repository.find(key)
+            if stored is None or stored['status_code'] is not None or stored['fingerprint'] != fingerprint:
+                return stored
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return stored
+            event = self._in_flight.get(tenant_key)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), remaining)
+                else:
+                    await asyncio.sleep(min(POLL_INTERVAL_S, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _replay(self, stored: Dict[str, Any], scope: Scope, receive: Receive, send: Send):
+        self.stats["replayed"] += 1
+        response = Response(
+            decode_body(stored['body'], bool(stored['compressed'])),
+            status_code=stored['status_code'],
+            media_type=stored['content_type'],
+            headers={REPLAYED_HEADER: "true"},
+        )
+        await response(scope, receive, send)
+
+    async def _execute(self, key: str, body: bytes, scope: Scope, receive: Receive, send: Send):
+        """Run the request once and store its response under `key`"""
+        replayed = False
+
+        async def replay_receive() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type: Optional[str] = None
+        chunks: List[bytes] = []
+
+        async def capture_send(message: Message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        self.stats["executed"] += 1
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            # The router sets "endpoint" once a route matched
+            if status_code < 500 and status_code not in UNSTORED_STATUSES and "endpoint" in scope:
+                text, compressed = encode_body(b"".join(chunks))
+                await self.repository.complete(
+                    key, status_code, content_type, text, compressed, settings.idempotency_ttl_s
+                )
+                stored = True
+        finally:
+            if not stored:
+                await self.repository.release(key)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (scope["type"] != "http" or not settings.idempotency_enabled
+                or scope["method"] != "POST" or not scope["path"].startswith("/api/")):
+            await self.app(scope, receive, send)
+            return
+        key = self._key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"{settings.idempotency_header} is too long"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = self._fingerprint(scope, body)
+        tenant_key = (db_manager.current_tenant(), key)
+
+        while not await self.repository.claim(key, fingerprint, settings.idempotency_lock_timeout_s):
+            self.stats["waited"] += 1
+            stored = await self._wait_for(tenant_key, key, fingerprint)
+            if stored is None:
+                # Released by a failed first request (or expired): try to run it ourselves
+                continue
+            if stored['fingerprint'] != fingerprint:
+                self.stats["conflicts"] += 1
+                response = JSONResponse(
+                    {"detail": f"{settings.idempotency_header} was already used for a different request"},
+                    status_code=422,
+                )
+            elif stored['status_code'] is None:
+                self.stats["conflicts"] += 1
+                response = JSONResponse(
+                    {"detail": "A request with this idempotency key is still in progress"},
+                    status_code=409,
+                    headers={"Retry-After": "1"},
+                )
+            else:
+                await self._replay(stored, scope, receive, send)
+                return
+            await response(scope, receive, send)
+            return
+
+        event = self._in_flight[tenant_key] = asyncio.Event()
+        try:
+            await self._execute(key, body, scope, receive, send)
+        finally:
+            event.set()
+            self._in_flight.pop(tenant_key, None)
+
+
+async def purge_expired_keys():
+    """Drop expired idempotency keys for every tenant with an open pool"""
+    repository = IdempotencyRepository()
+    for tenant_id in db_manager.open_tenants():
+        token = db_manager.set_current_tenant(tenant_id)
+        try:
+            await repository.purge_expired()
+        finally:
+            db_manager.reset_current_tenant(token)
+
+
+def get_idempotency_stats() -> Dict[str, Any]:
+    totals: Dict[str, Any] = dict(idempotency_stats)
+    totals["ttl_s"] = settings.idempotency_ttl_s
+    return totals
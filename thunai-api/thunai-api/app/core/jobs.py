@@ -0,0 +1,200 @@
+"""Background job queue backed by the `jobs` table.
+
+Requests submit a job and get its id back immediately; a bounded pool of
+asyncio workers started with the app claims queued jobs (per tenant),
+runs the registered handler and stores its JSON result. Workers poll the
+open tenants plus every tenant a job was submitted to or that existed at
+start, so a tenant whose pool was closed still gets its queue drained. Handlers report
+progress through their `JobContext`, which is also where a cancellation
+requested through the API surfaces. Running jobs send heartbeats, so jobs
+orphaned by a crash or restart are requeued on the next start (or failed
+once they've used up their attempts); jobs interrupted by a clean shutdown
+go straight back to the queue.
+"""
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.database import db_manager
+from app.repositories.job_repository import JobRepository
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class UnknownJobKind(ValueError):
+    pass
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled"""
+
+
+class JobContext:
+    """What a handler gets: its params, plus progress reporting and cancellation checks"""
+
+    def __init__(self, queue: "JobQueue", job: Dict[str, Any]):
+        self._queue = queue
+        self.job_id = job['id']
+        self.kind = job['kind']
+        self.params: Dict[str, Any] = job['params'] or {}
+        self.cancelled = False
+        self.task: Optional[asyncio.Task] = None
+
+    async def report(self, progress: float, message: Optional[str] = None):
+        """Record progress (0..1); raises JobCancelled if the job was cancelled"""
+        progress = min(max(float(progress), 0.0), 1.0)
+        if await self._queue.repository.heartbeat(self.job_id, progress, message):
+            self.cancelled = True
+        self.check()
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+
+class JobQueue:
+    """Bounded worker pool running queued jobs for every open tenant"""
+
+    def __init__(self):
+        self.repository = JobRepository()
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, JobContext] = {}
+        self._recovered: set = set()
+        # Tenants that may have queued jobs even though their pool isn't open
+        self._pending: set = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler):
+        """Make `handler` run jobs of `kind`"""
+        self._handlers[kind] = handler
+
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+
+    async def submit(self, kind: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a job for the current tenant and wake a worker"""
+        if kind not in self._handlers:
+            raise UnknownJobKind(f"Unknown job kind '{kind}'. Available: {', '.join(self.kinds())}")
+        job = await self.repository.create(uuid.uuid4().hex, kind, params or {})
+        self._pending.add(db_manager.current_tenant())
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job, or ask the worker running it to stop"""
+        job = await self.repository.request_cancel(job_id)
+        context = self._running.get(job_id)
+        if context is not None and job and job['cancel_requested']:
+            context.cancelled = True
+            context.task.cancel()
+        return job
+
+    async def _recover(self, tenant_id: str):
+        if tenant_id in self._recovered:
+            return
+        self._recovered.add(tenant_id)
+        recovered = await self.repository.recover_stale(settings.job_stale_after_s, settings.job_max_attempts)
+        if recovered and settings.enable_debug_logs:
+            print(f"Recovered {recovered} orphaned jobs (tenant: {tenant_id})")
+
+    async def _heartbeat(self, context: JobContext, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_interval_s)
+            if await self.repository.heartbeat(context.job_id):
+                context.cancelled = True
+                task.cancel()
+                return
+
+    async def _execute(self, job: Dict[str, Any]):
+        context = JobContext(self, job)
+        self._running[job['id']] = context
+        task = context.task = asyncio.create_task(self._handlers[job['kind']](context), name=f"job:{job['id']}")
+        beat = asyncio.create_task(self._heartbeat(context, task))
+        try:
+            result = await task
+        except (asyncio.CancelledError, JobCancelled):
+            if self._stopping:
+                await self.repository.release(job['id'])
+                raise
+            await self.repository.finish(job['id'], "cancelled")
+        except Exception as e:
+            await self.repository.finish(job['id'], "failed", error=f"{type(e).__name__}: {e}")
+            if settings.enable_debug_logs:
+                print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+        else:
+            await self.repository.finish(job['id'], "succeeded", result=result)
+        finally:
+            beat.cancel()
+            self._running.pop(job['id'], None)
+
+    def _tenants(self) -> List[str]:
+        return list(dict.fromkeys(db_manager.open_tenants() + sorted(self._pending)))
+
+    async def _run_one(self) -> bool:
+        """Run at most one queued job from any tenant that may have one; returns whether one ran"""
+        for tenant_id in self._tenants():
+            token = db_manager.set_current_tenant(tenant_id)
+            try:
+                # Dropped before looking, so a job submitted meanwhile puts the tenant back
+                self._pending.discard(tenant_id)
+                if not db_manager.tenant_exists(tenant_id):
+                    continue
+                await self._recover(tenant_id)
+                job = await self.repository.claim_next(self.kinds())
+                if job is None:
+                    continue
+                self._pending.add(tenant_id)
+                await self._execute(job)
+                return True
+            finally:
+                db_manager.reset_current_tenant(token)
+        return False
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                if await self._run_one():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job worker {index} failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.job_poll_interval_s)
+                self._wake.clear()
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._stopping = False
+        self._wake = asyncio.Event()
+        # Jobs left queued (or orphaned) by an earlier run, in tenants nobody has opened yet
+        self._pending.update(db_manager.list_tenants() if db_manager.dialect == "sqlite" else db_manager.open_tenants())
+        for index in range(max(settings.job_workers, 0)):
+            self._workers.append(asyncio.create_task(self._worker(index), name=f"job-worker:{index}"))
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back to the queue"""
+        self._stopping = True
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._recovered.clear()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "kinds": self.kinds(),
+            "running": sorted(self._running),
+        }
+
+
+jobs = JobQueue()
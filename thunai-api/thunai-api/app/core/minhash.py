@@ -0,0 +1,109 @@
+"""MinHash signatures and an LSH index for near-duplicate text detection.
+
+A text is reduced to its set of character shingles; the MinHash signature
+keeps, for each of `num_perm` hash functions, the smallest hash over that
+set. The fraction of equal signature slots estimates the Jaccard similarity
+of two texts. The LSH index cuts signatures into bands and buckets each band,
+so a lookup only compares against texts that share at least one band instead
+of every text in the index.
+"""
+import random
+import re
+import struct
+import zlib
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SHINGLE_SIZE = 3
+_NORMALIZE = re.compile(r"[^\w\s]+|_")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", _NORMALIZE.sub("", text.lower())).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[bytes]:
+    normalized = normalize(text).encode("utf-8")
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) whose LSH threshold (1/b)^(1/r) is closest to `threshold`"""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHasher:
+    """Computes MinHash signatures with `num_perm` universal hash functions"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [
+            struct.unpack("<I", blake2b(shingle, digest_size=4).digest())[0]
+            for shingle in shingles(text)
+        ]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+
+def estimate_similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+class LSHIndex:
+    """Banded MinHash index over integer keys: a lookup touches one bucket per band"""
+
+    def __init__(self, num_perm: int, threshold: float):
+        self.threshold = threshold
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterable[Tuple[int, int]]:
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, zlib.crc32(struct.pack(f"<{self.rows}I", *chunk))
+
+    def add(self, key: int, signature: Tuple[int, ...]):
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for band, bucket_key in self._band_keys(signature):
+            self._buckets[band].setdefault(bucket_key, []).append(key)
+
+    def query(self, signature: Tuple[int, ...]) -> Optional[Tuple[int, float]]:
+        """Most similar indexed key at or above the threshold, with its estimated similarity"""
+        candidates: Set[int] = set()
+        for band, bucket_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(bucket_key, ()))
+        best: Optional[Tuple[int, float]] = None
+        for key in candidates:
+            similarity = estimate_similarity(signature, self._signatures[key])
+            if similarity < self.threshold:
+                continue
+            # Prefer the most similar, then the oldest key
+            if best is None or (similarity, -key) > (best[1], -best[0]):
+                best = (key, similarity)
+        return best
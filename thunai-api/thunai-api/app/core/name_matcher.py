@@ -0,0 +1,133 @@
+"""Aho-Corasick automaton for finding known names in free text in one pass.
+
+Patterns are normalized name variants ("john doe", "john", "john d") mapped to
+the keys (user ids) they identify. Adding or removing a pattern only touches
+its own trie path; failure links are recomputed lazily before the next scan,
+so updating one user never re-reads the other users. Matches must start and
+end on word boundaries, so "Jo" does not match inside "John".
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+_SEPARATORS = re.compile(r"[\s\-_.]+")
+
+
+def normalize_name(text: str) -> str:
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def name_variants(name: str) -> Set[str]:
+    """Full name, first name, last name and "first l" for a user's display name"""
+    parts = normalize_name(name).split()
+    if not parts:
+        return set()
+    variants = {" ".join(parts), parts[0]}
+    if len(parts) > 1:
+        variants.add(parts[-1])
+        variants.add(f"{parts[0]} {parts[-1][0]}")
+        variants.add(f"{parts[0]} {parts[-1]}")
+    return {variant for variant in variants if len(variant) > 1}
+
+
+class _Node:
+    __slots__ = ("children", "fail", "keys", "output", "depth")
+
+    def __init__(self, depth: int = 0):
+        self.children: Dict[str, "_Node"] = {}
+        self.fail: "_Node" = None
+        # Keys of the pattern ending exactly here
+        self.keys: Set[int] = set()
+        # Nodes on the failure chain (including self) that end a pattern
+        self.output: List["_Node"] = []
+        self.depth = depth
+
+
+class NameAutomaton:
+    """Multi-pattern matcher from name variants to the keys they identify"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._patterns: Dict[str, Set[int]] = {}
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str, key: int):
+        node = self._root
+        for char in pattern:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node(node.depth + 1)
+                self._dirty = True
+            node = child
+        node.keys.add(key)
+        self._patterns.setdefault(pattern, set()).add(key)
+        self._dirty = True
+
+    def remove(self, pattern: str, key: int):
+        keys = self._patterns.get(pattern)
+        if not keys or key not in keys:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._patterns[pattern]
+        node = self._root
+        for char in pattern:
+            node = node.children[char]
+        node.keys.discard(key)
+        self._dirty = True
+
+    def _build_links(self):
+        self._root.fail = self._root
+        self._root.output = []
+        queue = deque()
+        for child in self._root.children.values():
+            child.fail = self._root
+            child.output = [child] if child.keys else []
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in node.children.items():
+                fail = node.fail
+                while fail is not self._root and char not in fail.children:
+                    fail = fail.fail
+                child.fail = fail.children.get(char, self._root)
+                child.output = ([child] if child.keys else []) + child.fail.output
+                queue.append(child)
+        self._dirty = False
+
+    def find(self, text: str) -> List[Tuple[int, int, Set[int]]]:
+        """All (start, end, keys) word-bounded matches in `text`, in order of appearance"""
+        if self._dirty:
+            self._build_links()
+        haystack = text.lower()
+        matches = []
+        node = self._root
+        for index, char in enumerate(haystack):
+            if char in "-_.\t\n\r":
+                char = " "
+            while node is not self._root and char not in node.children:
+                node = node.fail
+            node = node.children.get(char, self._root)
+            for found in node.output:
+                start = index - found.depth + 1
+                end = index + 1
+                if _is_boundary(haystack, start - 1) and _is_boundary(haystack, end):
+                    matches.append((start, end, set(found.keys)))
+        return matches
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+def longest_matches(matches: Iterable[Tuple[int, int, Set[int]]]) -> List[Tuple[int, int, Set[int]]]:
+    """Drop matches contained in a longer overlapping one ("john" inside "john doe")"""
+    result: List[Tuple[int, int, Set[int]]] = []
+    for start, end, keys in sorted(matches, key=lambda m: (m[0], -(m[1] - m[0]))):
+        if result and start < result[-1][1]:
+            continue
+        result.append((start, end, keys))
+    return result
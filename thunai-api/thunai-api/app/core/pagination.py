@@ -0,0 +1,50 @@
+"""Totals for paginated list routes.
+
+List routes send the number of rows matching their filter, ignoring
+`skip`/`limit`, in `X-Total-Count` (plus `X-Total-Count-Estimated: true`
+when the count stopped at `count_estimate_limit`, see app.core.counters).
+With `envelope=true` the body becomes `{"items", "total", "total_exact"}`
+instead, for clients (and batch sub-requests) that don't see headers.
+"""
+from typing import Any, Callable, Optional, Tuple, Type
+from fastapi import Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.core.counters import Total
+from app.core.projection import FieldSelection, select_fields
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+ESTIMATED_HEADER = "X-Total-Count-Estimated"
+
+
+class ListSelection(FieldSelection):
+    """`fields=` of a list request, plus whether the total goes in an envelope"""
+
+    def __init__(self, model: Type[BaseModel], columns: Optional[Tuple[str, ...]], envelope: bool):
+        super().__init__(model, columns)
+        self.envelope = envelope
+
+    def respond(self, result: Any, total: Optional[Total] = None) -> Any:
+        """Return a page of `result` with its total in the headers (or the envelope)"""
+        if total is None:
+            return super().respond(result)
+        headers = {TOTAL_COUNT_HEADER: str(total.value)}
+        if not total.exact:
+            headers[ESTIMATED_HEADER] = "true"
+        items = jsonable_encoder(result)
+        if self.envelope:
+            return JSONResponse({"items": items, "total": total.value, "total_exact": total.exact}, headers=headers)
+        return JSONResponse(items, headers=headers)
+
+
+def list_fields(model: Type[BaseModel]) -> Callable[..., ListSelection]:
+    """Dependency parsing `fields=` and `envelope=` for a list of `model`"""
+
+    def dependency(
+        selection: FieldSelection = Depends(select_fields(model)),
+        envelope: bool = Query(False, description="Wrap the page as {items, total, total_exact}")
+    ) -> ListSelection:
+        return ListSelection(model, selection.columns, envelope)
+
+    return dependency
@@ -0,0 +1,260 @@
+"""Sampling profiler for individual requests.
+
+A request is profiled when an admin adds `?profile=1`, or when it falls in
+the `profile_sample_rate` fraction of API requests. While it runs, a sampler
+thread looks at the request's task every `profile_interval_ms`. If the task
+is running, the sample is the event loop thread's Python stack, trimmed to
+the task's own frames (Pydantic mapping, regexes, JSON encoding). If it is
+suspended, the sample is the chain of coroutines it is waiting in, ending
+with what it waits on, such as the future of an aiosqlite call running on
+its worker thread. Samples are weighted by the time between them, so the
+profile accounts for the request's wall-clock time.
+
+The last `profile_history` profiles of each worker process are kept in
+memory. /api/v1/admin/profiles serves them as collapsed stacks (for
+flamegraph.pl or speedscope) or speedscope JSON. A profiled response names
+its profile in `X-Profile-Id`.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.security import is_admin_key
+
+PROFILE_ID_HEADER = "X-Profile-Id"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+_TRUTHY = {"1", "true", "yes", "on"}
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_STDLIB = os.path.dirname(os.__file__)
+
+# (function, file, first line)
+FrameKey = Tuple[str, str, int]
+
+
+def _short_path(filename: str) -> str:
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(_ROOT):
+        return os.path.relpath(filename, _ROOT)
+    if filename.startswith(_STDLIB):
+        return os.path.relpath(filename, _STDLIB)
+    return filename
+
+
+def _frame_key(frame) -> FrameKey:
+    code = frame.f_code
+    return (code.co_name, _short_path(code.co_filename), code.co_firstlineno)
+
+
+def _awaiting_stack(coro) -> List[FrameKey]:
+    """Frames of a suspended coroutine chain, outermost first, ending with what it waits on"""
+    stack: List[FrameKey] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            stack.append((f"<waiting on {type(coro).__name__}>", "", 0))
+            break
+        stack.append(_frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+class Profile:
+    """Samples of one request: stack -> milliseconds spent in it"""
+
+    def __init__(self, method: str, path: str, task: asyncio.Task, thread_id: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.sample_count = 0
+        self.stacks: Counter = Counter()
+        self._task = task
+        self._thread_id = thread_id
+        self._last_sample = time.perf_counter()
+
+    def sample(self, frames: Dict[int, Any]):
+        """Record where the request is now (called from the sampler thread)"""
+        now = time.perf_counter()
+        elapsed_ms = (now - self._last_sample) * 1000
+        self._last_sample = now
+        coro = self._task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+        if root is None:
+            return
+        stack: List[FrameKey] = []
+        frame = frames.get(self._thread_id)
+        while frame is not None:
+            stack.append(_frame_key(frame))
+            if frame is root:
+                break
+            frame = frame.f_back
+        if frame is root:
+            stack.reverse()
+        else:
+            # Not on the loop thread right now: the task is suspended in an await
+            stack = _awaiting_stack(coro)
+        self.stacks[tuple(stack)] += elapsed_ms
+        self.sample_count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "samples": self.sample_count,
+        }
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ("frame;frame;frame microseconds" per line)"""
+        lines = []
+        for stack, weight_ms in sorted(self.stacks.items()):
+            frames = ";".join(f"{name} ({path}:{line})" if path else name for name, path, line in stack)
+            lines.append(f"{frames} {max(int(weight_ms * 1000), 1)}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """The profile in speedscope's file format (one sampled profile)"""
+        frame_index: Dict[FrameKey, int] = {}
+        samples, weights = [], []
+        for stack, weight_ms in self.stacks.items():
+            samples.append([frame_index.setdefault(key, len(frame_index)) for key in stack])
+            weights.append(round(weight_ms, 3))
+        title = f"{self.method} {self.path}"
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": title,
+            "exporter": settings.app_name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": [
+                {"name": name, "file": path, "line": line} if path else {"name": name}
+                for name, path, line in frame_index
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": title,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class RequestProfiler:
+    """Runs the sampler thread while any request is being profiled and keeps finished profiles"""
+
+    def __init__(self):
+        self.history: Deque[Profile] = deque(maxlen=settings.profile_history)
+        self._active: Dict[str, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, method: str, path: str) -> Profile:
+        """Start profiling the current task (call from the event loop thread)"""
+        profile = Profile(method, path, asyncio.current_task(), threading.get_ident())
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def finish(self, profile: Profile, status_code: Optional[int]):
+        with self._lock:
+            self._active.pop(profile.id, None)
+        profile.duration_ms = (time.time() - profile.started_at) * 1000
+        profile.status_code = status_code
+        self.history.append(profile)
+
+    def _sample(self):
+        interval = max(settings.profile_interval_ms, 0.5) / 1000
+        while True:
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in active:
+                profile.sample(frames)
+            del frames
+            time.sleep(interval)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        for profile in self.history:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def recent(self) -> List[Dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self.history)]
+
+
+profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """Profiles API requests asked for with ?profile=1 (admins only) or picked by the sample rate"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return any(value.lower() in _TRUTHY for value in query.get(settings.profile_query_param, []))
+
+    @staticmethod
+    def _admin_key(scope: Scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"x-admin-key":
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.profiling_enabled or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        if self._requested(scope):
+            if not is_admin_key(self._admin_key(scope)):
+                response = JSONResponse({"detail": "Admin key required to profile a request"}, status_code=403)
+                await response(scope, receive, send)
+                return
+        elif not (settings.profile_sample_rate and random.random() < settings.profile_sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(scope["method"], scope["path"])
+        status_code: Optional[int] = None
+
+        async def send_with_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.lower().encode("latin-1"), profile.id.encode("latin-1")),
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.finish(profile, status_code)
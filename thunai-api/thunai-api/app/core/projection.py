@@ -0,0 +1,74 @@
+"""Column projection for the `fields=` query parameter.
+
+`fields=id,moment_date` is checked against the endpoint's response schema,
+passed down to the repository as the SELECT list, and the response is
+validated with a schema narrowed to those fields, so both the rows read and
+the JSON sent shrink. `id` is always included. Without `fields` endpoints
+behave exactly as before.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+
+KEY_FIELD = "id"
+
+
+def select_list(fields: Optional[Sequence[str]], alias: Optional[str] = None) -> str:
+    """SELECT list for `fields` (all columns when None), optionally qualified by a table alias"""
+    prefix = f"{alias}." if alias else ""
+    if not fields:
+        return f"{prefix}*"
+    for field in fields:
+        # Fields are whitelisted against the schemas before they get here; never interpolate anything else
+        if not field.isidentifier():
+            raise ValueError(f"Invalid column name: {field!r}")
+    return ", ".join(f"{prefix}{field}" for field in fields)
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """`model` restricted to `fields`, with the same types and defaults"""
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields},
+    )
+
+
+class FieldSelection:
+    """The validated `fields=` of one request; `columns` is None when all fields are wanted"""
+
+    def __init__(self, model: Type[BaseModel], columns: Optional[Tuple[str, ...]]):
+        self.model = model
+        self.columns = columns
+
+    def respond(self, result: Any) -> Any:
+        """Return `result` as the endpoint's response, bypassing the full response schema when projected"""
+        if self.columns is None:
+            return result
+        return JSONResponse(jsonable_encoder(result))
+
+
+def select_fields(model: Type[BaseModel]) -> Callable[..., FieldSelection]:
+    """Dependency parsing `fields=` against the fields of `model`"""
+    allowed = tuple(model.model_fields)
+
+    def dependency(
+        fields: Optional[str] = Query(None, description=f"Comma-separated fields to return: {', '.join(allowed)}")
+    ) -> FieldSelection:
+        if not fields:
+            return FieldSelection(model, None)
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}"
+            )
+        if KEY_FIELD in allowed:
+            requested.insert(0, KEY_FIELD)
+        return FieldSelection(model, tuple(dict.fromkeys(requested)))
+
+    return dependency
@@ -0,0 +1,94 @@
+"""Scores kept in rank order: a skip list ordered by (score desc, subject asc).
+
+Changing a subject's score is O(log n) expected (one unlink, one insert) and
+reading the top k is a walk along the bottom level, O(k). Subjects whose
+score drops to zero leave the ranking.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+MAX_LEVEL = 24
+LEVEL_PROBABILITY = 0.25
+
+
+class _Node:
+    __slots__ = ("key", "forward")
+
+    def __init__(self, key: Optional[Tuple[int, str]], level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+
+
+class RankedScores:
+    """Per-subject scores with O(log n) updates and O(k) top-k reads"""
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._level = 1
+        self._scores: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def score(self, subject: str) -> int:
+        return self._scores.get(subject, 0)
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < MAX_LEVEL and random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def _predecessors(self, key: Tuple[int, str]) -> List[_Node]:
+        update = [self._head] * MAX_LEVEL
+        node = self._head
+        for level in range(self._level - 1, -1, -1):
+            while node.forward[level] is not None and node.forward[level].key < key:
+                node = node.forward[level]
+            update[level] = node
+        return update
+
+    def _unlink(self, key: Tuple[int, str]):
+        update = self._predecessors(key)
+        target = update[0].forward[0]
+        if target is None or target.key != key:
+            return
+        for level in range(len(target.forward)):
+            if update[level].forward[level] is target:
+                update[level].forward[level] = target.forward[level]
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+
+    def _link(self, key: Tuple[int, str]):
+        update = self._predecessors(key)
+        level = self._random_level()
+        if level > self._level:
+            self._level = level
+        node = _Node(key, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+
+    def add(self, subject: str, delta: int):
+        """Change a subject's score by `delta`"""
+        if not delta:
+            return
+        old = self._scores.get(subject, 0)
+        new = old + delta
+        if old > 0:
+            self._unlink((-old, subject))
+        if new > 0:
+            self._scores[subject] = new
+            self._link((-new, subject))
+        else:
+            self._scores.pop(subject, None)
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """The `k` highest (subject, score) pairs, ties broken by subject"""
+        result = []
+        node = self._head.forward[0]
+        while node is not None and len(result) < k:
+            result.append((node.key[1], -node.key[0]))
+            node = node.forward[0]
+        return result
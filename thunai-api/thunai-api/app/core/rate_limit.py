@@ -0,0 +1,194 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Sequence, Tuple
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_TRACKED_BUCKETS = 10000
+# Scope entry naming the admission controller and client that admitted a request
+ADMISSION_SCOPE_KEY = "thunai.admission"
+# Admitted by the calls it carries once its body is parsed, not by its own method
+BATCH_PATH = "/api/v1/batch"
+
+# Counters shared by every middleware instance (one per app), exposed on the admin router
+admission_stats: Dict[str, int] = {
+    "admitted": 0,
+    "rejected_rate_limit": 0,
+    "rejected_write_concurrency": 0,
+    "writes_in_flight": 0,
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when the calls a request carries are not admitted"""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` stored"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, count: int = 1) -> Tuple[bool, float]:
+        """Take `count` tokens; returns (allowed, seconds until they are available).
+
+        More than `burst` tokens are admitted once the bucket is full and
+        leave it in debt, so the client waits for all of them before its next request.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(count, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= count
+            return True, 0.0
+        return False, (needed - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class AdmissionControlMiddleware:
+    """Sheds load before it reaches the single SQLite writer.
+
+    Every API request takes a token from its client's bucket for the route
+    class (read or write). Clients are keyed on their peer address, or on
+    the client header when the peer is a trusted proxy. Write requests must
+    also get one of `max_concurrent_writes` slots within
+    `write_admission_timeout_ms`. Rejected requests get 429 with Retry-After
+    instead of queueing. A batch is charged per call it carries, and holds a
+    write slot only if one of them writes (see `admit_requests`).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._client_header = settings.rate_limit_client_header.lower().encode("latin-1")
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._write_slots = asyncio.Semaphore(settings.max_concurrent_writes)
+        self.stats = admission_stats
+
+    def _client_key(self, scope: Scope) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if peer in settings.rate_limit_trusted_proxies:
+            for name, value in scope.get("headers", []):
+                if name == self._client_header:
+                    return value.decode("latin-1")
+        return peer
+
+    def _bucket(self, client: str, route_class: str) -> TokenBucket:
+        key = (client, route_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if route_class == "write":
+                bucket = TokenBucket(settings.rate_limit_write_per_second, settings.rate_limit_write_burst)
+            else:
+                bucket = TokenBucket(settings.rate_limit_read_per_second, settings.rate_limit_read_burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > MAX_TRACKED_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, detail: str, retry_after: float):
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (scope["type"] != "http" or not settings.rate_limit_enabled
+                or not scope["path"].startswith("/api/")):
+            await self.app(scope, receive, send)
+            return
+
+        client = self._client_key(scope)
+        scope[ADMISSION_SCOPE_KEY] = (self, client)
+        if scope["method"] == "POST" and scope["path"].rstrip("/") == BATCH_PATH:
+            await self.app(scope, receive, send)
+            return
+        try:
+            async with self.admit(client, [scope["method"]]):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as rejected:
+            await self._reject(scope, receive, send, rejected.detail, rejected.retry_after)
+
+    def charge(self, client: str, methods: Sequence[str]) -> Tuple[bool, float]:
+        """Take one token per request method from the client's buckets, all or none"""
+        counts: Dict[str, int] = {}
+        for method in methods:
+            route_class = "write" if method.upper() in WRITE_METHODS else "read"
+            counts[route_class] = counts.get(route_class, 0) + 1
+        taken = []
+        for route_class, count in counts.items():
+            bucket = self._bucket(client, route_class)
+            allowed, retry_after = bucket.take(count)
+            if not allowed:
+                for earlier, earlier_count in taken:
+                    earlier.tokens += earlier_count
+                self.stats["rejected_rate_limit"] += 1
+                return False, retry_after
+            taken.append((bucket, count))
+        return True, 0.0
+
+    @asynccontextmanager
+    async def admit(self, client: str, methods: Sequence[str]):
+        """Charge `methods` to the client and hold a write slot while any of them writes"""
+        allowed, retry_after = self.charge(client, methods)
+        if not allowed:
+            raise AdmissionRejected("Rate limit exceeded", retry_after)
+        if not any(method.upper() in WRITE_METHODS for method in methods):
+            self.stats["admitted"] += 1
+            yield
+            return
+
+        try:
+            await asyncio.wait_for(self._write_slots.acquire(), settings.write_admission_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            self.stats["rejected_write_concurrency"] += 1
+            raise AdmissionRejected("Too many concurrent writes", 1)
+        self.stats["admitted"] += 1
+        self.stats["writes_in_flight"] += 1
+        try:
+            yield
+        finally:
+            self.stats["writes_in_flight"] -= 1
+            self._write_slots.release()
+
+
+@asynccontextmanager
+async def admit_requests(scope: Scope, methods: Sequence[str]):
+    """Admit the calls a request (e.g. a batch) carries on behalf of the client that sent it"""
+    admission: Optional[Tuple[AdmissionControlMiddleware, str]] = scope.get(ADMISSION_SCOPE_KEY)
+    if admission is None:
+        yield
+        return
+    controller, client = admission
+    async with controller.admit(client, methods):
+        yield
+
+
+def get_admission_stats() -> Dict[str, Any]:
+    totals: Dict[str, Any] = dict(admission_stats)
+    totals["limits"] = {
+        "read_per_second": settings.rate_limit_read_per_second,
+        "read_burst": settings.rate_limit_read_burst,
+        "write_per_second": settings.rate_limit_write_per_second,
+        "write_burst": settings.rate_limit_write_burst,
+        "max_concurrent_writes": settings.max_concurrent_writes,
+    }
+    return totals
@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+from app.core.config import settings
+
+
+def local_now() -> datetime:
+    """Current time in the configured timezone"""
+    return datetime.now(ZoneInfo(settings.timezone))
+
+
+def seconds_until(at: time, now: Optional[datetime] = None) -> float:
+    """Seconds from `now` until the next occurrence of wall-clock time `at`"""
+    now = now or local_now()
+    target = now.replace(hour=at.hour, minute=at.minute, second=at.second, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class BackgroundScheduler:
+    """Runs periodic coroutines as asyncio tasks for the lifetime of the app"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def daily(self, name: str, at: time, func: Callable[[], Awaitable[None]]):
+        """Run `func` every day at `at` in the configured timezone"""
+        self._jobs[name] = {"name": name, "delay": lambda: seconds_until(at), "func": func}
+
+    def every(self, name: str, seconds: float, func: Callable[[], Awaitable[None]]):
+        """Run `func` every `seconds` seconds"""
+        self._jobs[name] = {"name": name, "delay": lambda: seconds, "func": func}
+
+    async def _run(self, job: Dict):
+        while True:
+            await asyncio.sleep(job["delay"]())
+            try:
+                await job["func"]()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Scheduled job '{job['name']}' failed: {e}")
+
+    def start(self):
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._run(job), name=f"scheduler:{job['name']}"))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+scheduler = BackgroundScheduler()
@@ -0,0 +1,223 @@
+"""Database schemas used to provision new databases (tenants, test templates, PostgreSQL)."""
+
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    teams_user_id TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT,
+    is_admin BOOLEAN DEFAULT FALSE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS moments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    person_name TEXT NOT NULL,
+    moment_type TEXT NOT NULL CHECK (moment_type IN ('birthday', 'work_anniversary', 'lwd', 'promotion', 'new_hire', 'achievement', 'other')),
+    moment_date DATE NOT NULL,
+    description TEXT,
+    created_by TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT TRUE,
+    notification_sent BOOLEAN DEFAULT FALSE,
+    tags TEXT,
+    user_id INTEGER REFERENCES users(id),
+    FOREIGN KEY (created_by) REFERENCES users(teams_user_id)
+);
+
+CREATE TABLE IF NOT EXISTS greetings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    moment_type TEXT NOT NULL,
+    greeting_text TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    moment_id INTEGER REFERENCES moments(id),
+    user_id TEXT REFERENCES users(teams_user_id),
+    greeting_from_name TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_moments_date ON moments(moment_date);
+CREATE INDEX IF NOT EXISTS idx_moments_type ON moments(moment_type);
+CREATE INDEX IF NOT EXISTS idx_moments_person ON moments(person_name);
+CREATE INDEX IF NOT EXISTS idx_moments_active ON moments(is_active);
+CREATE INDEX IF NOT EXISTS idx_users_teams_id ON users(teams_user_id);
+CREATE INDEX IF NOT EXISTS idx_users_admin ON users(is_admin);
+CREATE INDEX IF NOT EXISTS idx_greetings_type ON greetings(moment_type);
+CREATE INDEX IF NOT EXISTS idx_greetings_active ON greetings(is_active);
+
+CREATE TRIGGER IF NOT EXISTS update_moments_timestamp
+    AFTER UPDATE ON moments
+BEGIN
+    UPDATE moments SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_users_timestamp
+    AFTER UPDATE ON users
+BEGIN
+    UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+"""
+
+# Tables and indexes added after the original schema; applied to existing databases on startup
+SCHEMA_UPGRADES = [
+    "CREATE INDEX IF NOT EXISTS idx_greetings_moment ON greetings(moment_id, created_at)",
+    # Moment search: an equality filter plus ORDER BY moment_date, id reads in index order
+    "CREATE INDEX IF NOT EXISTS idx_moments_type_date ON moments(moment_type, moment_date)",
+    "CREATE INDEX IF NOT EXISTS idx_moments_active_date ON moments(is_active, moment_date)",
+    "CREATE INDEX IF NOT EXISTS idx_moments_person_date ON moments(person_name, moment_date)",
+    # Probe for "has this user greeted this moment" (duplicate check, inbox anti-join)
+    "CREATE INDEX IF NOT EXISTS idx_greetings_moment_user ON greetings(moment_id, user_id)",
+    # Precomputed notification digest: one JSON payload per moment due on digest_date
+    """CREATE TABLE IF NOT EXISTS notification_digest (
+        digest_date DATE NOT NULL,
+        moment_id INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        PRIMARY KEY (digest_date, moment_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS notification_digest_builds (
+        digest_date DATE PRIMARY KEY,
+        moment_count INTEGER NOT NULL,
+        built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # One row per archival run; finished moments before cutoff_date may live in the archive database
+    """CREATE TABLE IF NOT EXISTS archive_runs (
+        started_at TIMESTAMP NOT NULL,
+        cutoff_date DATE NOT NULL,
+        moments_moved INTEGER NOT NULL,
+        greetings_moved INTEGER NOT NULL,
+        finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Outcome of each maintenance task (ANALYZE, PRAGMA optimize, checkpoint, vacuum) per run
+    """CREATE TABLE IF NOT EXISTS maintenance_runs (
+        run_id TEXT NOT NULL,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL,
+        duration_ms REAL NOT NULL,
+        detail TEXT,
+        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Near-duplicate greetings found by the MinHash index, linked to the greeting they resemble
+    """CREATE TABLE IF NOT EXISTS greeting_duplicates (
+        moment_id INTEGER NOT NULL,
+        greeting_id INTEGER,
+        duplicate_of INTEGER NOT NULL,
+        similarity REAL NOT NULL,
+        action TEXT NOT NULL,
+        user_id TEXT,
+        greeting_text TEXT NOT NULL,
+        detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_greeting_duplicates_moment ON greeting_duplicates(moment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_greeting_duplicates_greeting ON greeting_duplicates(greeting_id)",
+    # Background jobs; params/result are JSON, heartbeat_at lets a restarted app requeue orphaned jobs
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        params TEXT,
+        progress REAL NOT NULL DEFAULT 0,
+        progress_message TEXT,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+        created_at TIMESTAMP NOT NULL,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        heartbeat_at TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)",
+    # Stored first responses for Idempotency-Key retries; status_code is NULL while the request runs
+    """CREATE TABLE IF NOT EXISTS idempotency_keys (
+        idempotency_key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        status_code INTEGER,
+        content_type TEXT,
+        body TEXT,
+        compressed BOOLEAN NOT NULL DEFAULT FALSE,
+        expires_at TIMESTAMP NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at)",
+    # Recognition leaderboards: score per metric, day and subject, folded from source rows up to last_id
+    """CREATE TABLE IF NOT EXISTS leaderboard_buckets (
+        metric TEXT NOT NULL,
+        day DATE NOT NULL,
+        subject TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        PRIMARY KEY (metric, day, subject)
+    )""",
+    """CREATE TABLE IF NOT EXISTS leaderboard_watermarks (
+        metric TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )""",
+    # Scheduled backups claimed once per day, so only one worker process takes them
+    """CREATE TABLE IF NOT EXISTS backup_runs (
+        run_date TEXT PRIMARY KEY,
+        claimed_by TEXT NOT NULL,
+        claimed_at TIMESTAMP NOT NULL
+    )""",
+]
+
+# Same tables for the PostgreSQL backend (requires PostgreSQL 14+ for CREATE OR REPLACE TRIGGER)
+POSTGRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    teams_user_id TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT,
+    is_admin BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS moments (
+    id SERIAL PRIMARY KEY,
+    person_name TEXT NOT NULL,
+    moment_type TEXT NOT NULL CHECK (moment_type IN ('birthday', 'work_anniversary', 'lwd', 'promotion', 'new_hire', 'achievement', 'other')),
+    moment_date DATE NOT NULL,
+    description TEXT,
+    created_by TEXT REFERENCES users(teams_user_id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT TRUE,
+    notification_sent BOOLEAN DEFAULT FALSE,
+    tags TEXT,
+    user_id INTEGER REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS greetings (
+    id SERIAL PRIMARY KEY,
+    moment_type TEXT NOT NULL,
+    greeting_text TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    moment_id INTEGER REFERENCES moments(id),
+    user_id TEXT,
+    greeting_from_name TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_moments_date ON moments(moment_date);
+CREATE INDEX IF NOT EXISTS idx_moments_type ON moments(moment_type);
+CREATE INDEX IF NOT EXISTS idx_moments_person ON moments(person_name);
+CREATE INDEX IF NOT EXISTS idx_moments_active ON moments(is_active);
+CREATE INDEX IF NOT EXISTS idx_users_admin ON users(is_admin);
+CREATE INDEX IF NOT EXISTS idx_greetings_type ON greetings(moment_type);
+CREATE INDEX IF NOT EXISTS idx_greetings_active ON greetings(is_active);
+
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER update_moments_timestamp
+    BEFORE UPDATE ON moments
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE OR REPLACE TRIGGER update_users_timestamp
+    BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+"""
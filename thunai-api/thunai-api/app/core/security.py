@@ -0,0 +1,22 @@
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.core.config import settings
+
+
+def is_admin_key(x_admin_key: Optional[str]) -> bool:
+    """Whether `x_admin_key` grants admin access (never, when no admin key is configured, unless auth is disabled)"""
+    if not settings.admin_api_key:
+        return settings.admin_auth_disabled
+    return bool(x_admin_key) and secrets.compare_digest(x_admin_key, settings.admin_api_key)
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Guard admin endpoints with the configured admin API key"""
+    if not settings.admin_api_key and not settings.admin_auth_disabled:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled: set ADMIN_API_KEY (or ADMIN_AUTH_DISABLED=true for development)"
+        )
+    if not is_admin_key(x_admin_key):
+        raise HTTPException(status_code=403, detail="Admin key required")
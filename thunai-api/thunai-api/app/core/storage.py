@@ -0,0 +1,318 @@
+"""Backend-neutral connection API used by the repositories.
+
+Repositories write `?` placeholders and portable SQL; each connection class
+adapts them to its driver. The SQLite implementation wraps aiosqlite, the
+PostgreSQL implementation wraps asyncpg.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+import sqlite3
+import aiosqlite
+
+POSTGRES_SCHEMES = ("postgresql://", "postgres://")
+SQLITE_SCHEME = "sqlite:///"
+SQLITE_URI_PREFIX = "file:"
+
+
+def is_postgres_url(url: str) -> bool:
+    return url.startswith(POSTGRES_SCHEMES)
+
+
+def sqlite_path_from_url(url: str) -> str:
+    return url[len(SQLITE_SCHEME):] if url.startswith(SQLITE_SCHEME) else url
+
+
+def memory_database_uri(name: str) -> str:
+    """URI of a named in-memory database shared by the connections of this process"""
+    if sqlite3.sqlite_version_info >= (3, 36, 0):
+        # memdb keeps regular file locking, so busy_timeout applies; a shared
+        # cache fails concurrent readers immediately with SQLITE_LOCKED
+        return f"file:/{name}?vfs=memdb"
+    return f"file:{name}?mode=memory&cache=shared"
+
+
+@lru_cache(maxsize=1)
+def integrity_errors() -> tuple:
+    """Exception types raised for a violated UNIQUE, NOT NULL or foreign key constraint"""
+    try:
+        import asyncpg
+    except ImportError:
+        return (sqlite3.IntegrityError,)
+    return (sqlite3.IntegrityError, asyncpg.IntegrityConstraintViolationError)
+
+
+def connect_sqlite(path: str) -> aiosqlite.Connection:
+    """Open an aiosqlite connection to a file path or a `file:` URI"""
+    return aiosqlite.connect(path, uri=path.startswith(SQLITE_URI_PREFIX))
+
+
+class StorageConnection(ABC):
+    """A single checked-out database connection"""
+
+    dialect: str = ""
+
+    @abstractmethod
+    async def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def fetch_value(self, query: str, params: Sequence[Any] = ()) -> Any:
+        pass
+
+    @abstractmethod
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        """Run a write statement and return the number of affected rows"""
+
+    @abstractmethod
+    async def insert(self, query: str, params: Sequence[Any] = ()) -> int:
+        """Run an INSERT and return the new row id"""
+
+    @abstractmethod
+    async def commit(self):
+        pass
+
+    @abstractmethod
+    async def rollback(self):
+        pass
+
+    @property
+    @abstractmethod
+    def in_transaction(self) -> bool:
+        pass
+
+
+class SharedTransactionConnection(StorageConnection):
+    """A connection shared by several repository calls inside one transaction.
+
+    Repositories commit after their own writes as usual; here those commits
+    are deferred until the owner of the transaction commits, and a rollback
+    only marks the transaction as failed. Hooks added with `after_commit`
+    run once the owner committed and are dropped if it rolls back.
+    """
+
+    def __init__(self, connection: StorageConnection):
+        self.raw = connection
+        self.dialect = connection.dialect
+        self.rollback_only = False
+        self.after_commit_hooks: List[Callable[[], Awaitable[Any]]] = []
+
+    def after_commit(self, hook: Callable[[], Awaitable[Any]]):
+        self.after_commit_hooks.append(hook)
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        return await self.raw.fetch_all(query, params)
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        return await self.raw.fetch_one(query, params)
+
+    async def fetch_value(self, query: str, params: Sequence[Any] = ()) -> Any:
+        return await self.raw.fetch_value(query, params)
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        return await self.raw.execute(query, params)
+
+    async def insert(self, query: str, params: Sequence[Any] = ()) -> int:
+        return await self.raw.insert(query, params)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        self.rollback_only = True
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.in_transaction
+
+
+class SQLiteConnection(StorageConnection):
+    dialect = "sqlite"
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self.raw = connection
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        cursor = await self.raw.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return [dict(row) for row in rows]
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        cursor = await self.raw.execute(query, tuple(params))
+        row = await cursor.fetchone()
+        await cursor.close()
+        return dict(row) if row else None
+
+    async def fetch_value(self, query: str, params: Sequence[Any] = ()) -> Any:
+        cursor = await self.raw.execute(query, tuple(params))
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row[0] if row else None
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        cursor = await self.raw.execute(query, tuple(params))
+        await cursor.close()
+        return cursor.rowcount
+
+    async def insert(self, query: str, params: Sequence[Any] = ()) -> int:
+        cursor = await self.raw.execute(query, tuple(params))
+        await cursor.close()
+        return cursor.lastrowid
+
+    async def commit(self):
+        await self.raw.commit()
+
+    async def rollback(self):
+        await self.raw.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.in_transaction
+
+
+@lru_cache(maxsize=512)
+def to_postgres_placeholders(query: str) -> str:
+    """Rewrite `?` placeholders as `$1..$n`, leaving quoted literals alone"""
+    parts = []
+    index = 0
+    quote = None
+    for char in query:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "?":
+            index += 1
+            parts.append(f"${index}")
+            continue
+        parts.append(char)
+    return "".join(parts)
+
+
+def _normalize_postgres_value(value: Any) -> Any:
+    # Match SQLite's CURRENT_TIMESTAMP text so response models stay unchanged
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+class PostgresConnection(StorageConnection):
+    """asyncpg connection with SQLite-like implicit transactions.
+
+    Reads run in autocommit mode; the first write opens a transaction that
+    lives until `commit()` or `rollback()`. asyncpg prepares every statement
+    and keeps it in the per-connection statement cache, so repeated
+    repository queries skip parsing and planning.
+    """
+
+    dialect = "postgresql"
+
+    def __init__(self, connection):
+        self.raw = connection
+        self._transaction = None
+
+    @staticmethod
+    def _row(record) -> Dict[str, Any]:
+        return {key: _normalize_postgres_value(value) for key, value in record.items()}
+
+    async def _begin(self):
+        if self._transaction is None:
+            self._transaction = self.raw.transaction()
+            await self._transaction.start()
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        records = await self.raw.fetch(to_postgres_placeholders(query), *params)
+        return [self._row(record) for record in records]
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        record = await self.raw.fetchrow(to_postgres_placeholders(query), *params)
+        return self._row(record) if record else None
+
+    async def fetch_value(self, query: str, params: Sequence[Any] = ()) -> Any:
+        return _normalize_postgres_value(await self.raw.fetchval(to_postgres_placeholders(query), *params))
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        await self._begin()
+        status = await self.raw.execute(to_postgres_placeholders(query), *params)
+        count = status.rsplit(" ", 1)[-1] if status else ""
+        return int(count) if count.isdigit() else 0
+
+    async def insert(self, query: str, params: Sequence[Any] = ()) -> int:
+        await self._begin()
+        return await self.raw.fetchval(to_postgres_placeholders(query) + " RETURNING id", *params)
+
+    async def commit(self):
+        if self._transaction is not None:
+            transaction, self._transaction = self._transaction, None
+            await transaction.commit()
+
+    async def rollback(self):
+        if self._transaction is not None:
+            transaction, self._transaction = self._transaction, None
+            await transaction.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction is not None
+
+
+class PostgresBackend:
+    """asyncpg connection pool for a PostgreSQL `database_url`"""
+
+    def __init__(self, dsn: str, min_size: int, max_size: int, statement_cache_size: int):
+        self.dsn = dsn
+        self._min_size = min_size
+        self._max_size = max_size
+        self._statement_cache_size = statement_cache_size
+        self._pool = None
+
+    async def open(self, schema: Optional[str] = None):
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("PostgreSQL backend requires the 'asyncpg' package (pip install asyncpg)")
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self._min_size,
+            max_size=self._max_size,
+            statement_cache_size=self._statement_cache_size,
+        )
+        if schema:
+            async with self._pool.acquire() as connection:
+                await connection.execute(schema)
+
+    async def close(self):
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {"open": False}
+        return {
+            "open": True,
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+            "max_size": self._pool.get_max_size(),
+        }
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._pool is None:
+            raise RuntimeError("PostgreSQL pool is not open")
+        async with self._pool.acquire() as raw:
+            connection = PostgresConnection(raw)
+            try:
+                yield connection
+            finally:
+                if connection.in_transaction:
+                    await connection.rollback()
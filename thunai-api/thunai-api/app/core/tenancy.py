@@ -0,0 +1,43 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.database import db_manager, DEFAULT_TENANT
+
+
+class TenantMiddleware:
+    """Routes each request to its tenant database using the tenant header.
+
+    Requests without the header use the default database, so single-tenant
+    clients keep working unchanged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._header = settings.tenant_header.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.multi_tenant_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        tenant_id = DEFAULT_TENANT
+        for name, value in scope.get("headers", []):
+            if name == self._header:
+                tenant_id = value.decode("latin-1").strip() or DEFAULT_TENANT
+                break
+
+        if not db_manager.is_valid_tenant_id(tenant_id):
+            response = JSONResponse({"detail": f"Invalid tenant id: {tenant_id}"}, status_code=400)
+            await response(scope, receive, send)
+            return
+        if not settings.tenant_auto_provision and not db_manager.tenant_exists(tenant_id):
+            response = JSONResponse({"detail": f"Tenant '{tenant_id}' is not provisioned"}, status_code=404)
+            await response(scope, receive, send)
+            return
+
+        db_manager.metrics_for(tenant_id).requests += 1
+        token = db_manager.set_current_tenant(tenant_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            db_manager.reset_current_tenant(token)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import date
 
 
@@ -83,6 +83,18 @@ class PaginationParams(BaseModel):
 # MOMENTS MODULE SCHEMAS
 # =====================================================
 
+# Greeting prompt category (welcome/celebration/farewell) for each moment type
+MOMENT_CATEGORIES = {
+    'new_hire': 'welcome',
+    'birthday': 'celebration',
+    'work_anniversary': 'celebration',
+    'promotion': 'celebration',
+    'achievement': 'celebration',
+    'other': 'celebration',
+    'lwd': 'farewell',
+}
+
+
 class MomentCreate(BaseModel):
     person_name: str  # Must match a user.name from users table
     moment_type: str  # 'birthday', 'work_anniversary', 'lwd', 'promotion', 'new_hire', 'achievement', 'other'
@@ -117,6 +129,25 @@ class MomentResponse(BaseModel):
         from_attributes = True
 
 
+class NotificationDigestEntry(MomentResponse):
+    celebrant_name: Optional[str] = None
+    celebrant_teams_id: Optional[str] = None
+    category: str  # Greeting prompt category
+
+
+class UserInbox(BaseModel):
+    teams_user_id: str
+    name: str
+    moment_ids: List[int]  # Pending moments, soonest first
+
+
+class InboxBatchResponse(BaseModel):
+    start_date: date
+    end_date: date
+    moments: List[MomentResponse]  # Every moment pending for at least one user, once
+    inboxes: List[UserInbox]  # Only users with something pending
+
+
 class GreetingCreate(BaseModel):
     moment_id: int
     user_id: str  # teams_user_id from users table
@@ -134,4 +165,76 @@ class GreetingResponse(BaseModel):
     created_at: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class GreetingCreateResponse(GreetingResponse):
+    # The greeting this one was collapsed into as a near-duplicate (GREETING_DEDUP_MODE=collapse)
+    duplicate_of: Optional[int] = None
+
+
+class MomentDetailResponse(BaseModel):
+    moment: MomentResponse
+    celebrant: Optional[UserResponse]
+    greeting_count: int
+    greetings: List[GreetingResponse]  # First page, oldest first
+
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed or cancelled
+    params: Optional[Dict[str, Any]] = None
+    progress: float
+    progress_message: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    cancel_requested: bool
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    heartbeat_at: Optional[str] = None
+
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None  # Echoed back in the result; defaults to the position
+    method: str = "GET"
+    path: str  # e.g. "/users/teams/abc" or "/api/v1/users/teams/abc", may include a query string
+    query: Optional[Dict[str, Any]] = None
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+    transactional: bool = False  # Run in order on one connection, all or nothing
+
+
+class BatchSubResponse(BaseModel):
+    id: str
+    status: int
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    transactional: bool
+    committed: Optional[bool] = None  # Only set for transactional batches
+    results: List[BatchSubResponse]
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    subject: str  # users.id for accolades, teams_user_id for greetings_sent, person_name for greetings_received
+    name: Optional[str] = None
+    score: int
+
+
+class LeaderboardResponse(BaseModel):
+    metric: str
+    window: str  # e.g. "30d" (the last 30 days, today included) or "all"
+    entries: List[LeaderboardEntry]
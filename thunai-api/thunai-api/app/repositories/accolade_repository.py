@@ -1,22 +1,27 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 from app.repositories.base import BaseRepository
 from app.core.database import db_manager
+from app.core.counters import Total
 
 
 class AccoladeRepository(BaseRepository):
     def __init__(self):
         super().__init__("accolades")
     
-    async def find_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        query = "SELECT * FROM accolades WHERE user_id = ? ORDER BY achieved_date DESC LIMIT ? OFFSET ?"
+    async def find_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100,
+                              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM accolades WHERE user_id = ? ORDER BY achieved_date DESC LIMIT ? OFFSET ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (user_id, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            return await conn.fetch_all(query, (user_id, limit, skip))
     
-    async def find_by_type(self, accolade_type: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        query = "SELECT * FROM accolades WHERE accolade_type = ? ORDER BY achieved_date DESC LIMIT ? OFFSET ?"
+    async def find_by_type(self, accolade_type: str, skip: int = 0, limit: int = 100,
+                           fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM accolades WHERE accolade_type = ? ORDER BY achieved_date DESC LIMIT ? OFFSET ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (accolade_type, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
\ No newline at end of file
+            return await conn.fetch_all(query, (accolade_type, limit, skip))
+    
+    async def count_by_user_id(self, user_id: int) -> Total:
+        return await self.count_rows("user_id", user_id)
+    
+    async def count_by_type(self, accolade_type: str) -> Total:
+        return await self.count_rows("accolade_type", accolade_type)
@@ -0,0 +1,103 @@
+from typing import List, Dict, Any
+from datetime import date, datetime
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+from app.core.storage import StorageConnection
+from app.core.archive import ARCHIVE_ALIAS, ARCHIVE_INDEXES, ARCHIVED_TABLES, attach_archive, table_columns
+
+
+class ArchiveRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("archive_runs")
+
+    @staticmethod
+    async def _sync_archive_table(conn: StorageConnection, table: str) -> List[str]:
+        """Create or extend the archive copy of a hot table; returns the hot columns"""
+        hot = await conn.fetch_all(f"PRAGMA main.table_info({table})")
+        archived = set(await table_columns(conn, table, ARCHIVE_ALIAS))
+        if not archived:
+            definitions = [
+                f"{col['name']} {col['type']}" + (" PRIMARY KEY" if col['name'] == 'id' else "")
+                for col in hot
+            ]
+            await conn.execute(
+                f"CREATE TABLE {ARCHIVE_ALIAS}.{table} ({', '.join(definitions)}, archived_at DATETIME)"
+            )
+        else:
+            for col in hot:
+                if col['name'] not in archived:
+                    await conn.execute(f"ALTER TABLE {ARCHIVE_ALIAS}.{table} ADD COLUMN {col['name']} {col['type']}")
+        for column in ARCHIVE_INDEXES.get(table, ()):
+            await conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_archived_{table}_{column} ON {table}({column})"
+            )
+        return [col['name'] for col in hot]
+
+    async def archive_before(self, cutoff: date, batch_size: int = 500) -> Dict[str, Any]:
+        """Move finished moments dated before `cutoff`, with their greetings, to the archive.
+
+        A moment is finished when it is inactive or its notification went out.
+        Each batch is one transaction across both files, so a moment and its
+        greetings are always on the same side.
+        """
+        started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        moments_moved = greetings_moved = 0
+        async with db_manager.get_connection() as conn:
+            await attach_archive(conn, create=True)
+            columns = {table: await self._sync_archive_table(conn, table) for table in ARCHIVED_TABLES}
+            await conn.commit()
+
+            while True:
+                rows = await conn.fetch_all(
+                    """SELECT id FROM main.moments
+                       WHERE moment_date < ? AND (is_active = FALSE OR notification_sent = TRUE)
+                       ORDER BY id LIMIT ?""",
+                    (cutoff, batch_size)
+                )
+                if not rows:
+                    break
+                ids = [row['id'] for row in rows]
+                marks = ", ".join("?" for _ in ids)
+                # Greetings go first: they reference moments(id)
+                for table, key in (("greetings", "moment_id"), ("moments", "id")):
+                    column_list = ", ".join(columns[table])
+                    moved = await conn.execute(
+                        f"""INSERT OR REPLACE INTO {ARCHIVE_ALIAS}.{table} ({column_list}, archived_at)
+                            SELECT {column_list}, CURRENT_TIMESTAMP FROM main.{table} WHERE {key} IN ({marks})""",
+                        ids
+                    )
+                    await conn.execute(f"DELETE FROM main.{table} WHERE {key} IN ({marks})", ids)
+                    if table == "moments":
+                        moments_moved += moved
+                    else:
+                        greetings_moved += moved
+                await conn.commit()
+
+            await conn.execute(
+                """INSERT INTO archive_runs (started_at, cutoff_date, moments_moved, greetings_moved)
+                   VALUES (?, ?, ?, ?)""",
+                (started_at, cutoff, moments_moved, greetings_moved)
+            )
+            await conn.commit()
+        return {
+            "cutoff_date": cutoff.isoformat(),
+            "moments_moved": moments_moved,
+            "greetings_moved": greetings_moved,
+            "started_at": started_at,
+        }
+
+    async def find_runs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Find the most recent archival runs"""
+        query = "SELECT * FROM archive_runs ORDER BY started_at DESC LIMIT ?"
+        return await self._cached_fetch_all(query, (limit,))
+
+    async def count_archived(self) -> Dict[str, int]:
+        """Count rows per archived table (zero when there is no archive yet)"""
+        async with db_manager.get_connection() as conn:
+            if not await attach_archive(conn):
+                return {table: 0 for table in ARCHIVED_TABLES}
+            counts = {}
+            for table in ARCHIVED_TABLES:
+                exists = await table_columns(conn, table, ARCHIVE_ALIAS)
+                counts[table] = await conn.fetch_value(f"SELECT COUNT(*) FROM {ARCHIVE_ALIAS}.{table}") if exists else 0
+            return counts
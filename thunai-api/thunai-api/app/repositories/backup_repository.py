@@ -0,0 +1,19 @@
+from app.repositories.base import BaseRepository
+from app.repositories.job_repository import utcnow
+from app.core.database import db_manager
+
+
+class BackupRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("backup_runs")
+
+    async def claim(self, run_date: str, claimed_by: str) -> bool:
+        """Reserve the scheduled backup of `run_date`; False if another process already did"""
+        async with db_manager.get_connection() as conn:
+            claimed = await conn.execute(
+                """INSERT INTO backup_runs (run_date, claimed_by, claimed_at) VALUES (?, ?, ?)
+                   ON CONFLICT (run_date) DO NOTHING""",
+                (run_date, claimed_by, utcnow())
+            )
+            await conn.commit()
+        return bool(claimed)
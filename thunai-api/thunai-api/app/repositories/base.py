@@ -1,29 +1,139 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Sequence, Tuple
 from app.core.database import db_manager
+from app.core.cache import cached
+from app.core.projection import select_list
+from app.core.counters import Total, bounded_count, is_counted, maintained_count
+
+
+class Filters:
+    """Composable, parameterized WHERE clause; a condition given None is left out.
+
+    `Filters().equals("moment_type", t).between("moment_date", start, end)`
+    reads as one statement with every filter that was actually given.
+    """
+
+    def __init__(self):
+        self.conditions: List[Tuple[str, str, Tuple[Any, ...]]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.conditions)
+
+    def _add(self, column: str, operator: str, values: Tuple[Any, ...]) -> "Filters":
+        # Column names come from code, never from requests; refuse anything else
+        if not column.isidentifier():
+            raise ValueError(f"Invalid column name: {column!r}")
+        self.conditions.append((column, operator, values))
+        return self
+
+    def equals(self, column: str, value: Any) -> "Filters":
+        return self if value is None else self._add(column, "=", (value,))
+
+    def any_of(self, column: str, values: Optional[Sequence[Any]]) -> "Filters":
+        return self if values is None else self._add(column, "IN", tuple(values))
+
+    def at_least(self, column: str, value: Any) -> "Filters":
+        return self if value is None else self._add(column, ">=", (value,))
+
+    def at_most(self, column: str, value: Any) -> "Filters":
+        return self if value is None else self._add(column, "<=", (value,))
+
+    def between(self, column: str, low: Any, high: Any) -> "Filters":
+        return self.at_least(column, low).at_most(column, high)
+
+    def bound(self, column: str, operator: str) -> Any:
+        """Value of the `column operator ?` condition, if there is one"""
+        for condition_column, condition_operator, values in self.conditions:
+            if condition_column == column and condition_operator == operator:
+                return values[0]
+        return None
+
+    def single_column(self) -> Optional[Tuple[str, Tuple[Any, ...]]]:
+        """(column, values) when the filters only pick values of one column"""
+        if len(self.conditions) == 1 and self.conditions[0][1] in ("=", "IN"):
+            return self.conditions[0][0], self.conditions[0][2]
+        return None
+
+    def sql(self) -> Tuple[str, List[Any]]:
+        """The WHERE expression (without WHERE) and its parameters"""
+        parts, params = [], []
+        for column, operator, values in self.conditions:
+            if operator == "IN":
+                parts.append(f"{column} IN ({', '.join('?' for _ in values)})" if values else "1 = 0")
+            else:
+                parts.append(f"{column} {operator} ?")
+            params.extend(values)
+        return " AND ".join(parts) or "1 = 1", params
 
 
 class BaseRepository(ABC):
     def __init__(self, table_name: str):
         self.table_name = table_name
     
-    async def find_all(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        query = f"SELECT * FROM {self.table_name} ORDER BY id LIMIT ? OFFSET ?"
-        async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+    @staticmethod
+    def _select(fields: Optional[Sequence[str]] = None, alias: Optional[str] = None) -> str:
+        """SELECT list for a projection (`fields=`); all columns when None"""
+        return select_list(fields, alias)
+    
+    async def _cached_fetch_all(self, query: str, params: Sequence[Any] = (),
+                                tables: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Run a read query through the coherent query cache"""
+        async def load():
+            async with db_manager.get_connection() as conn:
+                return await conn.fetch_all(query, params)
+        rows = await cached(tables or (self.table_name,), (query, tuple(params)), load)
+        return [dict(row) for row in rows]
+    
+    async def _cached_fetch_one(self, query: str, params: Sequence[Any] = (),
+                                tables: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Run a single-row read query through the coherent query cache"""
+        async def load():
+            async with db_manager.get_connection() as conn:
+                return await conn.fetch_one(query, params)
+        row = await cached(tables or (self.table_name,), (query, tuple(params)), load)
+        return dict(row) if row else None
     
-    async def find_by_id(self, id: int) -> Optional[Dict[str, Any]]:
-        query = f"SELECT * FROM {self.table_name} WHERE id = ?"
+    async def find_all(self, skip: int = 0, limit: int = 100,
+                       fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM {self.table_name} ORDER BY id LIMIT ? OFFSET ?"
+        return await self._cached_fetch_all(query, (limit, skip))
+    
+    async def find_by_id(self, id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM {self.table_name} WHERE id = ?"
+        return await self._cached_fetch_one(query, (id,))
+    
+    async def count_rows(self, column: Optional[str] = None, value: Any = None) -> Total:
+        """Rows in the table (with `column` = `value`): maintained counts where kept, else a bounded count"""
+        if is_counted(self.table_name, column):
+            return Total(await maintained_count(self.table_name, column, value))
+        where, params = (f" WHERE {column} = ?", (value,)) if column else ("", ())
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (id,))
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+            return await bounded_count(conn, f"SELECT 1 FROM {self.table_name}{where}", params)
     
     async def count(self) -> int:
+        if is_counted(self.table_name):
+            return await maintained_count(self.table_name)
         query = f"SELECT COUNT(*) FROM {self.table_name}"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query)
-            row = await cursor.fetchone()
-            return row[0] if row else 0
\ No newline at end of file
+            return await conn.fetch_value(query) or 0
+    
+    async def find_where(self, filters: Filters, order_by: str = "id ASC", skip: int = 0, limit: int = 100,
+                         fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows matching all `filters` in one statement, ordered by `order_by` (code-supplied, not user input)"""
+        where, params = filters.sql()
+        query = f"SELECT {self._select(fields)} FROM {self.table_name} WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?"
+        return await self._cached_fetch_all(query, (*params, limit, skip))
+    
+    async def count_where(self, filters: Filters) -> Total:
+        """Rows matching `filters`: summed maintained counts when they pick values of one counted column"""
+        single = filters.single_column()
+        if single is not None and is_counted(self.table_name, single[0]):
+            total = Total(0)
+            for value in single[1]:
+                total = total.plus(Total(await maintained_count(self.table_name, single[0], value)))
+            return total
+        if not filters:
+            return await self.count_rows()
+        where, params = filters.sql()
+        async with db_manager.get_connection() as conn:
+            return await bounded_count(conn, f"SELECT 1 FROM {self.table_name} WHERE {where}", params)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+from app.core.projection import select_list
+
+
+class ExportRepository(BaseRepository):
+    """Keyset-paged reads of whole tables for columnar export"""
+
+    def __init__(self, table_name: str):
+        super().__init__(table_name)
+
+    @staticmethod
+    def _since(since: Optional[datetime]) -> str:
+        return "AND created_at >= ?" if since is not None else ""
+
+    async def find_max_id(self, since_id: int = 0) -> int:
+        """Highest id in the table (or `since_id` when there is nothing after it)"""
+        query = f"SELECT MAX(id) FROM {self.table_name}"
+        async with db_manager.get_connection() as conn:
+            return max(await conn.fetch_value(query) or 0, since_id)
+
+    async def find_batch(self, columns: Sequence[str], after_id: int, up_to_id: int, limit: int,
+                         since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Next `limit` rows with ids in (after_id, up_to_id], in id order"""
+        query = f"""
+            SELECT {select_list(columns)} FROM {self.table_name}
+            WHERE id > ? AND id <= ? {self._since(since)}
+            ORDER BY id LIMIT ?
+        """
+        params = [after_id, up_to_id, *([since] if since is not None else []), limit]
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_all(query, params)
@@ -0,0 +1,46 @@
+from typing import List, Dict, Any, Optional
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+
+
+class GreetingDuplicateRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("greeting_duplicates")
+
+    async def record(self, moment_id: int, greeting_id: Optional[int], duplicate_of: int,
+                     similarity: float, action: str, user_id: Optional[str], greeting_text: str):
+        """Record a near-duplicate greeting and what was done with it"""
+        query = """
+            INSERT INTO greeting_duplicates
+                (moment_id, greeting_id, duplicate_of, similarity, action, user_id, greeting_text)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                query, (moment_id, greeting_id, duplicate_of, round(similarity, 4), action, user_id, greeting_text)
+            )
+            await conn.commit()
+
+    async def find_report(self, moment_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Find recorded near-duplicates with the text they duplicate, newest first"""
+        where = "WHERE d.moment_id = ?" if moment_id is not None else ""
+        params = [moment_id] if moment_id is not None else []
+        query = f"""
+            SELECT d.*, g.greeting_text AS original_text, g.user_id AS original_user_id
+            FROM greeting_duplicates d
+            LEFT JOIN greetings g ON g.id = d.duplicate_of
+            {where}
+            ORDER BY d.detected_at DESC, d.duplicate_of DESC
+            LIMIT ? OFFSET ?
+        """
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_all(query, [*params, limit, skip])
+
+    async def count_by_action(self, moment_id: Optional[int] = None) -> Dict[str, int]:
+        """Count recorded near-duplicates per action (flagged/collapsed)"""
+        where = "WHERE moment_id = ?" if moment_id is not None else ""
+        params = [moment_id] if moment_id is not None else []
+        query = f"SELECT action, COUNT(*) AS total FROM greeting_duplicates {where} GROUP BY action"
+        async with db_manager.get_connection() as conn:
+            rows = await conn.fetch_all(query, params)
+        return {row['action']: row['total'] for row in rows}
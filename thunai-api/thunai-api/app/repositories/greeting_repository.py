@@ -1,6 +1,11 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from app.repositories.base import BaseRepository
 from app.core.database import db_manager
+from app.core.storage import StorageConnection
+from app.core.archive import (
+    ARCHIVE_ALIAS, archive_boundary, attach_archive, count_archived_rows, fetch_with_archive, has_archived_rows
+)
+from app.core.counters import Total
 
 
 class GreetingRepository(BaseRepository):
@@ -14,44 +19,108 @@ class GreetingRepository(BaseRepository):
             VALUES (?, ?, ?, ?, ?)
         """
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(
+            greeting_id = await conn.insert(
                 query,
                 (greeting_data.get('moment_id'), greeting_data.get('user_id'), 
                  greeting_data['greeting_text'], greeting_data.get('moment_type', 'general'),
                  greeting_data.get('is_active', True))
             )
             await conn.commit()
-            greeting_id = cursor.lastrowid
-            return await self.find_by_id(greeting_id)
+        return await self.find_by_id(greeting_id)
     
-    async def find_by_moment_id(self, moment_id: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    async def find_by_moment_id(self, moment_id: int, skip: int = 0, limit: int = 100,
+                                fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Find all greetings for a specific moment"""
-        query = "SELECT * FROM greetings WHERE moment_id = ? ORDER BY created_at ASC LIMIT ? OFFSET ?"
+        query = f"SELECT {self._select(fields)} FROM greetings WHERE moment_id = ? ORDER BY created_at ASC LIMIT ? OFFSET ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (moment_id, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            rows = await conn.fetch_all(query, (moment_id, limit, skip))
+            # Greetings are archived with their moment, so only a moment gone from the hot table has archived ones
+            if not rows and await self._moment_archived(conn, moment_id):
+                rows = await fetch_with_archive(
+                    conn, "greetings", "moment_id = ?", [moment_id], "created_at ASC", limit, skip, fields
+                )
+            return rows
     
-    async def find_by_user_id(self, user_id: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    async def find_by_user_id(self, user_id: str, skip: int = 0, limit: int = 100,
+                              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Find all greetings by a specific user"""
-        query = "SELECT * FROM greetings WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        query = f"SELECT {self._select(fields)} FROM greetings WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (user_id, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            rows = await conn.fetch_all(query, (user_id, limit, skip))
+            # A short page has run past the hot rows; older ones may be archived
+            if (len(rows) < limit and await archive_boundary() is not None
+                    and await has_archived_rows(conn, "greetings", "user_id = ?", [user_id])):
+                rows = await fetch_with_archive(
+                    conn, "greetings", "user_id = ?", [user_id], "created_at DESC", limit, skip, fields
+                )
+            return rows
+
+    @staticmethod
+    async def _moment_archived(conn: StorageConnection, moment_id: int) -> bool:
+        if await archive_boundary() is None:
+            return False
+        return await conn.fetch_value("SELECT id FROM moments WHERE id = ?", (moment_id,)) is None
+
+    async def _count_with_archive(self, column: str, value: Any) -> Total:
+        total = await self.count_rows(column, value)
+        if await archive_boundary() is None:
+            return total
+        async with db_manager.get_connection() as conn:
+            return total.plus(await count_archived_rows(conn, "greetings", f"{column} = ?", [value]))
+
+    async def count_by_moment_id(self, moment_id: int) -> Total:
+        """Count a moment's greetings, archived ones included"""
+        async with db_manager.get_connection() as conn:
+            if await self._moment_archived(conn, moment_id):
+                return await count_archived_rows(conn, "greetings", "moment_id = ?", [moment_id])
+        return await self.count_rows("moment_id", moment_id)
+
+    async def count_by_user_id(self, user_id: str) -> Total:
+        """Count the greetings sent by a user, archived ones included"""
+        return await self._count_with_archive("user_id", user_id)
+
+    async def find_for_card(self, moment_id: int, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Find a moment's active greetings newer than `after_id`, with the sender's name and what they collapsed into"""
+        async with db_manager.get_connection() as conn:
+            source = "greetings"
+            if await self._moment_archived(conn, moment_id) and await attach_archive(conn):
+                source = f"{ARCHIVE_ALIAS}.greetings"
+            query = f"""
+                SELECT g.*, u.name AS sender_name, d.duplicate_of AS collapsed_into
+                FROM {source} g
+                LEFT JOIN users u ON u.teams_user_id = g.user_id
+                LEFT JOIN greeting_duplicates d ON d.greeting_id = g.id AND d.action = 'collapsed'
+                WHERE g.moment_id = ? AND g.id > ? AND g.is_active = TRUE
+                ORDER BY g.id ASC
+            """
+            return await conn.fetch_all(query, (moment_id, after_id))
+
+    async def find_card_signature(self, moment_id: int, up_to_id: int) -> Tuple[int, int]:
+        """Count and total text length of a moment's active greetings up to `up_to_id`"""
+        async with db_manager.get_connection() as conn:
+            source = "greetings"
+            if await self._moment_archived(conn, moment_id) and await attach_archive(conn):
+                source = f"{ARCHIVE_ALIAS}.greetings"
+            row = await conn.fetch_one(
+                f"""SELECT COUNT(*) AS greetings, COALESCE(SUM(LENGTH(greeting_text)), 0) AS text_length
+                    FROM {source} WHERE moment_id = ? AND id <= ? AND is_active = TRUE""",
+                (moment_id, up_to_id)
+            )
+            return int(row['greetings']), int(row['text_length'])
+
+    async def find_texts_for_moment(self, moment_id: int, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Find ids and texts of a moment's greetings newer than `after_id`"""
+        query = "SELECT id, greeting_text FROM greetings WHERE moment_id = ? AND id > ? ORDER BY id ASC"
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_all(query, (moment_id, after_id))
 
     async def check_existing_greeting(self, moment_id: int, user_id: str) -> bool:
         """Check if user already sent a greeting for this moment"""
         query = "SELECT id FROM greetings WHERE moment_id = ? AND user_id = ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (moment_id, user_id))
-            row = await cursor.fetchone()
+            row = await conn.fetch_one(query, (moment_id, user_id))
             return row is not None
     
     async def count_greetings_for_moment(self, moment_id: int) -> int:
-        """Count total greetings for a moment"""
-        query = "SELECT COUNT(*) FROM greetings WHERE moment_id = ?"
-        async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (moment_id,))
-            row = await cursor.fetchone()
-            return row[0] if row else 0
\ No newline at end of file
+        """Count total greetings for a moment, archived ones included"""
+        return (await self.count_by_moment_id(moment_id)).value
\ No newline at end of file
@@ -0,0 +1,61 @@
+from typing import Dict, Any, Optional
+from datetime import timedelta
+from app.repositories.base import BaseRepository
+from app.repositories.job_repository import utcnow
+from app.core.database import db_manager
+
+
+class IdempotencyRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("idempotency_keys")
+
+    async def claim(self, key: str, fingerprint: str, lock_seconds: float) -> bool:
+        """Reserve a key for a request about to run; False if it is already taken"""
+        now = utcnow()
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                "DELETE FROM idempotency_keys WHERE idempotency_key = ? AND expires_at < ?", (key, now)
+            )
+            claimed = await conn.execute(
+                """INSERT INTO idempotency_keys (idempotency_key, fingerprint, compressed, expires_at)
+                   VALUES (?, ?, FALSE, ?)
+                   ON CONFLICT (idempotency_key) DO NOTHING""",
+                (key, fingerprint, now + timedelta(seconds=lock_seconds))
+            )
+            await conn.commit()
+        return bool(claimed)
+
+    async def find(self, key: str) -> Optional[Dict[str, Any]]:
+        query = """
+            SELECT idempotency_key, fingerprint, status_code, content_type, body, compressed
+            FROM idempotency_keys WHERE idempotency_key = ? AND expires_at >= ?
+        """
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_one(query, (key, utcnow()))
+
+    async def complete(self, key: str, status_code: int, content_type: Optional[str], body: str,
+                       compressed: bool, ttl_seconds: float):
+        """Store the response of a finished request for its retries"""
+        query = """
+            UPDATE idempotency_keys SET status_code = ?, content_type = ?, body = ?, compressed = ?, expires_at = ?
+            WHERE idempotency_key = ?
+        """
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                query, (status_code, content_type, body, compressed, utcnow() + timedelta(seconds=ttl_seconds), key)
+            )
+            await conn.commit()
+
+    async def release(self, key: str):
+        """Drop a claim whose request failed, so a retry runs it again"""
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                "DELETE FROM idempotency_keys WHERE idempotency_key = ? AND status_code IS NULL", (key,)
+            )
+            await conn.commit()
+
+    async def purge_expired(self) -> int:
+        async with db_manager.get_connection() as conn:
+            deleted = await conn.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (utcnow(),))
+            await conn.commit()
+        return deleted
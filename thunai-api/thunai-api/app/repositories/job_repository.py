@@ -0,0 +1,150 @@
+import json
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+
+JOB_COLUMNS = """id, kind, status, params, progress, progress_message, result, error, attempts,
+                 cancel_requested, created_at, started_at, finished_at, heartbeat_at"""
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _decode(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = dict(row)
+    for field in ('params', 'result'):
+        job[field] = json.loads(job[field]) if job.get(field) else None
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+
+class JobRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("jobs")
+
+    async def create(self, job_id: str, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a new job"""
+        query = """
+            INSERT INTO jobs (id, kind, status, params, progress, attempts, cancel_requested, created_at)
+            VALUES (?, ?, 'queued', ?, 0, 0, FALSE, ?)
+        """
+        async with db_manager.get_connection() as conn:
+            await conn.execute(query, (job_id, kind, json.dumps(params, default=str), utcnow()))
+            await conn.commit()
+        return await self.find_by_id(job_id)
+
+    async def find_by_id(self, job_id: str) -> Optional[Dict[str, Any]]:
+        query = f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?"
+        async with db_manager.get_connection() as conn:
+            return _decode(await conn.fetch_one(query, (job_id,)))
+
+    async def find_recent(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Find the newest jobs, optionally only those in one status"""
+        where = "WHERE status = ?" if status else ""
+        params = [status] if status else []
+        query = f"SELECT {JOB_COLUMNS} FROM jobs {where} ORDER BY created_at DESC LIMIT ?"
+        async with db_manager.get_connection() as conn:
+            rows = await conn.fetch_all(query, [*params, limit])
+        return [_decode(row) for row in rows]
+
+    async def claim_next(self, kinds: List[str]) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job of a known kind to running"""
+        if not kinds:
+            return None
+        marks = ", ".join("?" for _ in kinds)
+        async with db_manager.get_connection() as conn:
+            while True:
+                candidate = await conn.fetch_one(
+                    f"SELECT id FROM jobs WHERE status = 'queued' AND kind IN ({marks}) ORDER BY created_at LIMIT 1",
+                    kinds
+                )
+                if candidate is None:
+                    return None
+                now = utcnow()
+                # Guarded on status so two workers (or processes) never claim the same job
+                claimed = await conn.execute(
+                    """UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                           started_at = ?, heartbeat_at = ?
+                       WHERE id = ? AND status = 'queued'""",
+                    (now, now, candidate['id'])
+                )
+                await conn.commit()
+                if claimed:
+                    break
+        return await self.find_by_id(candidate['id'])
+
+    async def heartbeat(self, job_id: str, progress: Optional[float] = None,
+                        message: Optional[str] = None) -> bool:
+        """Record liveness (and progress); returns whether cancellation was requested"""
+        async with db_manager.get_connection() as conn:
+            if progress is None:
+                await conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (utcnow(), job_id))
+            else:
+                await conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ?, progress = ?, progress_message = ? WHERE id = ?",
+                    (utcnow(), progress, message, job_id)
+                )
+            await conn.commit()
+            return bool(await conn.fetch_value("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)))
+
+    async def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        """Record the final status of a running job"""
+        query = """
+            UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?,
+                progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END
+            WHERE id = ? AND status = 'running'
+        """
+        payload = json.dumps(result, default=str) if result is not None else None
+        async with db_manager.get_connection() as conn:
+            await conn.execute(query, (status, payload, error, utcnow(), status, job_id))
+            await conn.commit()
+
+    async def release(self, job_id: str):
+        """Put a job interrupted by shutdown back in the queue without using up an attempt"""
+        query = """
+            UPDATE jobs SET status = 'queued', attempts = attempts - 1, progress_message = 'Requeued on shutdown'
+            WHERE id = ? AND status = 'running'
+        """
+        async with db_manager.get_connection() as conn:
+            await conn.execute(query, (job_id,))
+            await conn.commit()
+
+    async def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job outright, or flag a running one for its worker"""
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (utcnow(), job_id)
+            )
+            await conn.execute(
+                "UPDATE jobs SET cancel_requested = TRUE WHERE id = ? AND status = 'running'", (job_id,)
+            )
+            await conn.commit()
+        return await self.find_by_id(job_id)
+
+    async def recover_stale(self, stale_after_seconds: float, max_attempts: int) -> int:
+        """Requeue running jobs whose worker stopped sending heartbeats (e.g. after a restart)"""
+        stale_before = utcnow() - timedelta(seconds=stale_after_seconds)
+        async with db_manager.get_connection() as conn:
+            failed = await conn.execute(
+                """UPDATE jobs SET status = 'failed', finished_at = ?,
+                       error = 'Worker stopped while running the job; no attempts left'
+                   WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?""",
+                (utcnow(), stale_before, max_attempts)
+            )
+            cancelled = await conn.execute(
+                """UPDATE jobs SET status = 'cancelled', finished_at = ?
+                   WHERE status = 'running' AND heartbeat_at < ? AND cancel_requested = TRUE""",
+                (utcnow(), stale_before)
+            )
+            requeued = await conn.execute(
+                """UPDATE jobs SET status = 'queued', progress_message = 'Requeued after worker restart'
+                   WHERE status = 'running' AND heartbeat_at < ?""",
+                (stale_before,)
+            )
+            await conn.commit()
+        return failed + cancelled + requeued
@@ -0,0 +1,104 @@
+from datetime import date
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+
+# Metric -> table whose rows it scores
+METRIC_TABLES = {"accolades": "accolades", "greetings_sent": "greetings", "greetings_received": "greetings"}
+# Greetings that count: active ones that were not collapsed into an earlier near-duplicate
+_COUNTED_GREETING = """
+    g.is_active = TRUE AND NOT EXISTS (
+        SELECT 1 FROM greeting_duplicates d WHERE d.greeting_id = g.id AND d.action = 'collapsed'
+    )
+"""
+# Metric -> rows (id, subject, happened_at) it scores, after a source id, in id order
+METRIC_SOURCES = {
+    "accolades": """
+        SELECT id, user_id AS subject, achieved_date AS happened_at FROM accolades
+        WHERE id > ? AND user_id IS NOT NULL ORDER BY id LIMIT ?
+    """,
+    "greetings_sent": f"""
+        SELECT g.id, g.user_id AS subject, g.created_at AS happened_at FROM greetings g
+        WHERE g.id > ? AND g.user_id IS NOT NULL AND {_COUNTED_GREETING} ORDER BY g.id LIMIT ?
+    """,
+    "greetings_received": f"""
+        SELECT g.id, m.person_name AS subject, g.created_at AS happened_at
+        FROM greetings g JOIN moments m ON m.id = g.moment_id
+        WHERE g.id > ? AND {_COUNTED_GREETING} ORDER BY g.id LIMIT ?
+    """,
+}
+
+
+class LeaderboardRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("leaderboard_buckets")
+
+    async def has_source_table(self, metric: str) -> bool:
+        """Whether the table a metric scores exists (older databases have no accolades table)"""
+        async with db_manager.get_connection() as conn:
+            if conn.dialect == "sqlite":
+                query = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?"
+            else:
+                query = "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = ?"
+            return bool(await conn.fetch_value(query, (METRIC_TABLES[metric],)))
+
+    async def find_source_rows(self, metric: str, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Rows scored by a metric with ids after `after_id`"""
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_all(METRIC_SOURCES[metric], (after_id, limit))
+
+    async def get_watermark(self, metric: str) -> int:
+        """Last source id folded into a metric's buckets"""
+        query = "SELECT last_id FROM leaderboard_watermarks WHERE metric = ?"
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_value(query, (metric,)) or 0
+
+    async def fold(self, metric: str, from_id: int, to_id: int, scores: Dict[Tuple[date, str], int]) -> bool:
+        """Add scores for source ids in (from_id, to_id] to the buckets.
+
+        The watermark moves first, compare-and-set, so when two workers fold
+        the same rows only one of them gets to add them; False for the other.
+        Folding by id relies on ids committing in order, which holds on SQLite
+        (one writer at a time). On PostgreSQL a transaction holding a lower id
+        can commit after a higher one was folded, and its row is never scored.
+        """
+        async with db_manager.get_connection() as conn:
+            if from_id:
+                moved = await conn.execute(
+                    "UPDATE leaderboard_watermarks SET last_id = ? WHERE metric = ? AND last_id = ?",
+                    (to_id, metric, from_id)
+                )
+            else:
+                moved = await conn.execute(
+                    "INSERT INTO leaderboard_watermarks (metric, last_id) VALUES (?, ?) ON CONFLICT (metric) DO NOTHING",
+                    (metric, to_id)
+                )
+            if not moved:
+                await conn.rollback()
+                return False
+            for (day, subject), score in scores.items():
+                await conn.execute(
+                    """INSERT INTO leaderboard_buckets (metric, day, subject, score) VALUES (?, ?, ?, ?)
+                       ON CONFLICT (metric, day, subject) DO UPDATE SET score = leaderboard_buckets.score + excluded.score""",
+                    (metric, day, subject, score)
+                )
+            await conn.commit()
+            return True
+
+    async def find_totals(self, metric: str, since: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Score per subject summed over the buckets from `since` (all of them when None)"""
+        where = "AND day >= ?" if since is not None else ""
+        params = [metric, since] if since is not None else [metric]
+        query = f"SELECT subject, SUM(score) AS score FROM leaderboard_buckets WHERE metric = ? {where} GROUP BY subject"
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_all(query, params)
+
+    async def find_user_names(self, column: str, values: Sequence[Any]) -> Dict[str, str]:
+        """User names keyed by `column` (id or teams_user_id) as text"""
+        if not values or column not in ("id", "teams_user_id"):
+            return {}
+        placeholders = ", ".join("?" for _ in values)
+        query = f"SELECT {column} AS subject, name FROM users WHERE {column} IN ({placeholders})"
+        async with db_manager.get_connection() as conn:
+            rows = await conn.fetch_all(query, list(values))
+        return {str(row['subject']): row['name'] for row in rows}
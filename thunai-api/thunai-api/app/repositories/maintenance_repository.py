@@ -0,0 +1,65 @@
+from typing import List, Dict, Any
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+
+
+class MaintenanceRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("maintenance_runs")
+
+    async def record(self, run_id: str, task: str, status: str, duration_ms: float, detail: str):
+        """Record the outcome of one maintenance task"""
+        query = """
+            INSERT INTO maintenance_runs (run_id, task, status, duration_ms, detail)
+            VALUES (?, ?, ?, ?, ?)
+        """
+        async with db_manager.get_connection() as conn:
+            await conn.execute(query, (run_id, task, status, round(duration_ms, 3), detail))
+            await conn.commit()
+
+    async def has_run_since(self, since: str) -> bool:
+        """Check whether any maintenance run started at or after `since`"""
+        query = "SELECT 1 FROM maintenance_runs WHERE run_id >= ? LIMIT 1"
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_one(query, (since,)) is not None
+
+    async def find_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Find the most recent task results, newest run first"""
+        query = "SELECT * FROM maintenance_runs ORDER BY run_id DESC, recorded_at ASC LIMIT ?"
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_all(query, (limit,))
+
+    async def pragma_value(self, pragma: str) -> Any:
+        """Read a single-valued PRAGMA such as journal_mode or freelist_count"""
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_value(f"PRAGMA {pragma}")
+
+    async def analyze(self, analysis_limit: int):
+        """Refresh planner statistics, reading at most `analysis_limit` rows per index"""
+        async with db_manager.get_connection() as conn:
+            await conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+            await conn.execute("ANALYZE")
+            await conn.commit()
+
+    async def optimize(self):
+        """Let SQLite re-analyze whatever tables its query history says need it"""
+        async with db_manager.get_connection() as conn:
+            await conn.execute("PRAGMA optimize")
+            await conn.commit()
+
+    async def wal_checkpoint(self) -> Dict[str, Any]:
+        """Checkpoint the WAL without blocking readers or writers"""
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_one("PRAGMA wal_checkpoint(PASSIVE)")
+
+    async def incremental_vacuum(self, pages: int):
+        """Return up to `pages` free pages to the file system"""
+        async with db_manager.get_connection() as conn:
+            await conn.fetch_all(f"PRAGMA incremental_vacuum({int(pages)})")
+            await conn.commit()
+
+    async def enable_incremental_vacuum(self):
+        """Switch the database to incremental auto-vacuum (rewrites the whole file once)"""
+        async with db_manager.get_connection() as conn:
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await conn.execute("VACUUM")
@@ -1,7 +1,28 @@
-from typing import List, Dict, Any, Optional
-from app.repositories.base import BaseRepository
+import copy
+from typing import List, Dict, Any, Optional, Sequence
+from app.repositories.base import BaseRepository, Filters
 from app.core.database import db_manager
-from datetime import date
+from app.core.cache import cached
+from app.core.archive import archive_boundary, count_archived_rows, fetch_with_archive, has_archived_rows
+from app.core.counters import Total
+from app.core.scheduler import local_now
+from app.models.schemas import MOMENT_CATEGORIES
+from datetime import date, timedelta
+
+
+def category_types(category: str) -> List[str]:
+    """Moment types whose greeting prompt category is `category`"""
+    return [moment_type for moment_type, value in MOMENT_CATEGORIES.items() if value == category]
+
+
+# Active moments in [start, end] a user hasn't greeted yet, leaving out moments about the user
+INBOX_JOIN = """
+    FROM users u
+    JOIN moments m ON m.is_active = TRUE AND m.moment_date BETWEEN ? AND ?
+        AND m.person_name <> u.name AND (m.user_id IS NULL OR m.user_id <> u.id)
+    LEFT JOIN greetings g ON g.moment_id = m.id AND g.user_id = u.teams_user_id
+    WHERE g.id IS NULL
+"""
 
 
 class MomentRepository(BaseRepository):
@@ -13,8 +34,7 @@ class MomentRepository(BaseRepository):
         # First validate that person_name exists in users table
         user_query = "SELECT teams_user_id FROM users WHERE name = ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(user_query, (moment_data['person_name'],))
-            user = await cursor.fetchone()
+            user = await conn.fetch_one(user_query, (moment_data['person_name'],))
             
             if not user:
                 raise ValueError(f"User '{moment_data['person_name']}' not found in users table. Please add the user first.")
@@ -22,19 +42,18 @@ class MomentRepository(BaseRepository):
             # Create the moment with correct column names
             query = """
                 INSERT INTO moments (person_name, moment_type, moment_date, description, created_by, created_at, updated_at, is_active, notification_sent)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1, 0)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, TRUE, FALSE)
             """
-            cursor = await conn.execute(
+            moment_id = await conn.insert(
                 query,
                 (moment_data['person_name'], moment_data['moment_type'], moment_data['moment_date'],
                  moment_data.get('description'), moment_data['created_by'])
             )
             await conn.commit()
-            moment_id = cursor.lastrowid
-            from app.core.config import settings
-            if settings.enable_debug_logs:
-                print(f"Moment created in database with ID: {moment_id}")
-            return await self.find_by_id(moment_id)
+        from app.core.config import settings
+        if settings.enable_debug_logs:
+            print(f"Moment created in database with ID: {moment_id}")
+        return await self.find_by_id(moment_id)
     
     async def update(self, moment_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a moment"""
@@ -54,80 +73,257 @@ class MomentRepository(BaseRepository):
         query = f"UPDATE moments SET {', '.join(set_clauses)} WHERE id = ?"
         
         async with db_manager.get_connection() as conn:
-            await conn.execute(query, values)
+            updated = await conn.execute(query, values)
             await conn.commit()
-            return await self.find_by_id(moment_id)
+        # Archived moments are read-only
+        return await self.find_by_id(moment_id) if updated else None
+    
+    async def find_by_id(self, id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Find a moment by ID, in the archive when it has been archived"""
+        row = await super().find_by_id(id, fields)
+        if row is not None or await archive_boundary() is None:
+            return row
+        async with db_manager.get_connection() as conn:
+            rows = await fetch_with_archive(conn, "moments", "id = ?", [id], "id", 1, 0, fields)
+        return rows[0] if rows else None
     
-    async def find_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    async def find_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100,
+                              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Find moments by user ID"""
-        query = "SELECT * FROM moments WHERE person_name IN (SELECT name FROM users WHERE id = ?) ORDER BY moment_date DESC LIMIT ? OFFSET ?"
+        query = f"SELECT {self._select(fields)} FROM moments WHERE person_name IN (SELECT name FROM users WHERE id = ?) ORDER BY moment_date DESC LIMIT ? OFFSET ?"
+        async with db_manager.get_connection() as conn:
+            rows = await conn.fetch_all(query, (user_id, limit, skip))
+            # A short page has run past the hot rows; older ones may be archived
+            where = "person_name IN (SELECT name FROM users WHERE id = ?)"
+            if (len(rows) < limit and await archive_boundary() is not None
+                    and await has_archived_rows(conn, "moments", where, [user_id])):
+                rows = await fetch_with_archive(conn, "moments", where, [user_id], "moment_date DESC", limit, skip, fields)
+            return rows
+    
+    async def count_by_user_id(self, user_id: int) -> Total:
+        """Count moments by user ID, archived ones included"""
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (user_id, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            name = await conn.fetch_value("SELECT name FROM users WHERE id = ?", (user_id,))
+        if name is None:
+            return Total(0)
+        total = await self.count_rows("person_name", name)
+        if await archive_boundary() is None:
+            return total
+        async with db_manager.get_connection() as conn:
+            return total.plus(await count_archived_rows(conn, "moments", "person_name = ?", [name]))
+    
+    @staticmethod
+    def _date_order(descending: bool = True) -> str:
+        # (moment_date, id) is the tail of every moments index (idx_moments_date plus the rowid, and the
+        # (moment_type|is_active|person_name, moment_date) composites), so with an equality filter
+        # on one of those columns rows come out of the index in order and LIMIT stops the scan
+        direction = "DESC" if descending else "ASC"
+        return f"moment_date {direction}, id {direction}"
     
-    async def find_by_type(self, moment_type: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Find moments by type"""
-        query = "SELECT * FROM moments WHERE moment_type = ? ORDER BY moment_date DESC LIMIT ? OFFSET ?"
+    async def search(self, filters: Filters, descending: bool = True, skip: int = 0, limit: int = 100,
+                     fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Find moments matching all `filters`, by date, archived ones included when the dates reach them"""
+        order_by = self._date_order(descending)
+        # Archived rows can sort anywhere in the page (first when ascending), so a full hot page proves nothing
+        if not await self._reaches_archive(filters):
+            return await self.find_where(filters, order_by, skip, limit, fields)
+        where, params = filters.sql()
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (moment_type, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            return await fetch_with_archive(conn, "moments", where, params, order_by, limit, skip, fields)
     
-    async def find_by_status(self, status: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Find moments by status"""
-        query = "SELECT * FROM moments WHERE is_active = ? ORDER BY moment_date DESC LIMIT ? OFFSET ?"
+    async def count_search(self, filters: Filters) -> Total:
+        """Count moments matching all `filters`, archived ones included when the dates reach them"""
+        total = await self.count_where(filters)
+        if not await self._reaches_archive(filters):
+            return total
+        where, params = filters.sql()
         async with db_manager.get_connection() as conn:
-            is_active = 1 if status == 'active' else 0
-            cursor = await conn.execute(query, (is_active, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            return total.plus(await count_archived_rows(conn, "moments", where, params))
     
-    async def find_upcoming(self, days: int = 7) -> List[Dict[str, Any]]:
+    @staticmethod
+    async def _reaches_archive(filters: Filters) -> bool:
+        boundary = await archive_boundary()
+        since = filters.bound("moment_date", ">=")
+        return boundary is not None and (since is None or since < boundary)
+    
+    async def find_by_type(self, moment_type: str, skip: int = 0, limit: int = 100,
+                           fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Find moments by type, archived ones included"""
+        return await self.search(Filters().equals("moment_type", moment_type), True, skip, limit, fields)
+    
+    async def count_by_type(self, moment_type: str) -> Total:
+        return await self.count_search(Filters().equals("moment_type", moment_type))
+    
+    async def find_by_status(self, status: str, skip: int = 0, limit: int = 100,
+                             fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Find moments by status, archived ones included"""
+        return await self.search(Filters().equals("is_active", status == 'active'), True, skip, limit, fields)
+    
+    async def count_by_status(self, status: str) -> Total:
+        return await self.count_search(Filters().equals("is_active", status == 'active'))
+    
+    async def find_upcoming(self, days: int = 7, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Find upcoming moments in the next N days"""
-        query = """
-            SELECT * FROM moments 
-            WHERE is_active = 1 
-            AND moment_date BETWEEN date('now') AND date('now', '+' || ? || ' days')
+        query = f"""
+            SELECT {self._select(fields)} FROM moments 
+            WHERE is_active = TRUE 
+            AND moment_date BETWEEN ? AND ?
             ORDER BY moment_date ASC
         """
-        async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (days,))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        # Date bounds are computed here so the SQL stays portable across backends
+        today = local_now().date()
+        return await self._cached_fetch_all(query, (today, today + timedelta(days=days)))
+    
+    async def find_inbox(self, teams_user_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """Find the moments in [start, end] a user still has to greet (one anti-join against greetings)"""
+        query = f"SELECT m.* {INBOX_JOIN} AND u.teams_user_id = ? ORDER BY m.moment_date ASC, m.id ASC"
+        return await self._cached_fetch_all(query, (start, end, teams_user_id), ("users", "moments", "greetings"))
+
+    async def find_inboxes(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Find every user's pending moments in [start, end] in one pass, as (user, moment) rows"""
+        query = f"""
+            SELECT u.teams_user_id AS inbox_teams_user_id, u.name AS inbox_user_name, m.*
+            {INBOX_JOIN}
+            ORDER BY u.teams_user_id ASC, m.moment_date ASC, m.id ASC
+        """
+        return await self._cached_fetch_all(query, (start, end), ("users", "moments", "greetings"))
     
-    async def find_by_date_range(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    async def find_by_date_range(self, start_date: date, end_date: date,
+                                 fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Find moments within a date range"""
-        query = """
-            SELECT * FROM moments 
+        query = f"""
+            SELECT {self._select(fields)} FROM moments 
             WHERE moment_date BETWEEN ? AND ?
             ORDER BY moment_date ASC
         """
+        boundary = await archive_boundary()
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (start_date, end_date))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            if boundary is not None and start_date < boundary:
+                return await fetch_with_archive(
+                    conn, "moments", "moment_date BETWEEN ? AND ?", [start_date, end_date], "moment_date ASC",
+                    fields=fields
+                )
+            return await conn.fetch_all(query, (start_date, end_date))
     
-    async def find_by_category(self, category: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Find moments by category (welcome/celebration/farewell)"""
-        query = "SELECT * FROM moments WHERE moment_type = ? ORDER BY moment_date DESC LIMIT ? OFFSET ?"
-        async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (category, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+    async def find_by_category(self, category: str, skip: int = 0, limit: int = 100,
+                               fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Find moments by category (welcome/celebration/farewell), archived ones included"""
+        filters = Filters().any_of("moment_type", category_types(category))
+        return await self.search(filters, True, skip, limit, fields)
     
-    async def find_for_notification(self, target_date: date) -> List[Dict[str, Any]]:
+    async def count_by_category(self, category: str) -> Total:
+        return await self.count_search(Filters().any_of("moment_type", category_types(category)))
+    
+    async def find_for_notification(self, target_date: date, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Find moments that need notification on target date"""
-        query = """
-            SELECT m.*, u.name as celebrant_name, u.teams_user_id as celebrant_teams_id
+        columns = self._select(fields, "m") if fields else (
+            "m.*, u.name as celebrant_name, u.teams_user_id as celebrant_teams_id"
+        )
+        query = f"""
+            SELECT {columns}
             FROM moments m
             LEFT JOIN users u ON m.person_name = u.name
-            WHERE m.is_active = 1 
+            WHERE m.is_active = TRUE 
             AND m.moment_date = ?
-            AND m.notification_sent = 0
+            AND m.notification_sent = FALSE
             ORDER BY m.moment_date ASC
         """
+        return await self._cached_fetch_all(query, (target_date,), tables=("moments", "users"))
+    
+    async def find_notification_row(self, moment_id: int) -> Optional[Dict[str, Any]]:
+        """Find one moment joined with its celebrant, as find_for_notification returns it"""
+        query = """
+            SELECT m.*, u.name as celebrant_name, u.teams_user_id as celebrant_teams_id
+            FROM moments m
+            LEFT JOIN users u ON m.person_name = u.name
+            WHERE m.id = ?
+        """
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (target_date,))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
\ No newline at end of file
+            return await conn.fetch_one(query, (moment_id,))
+    
+    async def find_details(self, moment_ids: List[int], greetings_limit: int = 20) -> List[Dict[str, Any]]:
+        """Load moments with celebrant, greeting count and first greetings page.
+        
+        Uses four set-based queries on one connection regardless of how many
+        moments are requested, plus two against the archive for archived ones.
+        """
+        ids = list(dict.fromkeys(moment_ids))
+        if not ids:
+            return []
+        
+        async def load():
+            id_marks = ", ".join("?" for _ in ids)
+            async with db_manager.get_connection() as conn:
+                moments = await conn.fetch_all(
+                    f"SELECT * FROM moments WHERE id IN ({id_marks})", ids
+                )
+                hot_ids = {m['id'] for m in moments}
+                archived_ids = [i for i in ids if i not in hot_ids] if await archive_boundary() is not None else []
+                archived_greetings: List[Dict[str, Any]] = []
+                if archived_ids:
+                    where = f"id IN ({', '.join('?' for _ in archived_ids)})"
+                    moments += await fetch_with_archive(conn, "moments", where, archived_ids, "id")
+                    archived_ids = [m['id'] for m in moments if m['id'] not in hot_ids]
+                if archived_ids:
+                    # Finished moments have few greetings; count and page them here
+                    where = f"moment_id IN ({', '.join('?' for _ in archived_ids)})"
+                    archived_greetings = await fetch_with_archive(
+                        conn, "greetings", where, archived_ids, "moment_id, created_at, id"
+                    )
+                if not moments:
+                    return []
+                
+                names = list({m['person_name'] for m in moments})
+                name_marks = ", ".join("?" for _ in names)
+                users = await conn.fetch_all(
+                    f"SELECT * FROM users WHERE name IN ({name_marks})", names
+                )
+                
+                counts = await conn.fetch_all(
+                    f"""SELECT moment_id, COUNT(*) AS greeting_count FROM greetings
+                        WHERE moment_id IN ({id_marks}) GROUP BY moment_id""",
+                    ids
+                )
+                
+                greetings = await conn.fetch_all(
+                    f"""SELECT * FROM (
+                            SELECT g.*, ROW_NUMBER() OVER (
+                                PARTITION BY g.moment_id ORDER BY g.created_at, g.id
+                            ) AS page_rank
+                            FROM greetings g WHERE g.moment_id IN ({id_marks})
+                        ) AS ranked
+                        WHERE page_rank <= ?
+                        ORDER BY moment_id, page_rank""",
+                    [*ids, greetings_limit]
+                )
+            
+            users_by_name = {}
+            for user in users:
+                users_by_name.setdefault(user['name'], user)
+            count_by_moment = {row['moment_id']: row['greeting_count'] for row in counts}
+            greetings_by_moment: Dict[int, List[Dict[str, Any]]] = {}
+            for greeting in greetings:
+                greeting.pop('page_rank', None)
+                greetings_by_moment.setdefault(greeting['moment_id'], []).append(greeting)
+            for greeting in archived_greetings:
+                count_by_moment[greeting['moment_id']] = count_by_moment.get(greeting['moment_id'], 0) + 1
+                page = greetings_by_moment.setdefault(greeting['moment_id'], [])
+                if len(page) < greetings_limit:
+                    page.append(greeting)
+            
+            moments_by_id = {m['id']: m for m in moments}
+            return [
+                {
+                    "moment": moments_by_id[moment_id],
+                    "celebrant": users_by_name.get(moments_by_id[moment_id]['person_name']),
+                    "greeting_count": count_by_moment.get(moment_id, 0),
+                    "greetings": greetings_by_moment.get(moment_id, []),
+                }
+                for moment_id in ids if moment_id in moments_by_id
+            ]
+        
+        details = await cached(
+            ("moments", "users", "greetings"), ("moment_details", tuple(ids), greetings_limit), load
+        )
+        # The cached entry is shared by every caller; hand out copies like _cached_fetch_all does
+        return copy.deepcopy(details)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import json
+from typing import List, Dict, Any, Optional
+from datetime import date
+from app.repositories.base import BaseRepository
+from app.core.database import db_manager
+from app.core.cache import cached
+
+
+class NotificationDigestRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("notification_digest")
+    
+    async def is_built(self, digest_date: date) -> bool:
+        """Check whether the digest for a date has been built"""
+        query = "SELECT 1 FROM notification_digest_builds WHERE digest_date = ?"
+        async with db_manager.get_connection() as conn:
+            return await conn.fetch_one(query, (digest_date,)) is not None
+    
+    async def replace_day(self, digest_date: date, entries: List[Dict[str, Any]]):
+        """Replace all digest rows for a date and record the build"""
+        async with db_manager.get_connection() as conn:
+            await conn.execute("DELETE FROM notification_digest WHERE digest_date = ?", (digest_date,))
+            for entry in entries:
+                await conn.execute(
+                    "INSERT INTO notification_digest (digest_date, moment_id, payload) VALUES (?, ?, ?)",
+                    (digest_date, entry['id'], json.dumps(entry, default=str))
+                )
+            await conn.execute(
+                """INSERT INTO notification_digest_builds (digest_date, moment_count, built_at)
+                   VALUES (?, ?, CURRENT_TIMESTAMP)
+                   ON CONFLICT (digest_date) DO UPDATE
+                   SET moment_count = excluded.moment_count, built_at = excluded.built_at""",
+                (digest_date, len(entries))
+            )
+            # Only today's digest is ever served; keep the table compact
+            await conn.execute("DELETE FROM notification_digest WHERE digest_date < ?", (digest_date,))
+            await conn.execute("DELETE FROM notification_digest_builds WHERE digest_date < ?", (digest_date,))
+            await conn.commit()
+    
+    async def upsert_entry(self, digest_date: date, entry: Dict[str, Any]):
+        """Insert or replace one moment in a day's digest"""
+        query = """
+            INSERT INTO notification_digest (digest_date, moment_id, payload) VALUES (?, ?, ?)
+            ON CONFLICT (digest_date, moment_id) DO UPDATE SET payload = excluded.payload
+        """
+        async with db_manager.get_connection() as conn:
+            await conn.execute(query, (digest_date, entry['id'], json.dumps(entry, default=str)))
+            await conn.commit()
+    
+    async def delete_entry(self, digest_date: date, moment_id: int):
+        """Remove one moment from a day's digest"""
+        query = "DELETE FROM notification_digest WHERE digest_date = ? AND moment_id = ?"
+        async with db_manager.get_connection() as conn:
+            if await conn.execute(query, (digest_date, moment_id)):
+                await conn.commit()
+    
+    async def find_by_date(self, digest_date: date) -> List[Dict[str, Any]]:
+        """Get the decoded digest entries for a date, ordered by moment id"""
+        query = "SELECT payload FROM notification_digest WHERE digest_date = ? ORDER BY moment_id"
+        
+        async def load():
+            async with db_manager.get_connection() as conn:
+                rows = await conn.fetch_all(query, (digest_date,))
+            return [json.loads(row['payload']) for row in rows]
+        
+        return await cached(("notification_digest",), ("notification_digest", digest_date), load)
@@ -1,15 +1,18 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 from app.repositories.base import BaseRepository
 from app.core.database import db_manager
+from app.core.counters import Total
 
 
 class QuestRepository(BaseRepository):
     def __init__(self):
         super().__init__("quests")
     
-    async def find_by_type(self, quest_type: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        query = "SELECT * FROM quests WHERE quest_type = ? ORDER BY id LIMIT ? OFFSET ?"
+    async def find_by_type(self, quest_type: str, skip: int = 0, limit: int = 100,
+                           fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM quests WHERE quest_type = ? ORDER BY id LIMIT ? OFFSET ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (quest_type, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
\ No newline at end of file
+            return await conn.fetch_all(query, (quest_type, limit, skip))
+    
+    async def count_by_type(self, quest_type: str) -> Total:
+        return await self.count_rows("quest_type", quest_type)
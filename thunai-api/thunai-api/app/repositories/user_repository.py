@@ -1,39 +1,41 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from app.repositories.base import BaseRepository
 from app.core.database import db_manager
+from app.core.counters import Total
 
 
 class UserRepository(BaseRepository):
     def __init__(self):
         super().__init__("users")
     
-    async def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        query = "SELECT * FROM users WHERE email = ?"
-        async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (email,))
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+    async def find_by_email(self, email: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM users WHERE email = ?"
+        return await self._cached_fetch_one(query, (email,))
     
-    async def find_by_admin_status(self, is_admin: bool, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        query = "SELECT * FROM users WHERE is_admin = ? ORDER BY id LIMIT ? OFFSET ?"
+    async def find_by_admin_status(self, is_admin: bool, skip: int = 0, limit: int = 100,
+                                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM users WHERE is_admin = ? ORDER BY id LIMIT ? OFFSET ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (is_admin, limit, skip))
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            return await conn.fetch_all(query, (is_admin, limit, skip))
     
-    async def find_by_name(self, name: str) -> Optional[Dict[str, Any]]:
-        query = "SELECT * FROM users WHERE name LIKE ?"
-        async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (f"%{name}%",))
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+    async def count_by_admin_status(self, is_admin: bool) -> Total:
+        return await self.count_rows("is_admin", is_admin)
+    
+    async def find_by_name(self, name: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        # LOWER() keeps SQLite's case-insensitive LIKE semantics on PostgreSQL
+        query = f"SELECT {self._select(fields)} FROM users WHERE LOWER(name) LIKE LOWER(?)"
+        return await self._cached_fetch_one(query, (f"%{name}%",))
     
-    async def find_by_teams_user_id(self, teams_user_id: str) -> Optional[Dict[str, Any]]:
-        query = "SELECT * FROM users WHERE teams_user_id = ?"
+    async def find_names_after(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Ids, Teams ids and names of users after `after_id`, in id order"""
+        query = "SELECT id, teams_user_id, name FROM users WHERE id > ? ORDER BY id LIMIT ?"
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(query, (teams_user_id,))
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+            return await conn.fetch_all(query, (after_id, limit))
+    
+    async def find_by_teams_user_id(self, teams_user_id: str,
+                                    fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        query = f"SELECT {self._select(fields)} FROM users WHERE teams_user_id = ?"
+        return await self._cached_fetch_one(query, (teams_user_id,))
     
     async def create(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         query = """
@@ -41,14 +43,13 @@ class UserRepository(BaseRepository):
         VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
         """
         async with db_manager.get_connection() as conn:
-            cursor = await conn.execute(
+            user_id = await conn.insert(
                 query,
                 (user_data['teams_user_id'], user_data['name'], user_data['email'], 
                  user_data.get('is_admin', False))
             )
             await conn.commit()
-            user_id = cursor.lastrowid
-            return await self.find_by_id(user_id)
+        return await self.find_by_id(user_id)
     
     async def update(self, user_id: int, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         set_clauses = []
@@ -68,4 +69,4 @@ class UserRepository(BaseRepository):
         async with db_manager.get_connection() as conn:
             await conn.execute(query, values)
             await conn.commit()
-            return await self.find_by_id(user_id)
\ No newline at end of file
+        return await self.find_by_id(user_id)
\ No newline at end of file
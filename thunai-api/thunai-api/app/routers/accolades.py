@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
 from app.services.accolade_service import AccoladeService
 from app.models.schemas import AccoladeResponse
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 
 router = APIRouter(prefix="/accolades", tags=["accolades"])
 accolade_service = AccoladeService()
@@ -10,32 +12,44 @@ accolade_service = AccoladeService()
 @router.get("/", response_model=List[AccoladeResponse])
 async def get_accolades(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    fields: ListSelection = Depends(list_fields(AccoladeResponse))
 ):
-    return await accolade_service.get_all(skip, limit)
+    return fields.respond(
+        await accolade_service.get_all(skip, limit, fields.columns),
+        await accolade_service.count_all()
+    )
 
 
 @router.get("/{accolade_id}", response_model=AccoladeResponse)
-async def get_accolade(accolade_id: int):
-    accolade = await accolade_service.get_by_id(accolade_id)
+async def get_accolade(accolade_id: int, fields: FieldSelection = Depends(select_fields(AccoladeResponse))):
+    accolade = await accolade_service.get_by_id(accolade_id, fields.columns)
     if not accolade:
         raise HTTPException(status_code=404, detail="Accolade not found")
-    return accolade
+    return fields.respond(accolade)
 
 
 @router.get("/user/{user_id}", response_model=List[AccoladeResponse])
 async def get_accolades_by_user(
     user_id: int,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(AccoladeResponse))
 ):
-    return await accolade_service.get_by_user_id(user_id, skip, limit)
+    return fields.respond(
+        await accolade_service.get_by_user_id(user_id, skip, limit, fields.columns),
+        await accolade_service.count_by_user_id(user_id)
+    )
 
 
 @router.get("/type/{accolade_type}", response_model=List[AccoladeResponse])
 async def get_accolades_by_type(
     accolade_type: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(AccoladeResponse))
 ):
-    return await accolade_service.get_by_type(accolade_type, skip, limit)
\ No newline at end of file
+    return fields.respond(
+        await accolade_service.get_by_type(accolade_type, skip, limit, fields.columns),
+        await accolade_service.count_by_type(accolade_type)
+    )
\ No newline at end of file
@@ -0,0 +1,131 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import List, Dict, Any
+from app.core.database import db_manager
+from app.core.cache import cache_stats
+from app.core.rate_limit import get_admission_stats
+from app.core.coalesce import coalesce_stats
+from app.core.encoding import get_encoding_stats
+from app.core.idempotency import get_idempotency_stats
+from app.core.profiling import profiler
+from app.core.backup import backups, BackupError
+from app.core.security import require_admin
+from app.services.archive_service import archiver
+from app.services.maintenance_service import maintenance
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/tenants")
+async def list_tenants() -> List[Dict[str, Any]]:
+    """List known tenants with their pool state and metrics"""
+    return [db_manager.tenant_status(tenant_id) for tenant_id in db_manager.list_tenants()]
+
+
+@router.post("/tenants/{tenant_id}", status_code=status.HTTP_201_CREATED)
+async def provision_tenant(tenant_id: str) -> Dict[str, Any]:
+    """Provision a new tenant database with the base schema"""
+    if not db_manager.is_valid_tenant_id(tenant_id):
+        raise HTTPException(status_code=400, detail=f"Invalid tenant id: {tenant_id}")
+    try:
+        return await db_manager.provision_tenant(tenant_id)
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/tenants/{tenant_id}/metrics")
+async def get_tenant_metrics(tenant_id: str) -> Dict[str, Any]:
+    """Get pool and request metrics for a tenant"""
+    if not db_manager.is_valid_tenant_id(tenant_id) or not db_manager.tenant_exists(tenant_id):
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return db_manager.tenant_status(tenant_id)
+
+
+@router.get("/cache")
+async def get_cache_stats() -> Dict[str, Any]:
+    """Get query cache hit rates and observed table versions per tenant"""
+    return cache_stats()
+
+
+@router.get("/admission")
+async def get_admission() -> Dict[str, Any]:
+    """Get admitted and shed request counts and the configured limits"""
+    return get_admission_stats()
+
+
+@router.get("/coalescing")
+async def get_coalescing_stats() -> Dict[str, Any]:
+    """Get how many service calls were collapsed into shared executions"""
+    return coalesce_stats()
+
+
+@router.get("/encoding")
+async def get_encoding() -> Dict[str, Any]:
+    """Get raw and sent response bytes per route for negotiated encodings"""
+    return get_encoding_stats()
+
+
+@router.get("/idempotency")
+async def get_idempotency() -> Dict[str, Any]:
+    """Get executed, replayed and conflicting Idempotency-Key requests"""
+    return get_idempotency_stats()
+
+
+@router.get("/profiles")
+async def list_profiles() -> List[Dict[str, Any]]:
+    """List the most recent request profiles taken by this worker, newest first"""
+    return profiler.recent()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$",
+                        description="speedscope JSON or collapsed stacks")
+):
+    """Get one request profile as speedscope JSON or collapsed stacks (flamegraph.pl)"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (profiles are kept per worker process)")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return profile.speedscope()
+
+
+@router.get("/archive")
+async def get_archive_status() -> Dict[str, Any]:
+    """Get the archive boundary, archived row counts and recent runs for the current tenant"""
+    return await archiver.status()
+
+
+@router.post("/archive/run")
+async def run_archive() -> Dict[str, Any]:
+    """Archive the current tenant's finished moments past the retention window now"""
+    return await archiver.run()
+
+
+@router.get("/maintenance")
+async def get_maintenance_status() -> Dict[str, Any]:
+    """Get the maintenance window and the recent task results for the current tenant"""
+    return await maintenance.status()
+
+
+@router.post("/maintenance/run")
+async def run_maintenance() -> Dict[str, Any]:
+    """Run maintenance for the current tenant now, outside the quiet window"""
+    return await maintenance.run(force=True)
+
+
+@router.get("/backups")
+async def get_backups() -> Dict[str, Any]:
+    """Get the last backup result and the retained snapshots for the current tenant"""
+    return backups.status()
+
+
+@router.post("/backups", status_code=status.HTTP_201_CREATED)
+async def create_backup() -> Dict[str, Any]:
+    """Take a verified online backup of the current tenant's databases now"""
+    try:
+        return await backups.backup()
+    except BackupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,35 @@
+import math
+from fastapi import APIRouter, HTTPException, Request
+from app.core.batch import BatchExecutor, BatchError
+from app.core.config import settings
+from app.core.rate_limit import AdmissionRejected, admit_requests
+from app.models.schemas import BatchRequest, BatchResponse
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+BATCH_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"}
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request):
+    """Run several API calls in one request; results come back in request order"""
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="A batch needs at least one request")
+    if len(batch.requests) > settings.batch_max_requests:
+        raise HTTPException(status_code=400, detail=f"A batch can have at most {settings.batch_max_requests} requests")
+    for sub in batch.requests:
+        if sub.method.upper() not in BATCH_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unsupported method: {sub.method}")
+    # Each call costs a token of its own class; only a batch that writes takes a write slot
+    try:
+        async with admit_requests(request.scope, [sub.method for sub in batch.requests]):
+            return await BatchExecutor(request.scope).run(
+                [sub.model_dump() for sub in batch.requests], batch.transactional
+            )
+    except AdmissionRejected as rejected:
+        raise HTTPException(
+            status_code=429, detail=rejected.detail,
+            headers={"Retry-After": str(max(1, math.ceil(rejected.retry_after)))}
+        )
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
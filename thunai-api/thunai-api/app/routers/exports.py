@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.export import (
+    ColumnarExport, ExportError, columnar_available, EXPORT_FORMATS, EXPORT_TABLES, EXPORT_WATERMARK_HEADER
+)
+from app.core.security import require_admin
+
+router = APIRouter(prefix="/exports", tags=["exports"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/{table}")
+async def export_table(
+    table: str,
+    export_format: str = Query("arrow", alias="format", description=f"One of: {', '.join(EXPORT_FORMATS)}"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export (id is always included)"),
+    since_id: int = Query(0, ge=0, description="Only rows with a larger id (a previous export's watermark)"),
+    since: Optional[datetime] = Query(None, description="Only rows created at or after this time")
+):
+    """Stream a table as Arrow IPC or Parquet; X-Export-Watermark is the since_id for the next export"""
+    if not columnar_available():
+        raise HTTPException(status_code=501, detail="Columnar export needs the optional pyarrow package")
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}. Available: {', '.join(EXPORT_TABLES)}")
+    columns = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        export = ColumnarExport(table, export_format, columns, since_id, since)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    watermark = await export.prepare()
+    return StreamingResponse(export.chunks(), media_type=export.media_type, headers={
+        EXPORT_WATERMARK_HEADER: str(watermark),
+        "Content-Disposition": f'attachment; filename="{export.filename}"',
+    })
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
 from app.services.gossip_service import GossipService
 from app.models.schemas import GossipResponse
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 
 router = APIRouter(prefix="/gossips", tags=["gossips"])
 gossip_service = GossipService()
@@ -10,23 +12,31 @@ gossip_service = GossipService()
 @router.get("/", response_model=List[GossipResponse])
 async def get_gossips(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    fields: ListSelection = Depends(list_fields(GossipResponse))
 ):
-    return await gossip_service.get_all(skip, limit)
+    return fields.respond(
+        await gossip_service.get_all(skip, limit, fields.columns),
+        await gossip_service.count_all()
+    )
 
 
 @router.get("/{gossip_id}", response_model=GossipResponse)
-async def get_gossip(gossip_id: int):
-    gossip = await gossip_service.get_by_id(gossip_id)
+async def get_gossip(gossip_id: int, fields: FieldSelection = Depends(select_fields(GossipResponse))):
+    gossip = await gossip_service.get_by_id(gossip_id, fields.columns)
     if not gossip:
         raise HTTPException(status_code=404, detail="Gossip not found")
-    return gossip
+    return fields.respond(gossip)
 
 
 @router.get("/type/{gossip_type}", response_model=List[GossipResponse])
 async def get_gossips_by_type(
     gossip_type: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(GossipResponse))
 ):
-    return await gossip_service.get_by_type(gossip_type, skip, limit)
\ No newline at end of file
+    return fields.respond(
+        await gossip_service.get_by_type(gossip_type, skip, limit, fields.columns),
+        await gossip_service.count_by_type(gossip_type)
+    )
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional, Dict, Any
 from app.services.greeting_service import GreetingService
-from app.models.schemas import GreetingResponse, GreetingCreate
+from app.models.schemas import GreetingResponse, GreetingCreate, GreetingCreateResponse
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 
 router = APIRouter(prefix="/greetings", tags=["greetings"])
 greeting_service = GreetingService()
@@ -10,13 +12,17 @@ greeting_service = GreetingService()
 @router.get("/", response_model=List[GreetingResponse])
 async def get_greetings(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    fields: ListSelection = Depends(list_fields(GreetingResponse))
 ):
     """Get all greetings with pagination"""
-    return await greeting_service.get_all(skip, limit)
+    return fields.respond(
+        await greeting_service.get_all(skip, limit, fields.columns),
+        await greeting_service.count_all()
+    )
 
 
-@router.post("/", response_model=GreetingResponse)
+@router.post("/", response_model=GreetingCreateResponse)
 async def create_greeting(greeting: GreetingCreate):
     """Create a new greeting for a moment"""
     try:
@@ -30,33 +36,51 @@ async def create_greeting(greeting: GreetingCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/duplicates")
+async def get_duplicate_greetings(
+    moment_id: Optional[int] = Query(None, description="Only report this moment"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+) -> Dict[str, Any]:
+    """Report near-duplicate greetings (flagged or collapsed) with the greeting they duplicate"""
+    return await greeting_service.get_duplicate_report(moment_id, skip, limit)
+
+
 @router.get("/{greeting_id}", response_model=GreetingResponse)
-async def get_greeting(greeting_id: int):
+async def get_greeting(greeting_id: int, fields: FieldSelection = Depends(select_fields(GreetingResponse))):
     """Get a specific greeting by ID"""
-    greeting = await greeting_service.get_by_id(greeting_id)
+    greeting = await greeting_service.get_by_id(greeting_id, fields.columns)
     if not greeting:
         raise HTTPException(status_code=404, detail="Greeting not found")
-    return greeting
+    return fields.respond(greeting)
 
 
 @router.get("/moment/{moment_id}", response_model=List[GreetingResponse])
 async def get_greetings_for_moment(
     moment_id: int,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(GreetingResponse))
 ):
     """Get all greetings for a specific moment"""
-    return await greeting_service.get_by_moment_id(moment_id, skip, limit)
+    return fields.respond(
+        await greeting_service.get_by_moment_id(moment_id, skip, limit, fields.columns),
+        await greeting_service.count_by_moment_id(moment_id)
+    )
 
 
 @router.get("/user/{user_id}", response_model=List[GreetingResponse])
 async def get_greetings_by_user(
     user_id: int,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(GreetingResponse))
 ):
     """Get all greetings sent by a specific user"""
-    return await greeting_service.get_by_user_id(user_id, skip, limit)
+    return fields.respond(
+        await greeting_service.get_by_user_id(user_id, skip, limit, fields.columns),
+        await greeting_service.count_by_user_id(user_id)
+    )
 
 
 @router.get("/moment/{moment_id}/count")
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Any, Dict, List, Optional
+from app.core.jobs import jobs, UnknownJobKind, JOB_STATUSES, FINISHED_STATUSES
+from app.core.security import require_admin
+from app.models.schemas import JobCreate, JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(require_admin)])
+
+
+async def _get_job(job_id: str) -> Dict[str, Any]:
+    job = await jobs.repository.find_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(job: JobCreate):
+    """Queue a long-running operation; poll GET /jobs/{job_id} for progress"""
+    try:
+        return await jobs.submit(job.kind, job.params)
+    except UnknownJobKind as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    job_status: Optional[str] = Query(None, alias="status", description=f"One of: {', '.join(JOB_STATUSES)}"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    return await jobs.repository.find_recent(job_status, limit)
+
+
+@router.get("/kinds")
+async def list_job_kinds() -> Dict[str, Any]:
+    """Get the registered job kinds and the worker pool state"""
+    return jobs.status()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    return await _get_job(job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask the worker running it to stop"""
+    job = await _get_job(job_id)
+    if job['status'] in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return await jobs.cancel(job_id)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str) -> Dict[str, Any]:
+    """Get a finished job's result (or error)"""
+    job = await _get_job(job_id)
+    if job['status'] not in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} ({job['progress']:.0%})")
+    return {"id": job['id'], "status": job['status'], "result": job['result'], "error": job['error']}
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.services.leaderboard_service import leaderboards, LEADERBOARD_METRICS, ALL_TIME
+from app.models.schemas import LeaderboardResponse
+
+router = APIRouter(prefix="/leaderboards", tags=["leaderboards"])
+
+
+@router.get("/{metric}", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    metric: str,
+    window: str = Query(ALL_TIME, description="Rolling window such as 7d or 30d, or 'all'"),
+    limit: int = Query(10, ge=1, le=100, description="Number of entries to return")
+):
+    """Get the top users for a metric: accolades, greetings_sent or greetings_received"""
+    if metric not in LEADERBOARD_METRICS:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown leaderboard: {metric}. Available: {', '.join(LEADERBOARD_METRICS)}"
+        )
+    if window not in leaderboards.windows:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown window: {window}. Available: {', '.join(leaderboards.windows)}"
+        )
+    return await leaderboards.get_leaderboard(metric, window, limit)
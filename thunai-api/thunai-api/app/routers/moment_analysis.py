@@ -3,6 +3,7 @@ from typing import Dict, Optional
 from pydantic import BaseModel
 import re
 from datetime import datetime, date
+from app.services.user_name_service import user_names
 
 router = APIRouter(prefix="/moment-analysis", tags=["moment-analysis"])
 
@@ -34,7 +35,16 @@ async def analyze_moment_text(request: MomentAnalysisRequest):
         "extracted_info": {}
     }
     
-    # Extract celebrant name (first capitalized word that's likely a name)
+    # Known users mentioned in the message, found in one scan of the name automaton;
+    # only a full name or "first L" naming one user outranks the pattern guess below
+    matched_users = await user_names.find_users(request.text)
+    unambiguous = [m for m in matched_users if not m["ambiguous"] and m["users"]]
+    known = next((m for m in unambiguous if m["full_name"]), None)
+    if known:
+        result["celebrant_name"] = known["users"][0]["name"]
+        result["confidence"] += 0.3
+    
+    # Otherwise guess the celebrant (first capitalized word that's likely a name)
     name_patterns = [
         r"^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:is|has|will|'s|won|received|got|achieved)",
         r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:birthday|anniversary|joining|leaving)",
@@ -42,13 +52,21 @@ async def analyze_moment_text(request: MomentAnalysisRequest):
         r"^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s"  # Name at start followed by space
     ]
     
-    for pattern in name_patterns:
+    for pattern in (name_patterns if not known else []):
         match = re.search(pattern, request.text)
         if match:
             result["celebrant_name"] = match.group(1)
             result["confidence"] += 0.3
             break
     
+    # A lone first or last name identifies the celebrant the pattern found, or fills in when it found none
+    if not known and unambiguous:
+        guess = result["celebrant_name"]
+        known = next((m for m in unambiguous if m["matched_text"] == guess), None) if guess else unambiguous[0]
+        if known and not guess:
+            result["celebrant_name"] = known["users"][0]["name"]
+            result["confidence"] += 0.3
+    
     # Detect moment type and category
     type_keywords = {
         # WELCOME
@@ -112,7 +130,11 @@ async def analyze_moment_text(request: MomentAnalysisRequest):
     # Store extracted info
     result["extracted_info"] = {
         "original_text": request.text,
-        "detected_keywords": [kw for kw in type_keywords.get(result["moment_type"], []) if kw in text]
+        "detected_keywords": [kw for kw in type_keywords.get(result["moment_type"], []) if kw in text],
+        "matched_users": matched_users,
+        "matched_user_ids": list(dict.fromkeys(u["id"] for m in matched_users for u in m["users"])),
+        "celebrant_user_id": known["users"][0]["id"] if known else None,
+        "celebrant_teams_user_id": known["users"][0]["teams_user_id"] if known else None,
     }
     
     return MomentAnalysisResponse(**result)
\ No newline at end of file
@@ -1,20 +1,59 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from app.services.moment_service import MomentService
-from app.models.schemas import MomentResponse, MomentCreate, MomentUpdate
+from app.models.schemas import (
+    MomentResponse, MomentCreate, MomentUpdate, MomentDetailResponse, NotificationDigestEntry, MOMENT_CATEGORIES
+)
+from app.services.notification_digest_service import notification_digest
+from app.services.greeting_card_service import greeting_cards, CARD_FORMATS
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 from datetime import date
 
 router = APIRouter(prefix="/moments", tags=["moments"])
 moment_service = MomentService()
 
+MAX_DETAIL_IDS = 100
+
 
 @router.get("/", response_model=List[MomentResponse])
 async def get_moments(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    moment_type: Optional[str] = Query(None, alias="type", description="Moment type, e.g. birthday"),
+    category: Optional[str] = Query(None, description="welcome, celebration or farewell"),
+    date_from: Optional[date] = Query(None, alias="from", description="Moments on or after this date"),
+    date_to: Optional[date] = Query(None, alias="to", description="Moments on or before this date"),
+    active: Optional[bool] = Query(None, description="Only active (true) or inactive (false) moments"),
+    person: Optional[str] = Query(None, description="Celebrant name"),
+    notified: Optional[bool] = Query(None, description="Whether the team has been notified"),
+    order: str = Query("desc", description="By moment date: desc (newest first) or asc"),
+    fields: ListSelection = Depends(list_fields(MomentResponse))
 ):
-    """Get all moments with pagination"""
-    return await moment_service.get_all(skip, limit)
+    """
+    Get moments with pagination, optionally filtered.
+    
+    Filters combine (AND) into one indexed query ordered by moment date; without
+    any filter all moments are listed by id as before.
+    """
+    if moment_type is not None and moment_type not in MOMENT_CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Invalid type. Must be one of: {', '.join(MOMENT_CATEGORIES)}")
+    if category is not None and category not in set(MOMENT_CATEGORIES.values()):
+        raise HTTPException(status_code=400, detail="Invalid category. Must be: welcome, celebration, or farewell")
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Must be: asc or desc")
+    filters = moment_service.search_filters(moment_type, category, date_from, date_to, active, person, notified)
+    if not filters:
+        return fields.respond(
+            await moment_service.get_all(skip, limit, fields.columns),
+            await moment_service.count_all()
+        )
+    return fields.respond(
+        await moment_service.search(filters, order == "desc", skip, limit, fields.columns),
+        await moment_service.count_search(filters)
+    )
 
 
 @router.post("/", response_model=MomentResponse)
@@ -37,13 +76,84 @@ async def create_moment(moment: MomentCreate):
     return result
 
 
+@router.get("/details", response_model=List[MomentDetailResponse])
+async def get_moment_details(
+    ids: str = Query(..., description="Comma-separated moment IDs"),
+    greetings_limit: int = Query(20, ge=0, le=100, description="Greetings to include per moment")
+):
+    """
+    Get several moments with their celebrant, greeting count and first page of greetings.
+    
+    Replaces one moments call plus a greetings and user lookup per moment; the
+    response keeps the order of `ids` and skips unknown IDs.
+    """
+    try:
+        moment_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if len(moment_ids) > MAX_DETAIL_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DETAIL_IDS} ids per request")
+    return await moment_service.get_details(moment_ids, greetings_limit)
+
+
+@router.get("/range", response_model=List[MomentResponse])
+async def get_moments_by_date_range(
+    start_date: date,
+    end_date: date,
+    fields: FieldSelection = Depends(select_fields(MomentResponse))
+):
+    """Get moments within a date range, including archived ones for older dates"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return fields.respond(await moment_service.get_by_date_range(start_date, end_date, fields.columns))
+
+
 @router.get("/{moment_id}", response_model=MomentResponse)
-async def get_moment(moment_id: int):
+async def get_moment(moment_id: int, fields: FieldSelection = Depends(select_fields(MomentResponse))):
     """Get a specific moment by ID"""
-    moment = await moment_service.get_by_id(moment_id)
+    moment = await moment_service.get_by_id(moment_id, fields.columns)
     if not moment:
         raise HTTPException(status_code=404, detail="Moment not found")
-    return moment
+    return fields.respond(moment)
+
+
+@router.get("/{moment_id}/detail", response_model=MomentDetailResponse)
+async def get_moment_detail(
+    moment_id: int,
+    greetings_limit: int = Query(20, ge=0, le=100, description="Greetings to include")
+):
+    """Get a moment with its celebrant, greeting count and first page of greetings"""
+    details = await moment_service.get_details([moment_id], greetings_limit)
+    if not details:
+        raise HTTPException(status_code=404, detail="Moment not found")
+    return details[0]
+
+
+@router.get("/{moment_id}/card")
+async def get_moment_card(
+    moment_id: int,
+    request: Request,
+    format: str = Query("adaptive", description="Card format: adaptive (Adaptive Card JSON) or html")
+):
+    """
+    Get the compiled greeting card for a moment.
+    
+    The card is kept up to date as greetings arrive and is limited to
+    GREETING_CARD_MAX_BYTES; greetings beyond the limit are summarized.
+    Supports conditional requests via ETag / If-None-Match.
+    """
+    if format not in CARD_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Must be: adaptive or html")
+    card = await greeting_cards.get_card(moment_id)
+    if not card:
+        raise HTTPException(status_code=404, detail="Moment not found")
+    
+    etag = card.etag(format)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    media_type = "application/json" if format == "adaptive" else "text/html; charset=utf-8"
+    return Response(content=card.document(format), media_type=media_type, headers=headers)
 
 
 @router.put("/{moment_id}", response_model=MomentResponse)
@@ -59,36 +169,48 @@ async def update_moment(moment_id: int, moment_update: MomentUpdate):
 async def get_moments_by_user(
     user_id: int,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(MomentResponse))
 ):
     """Get all moments for a specific user"""
-    return await moment_service.get_by_user_id(user_id, skip, limit)
+    return fields.respond(
+        await moment_service.get_by_user_id(user_id, skip, limit, fields.columns),
+        await moment_service.count_by_user_id(user_id)
+    )
 
 
 @router.get("/type/{moment_type}", response_model=List[MomentResponse])
 async def get_moments_by_type(
     moment_type: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(MomentResponse))
 ):
     """Get moments by type (birthday, work_anniversary, lwd, etc.)"""
-    return await moment_service.get_by_type(moment_type, skip, limit)
+    return fields.respond(
+        await moment_service.get_by_type(moment_type, skip, limit, fields.columns),
+        await moment_service.count_by_type(moment_type)
+    )
 
 
 @router.get("/status/{status}", response_model=List[MomentResponse])
 async def get_moments_by_status(
     status: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(MomentResponse))
 ):
     """Get moments by status (active, completed, cancelled)"""
-    return await moment_service.get_by_status(status, skip, limit)
+    return fields.respond(
+        await moment_service.get_by_status(status, skip, limit, fields.columns),
+        await moment_service.count_by_status(status)
+    )
 
 
 @router.get("/upcoming/{days}", response_model=List[MomentResponse])
-async def get_upcoming_moments(days: int = 7):
+async def get_upcoming_moments(days: int = 7, fields: FieldSelection = Depends(select_fields(MomentResponse))):
     """Get upcoming moments in the next N days"""
-    return await moment_service.get_upcoming(days)
+    return fields.respond(await moment_service.get_upcoming(days, fields.columns))
 
 
 @router.post("/{moment_id}/notify")
@@ -113,15 +235,29 @@ async def mark_moment_completed(moment_id: int):
 async def get_moments_by_category(
     category: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(MomentResponse))
 ):
     """Get moments by category (welcome, celebration, farewell)"""
     if category not in ['welcome', 'celebration', 'farewell']:
         raise HTTPException(status_code=400, detail="Invalid category. Must be: welcome, celebration, or farewell")
-    return await moment_service.get_by_category(category, skip, limit)
+    return fields.respond(
+        await moment_service.get_by_category(category, skip, limit, fields.columns),
+        await moment_service.count_by_category(category)
+    )
+
+
+@router.get("/notifications/today", response_model=List[NotificationDigestEntry])
+async def get_todays_notifications():
+    """
+    Get today's moments that need notification, with celebrant info and greeting prompt category.
+    
+    Served from the precomputed daily digest ("today" uses the server's configured timezone).
+    """
+    return await notification_digest.get_today()
 
 
 @router.get("/notifications/{target_date}", response_model=List[MomentResponse])
-async def get_moments_for_notification(target_date: date):
+async def get_moments_for_notification(target_date: date, fields: FieldSelection = Depends(select_fields(MomentResponse))):
     """Get moments that need notification on target date"""
-    return await moment_service.get_moments_for_notification(target_date)
\ No newline at end of file
+    return fields.respond(await moment_service.get_moments_for_notification(target_date, fields.columns))
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
 from app.services.quest_service import QuestService
 from app.models.schemas import QuestResponse
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 
 router = APIRouter(prefix="/quests", tags=["quests"])
 quest_service = QuestService()
@@ -10,23 +12,31 @@ quest_service = QuestService()
 @router.get("/", response_model=List[QuestResponse])
 async def get_quests(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    fields: ListSelection = Depends(list_fields(QuestResponse))
 ):
-    return await quest_service.get_all(skip, limit)
+    return fields.respond(
+        await quest_service.get_all(skip, limit, fields.columns),
+        await quest_service.count_all()
+    )
 
 
 @router.get("/{quest_id}", response_model=QuestResponse)
-async def get_quest(quest_id: int):
-    quest = await quest_service.get_by_id(quest_id)
+async def get_quest(quest_id: int, fields: FieldSelection = Depends(select_fields(QuestResponse))):
+    quest = await quest_service.get_by_id(quest_id, fields.columns)
     if not quest:
         raise HTTPException(status_code=404, detail="Quest not found")
-    return quest
+    return fields.respond(quest)
 
 
 @router.get("/type/{quest_type}", response_model=List[QuestResponse])
 async def get_quests_by_type(
     quest_type: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(QuestResponse))
 ):
-    return await quest_service.get_by_type(quest_type, skip, limit)
\ No newline at end of file
+    return fields.respond(
+        await quest_service.get_by_type(quest_type, skip, limit, fields.columns),
+        await quest_service.count_by_type(quest_type)
+    )
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List
 from app.services.thought_service import ThoughtService
 from app.models.schemas import ThoughtResponse
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 
 router = APIRouter(prefix="/thoughts", tags=["thoughts"])
 thought_service = ThoughtService()
@@ -10,23 +12,31 @@ thought_service = ThoughtService()
 @router.get("/", response_model=List[ThoughtResponse])
 async def get_thoughts(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    fields: ListSelection = Depends(list_fields(ThoughtResponse))
 ):
-    return await thought_service.get_all(skip, limit)
+    return fields.respond(
+        await thought_service.get_all(skip, limit, fields.columns),
+        await thought_service.count_all()
+    )
 
 
 @router.get("/{thought_id}", response_model=ThoughtResponse)
-async def get_thought(thought_id: int):
-    thought = await thought_service.get_by_id(thought_id)
+async def get_thought(thought_id: int, fields: FieldSelection = Depends(select_fields(ThoughtResponse))):
+    thought = await thought_service.get_by_id(thought_id, fields.columns)
     if not thought:
         raise HTTPException(status_code=404, detail="Thought not found")
-    return thought
+    return fields.respond(thought)
 
 
 @router.get("/type/{thought_type}", response_model=List[ThoughtResponse])
 async def get_thoughts_by_type(
     thought_type: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(ThoughtResponse))
 ):
-    return await thought_service.get_by_type(thought_type, skip, limit)
\ No newline at end of file
+    return fields.respond(
+        await thought_service.get_by_type(thought_type, skip, limit, fields.columns),
+        await thought_service.count_by_type(thought_type)
+    )
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Optional
 from app.services.user_service import UserService
-from app.models.schemas import UserResponse, UserCreate, UserUpdate
+from app.models.schemas import UserResponse, UserCreate, UserUpdate, MomentResponse, InboxBatchResponse
+from app.core.projection import FieldSelection, select_fields
+from app.core.pagination import ListSelection, list_fields
 
 router = APIRouter(prefix="/users", tags=["users"])
 user_service = UserService()
@@ -10,50 +12,77 @@ user_service = UserService()
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    fields: ListSelection = Depends(list_fields(UserResponse))
 ):
-    return await user_service.get_all(skip, limit)
+    return fields.respond(
+        await user_service.get_all(skip, limit, fields.columns),
+        await user_service.count_all()
+    )
+
+
+# Declared before /{user_id} so "inbox" isn't taken for a user id
+@router.get("/inbox", response_model=InboxBatchResponse)
+async def get_all_inboxes(days: int = Query(7, ge=0, le=90, description="Look this many days ahead of today")):
+    """Get every user's pending moments in one pass, for the daily fan-out"""
+    return await user_service.get_inboxes(days)
+
+
+@router.get("/{teams_user_id}/inbox", response_model=List[MomentResponse])
+async def get_user_inbox(
+    teams_user_id: str,
+    days: int = Query(7, ge=0, le=90, description="Look this many days ahead of today")
+):
+    """Get today's and upcoming moments the user hasn't greeted yet (moments about the user excluded)"""
+    inbox = await user_service.get_inbox(teams_user_id, days)
+    if inbox is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return inbox
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int):
-    user = await user_service.get_by_id(user_id)
+async def get_user(user_id: int, fields: FieldSelection = Depends(select_fields(UserResponse))):
+    user = await user_service.get_by_id(user_id, fields.columns)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return fields.respond(user)
 
 
 @router.get("/email/{email}", response_model=UserResponse)
-async def get_user_by_email(email: str):
-    user = await user_service.get_by_email(email)
+async def get_user_by_email(email: str, fields: FieldSelection = Depends(select_fields(UserResponse))):
+    user = await user_service.get_by_email(email, fields.columns)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return fields.respond(user)
 
 
 @router.get("/admin/{is_admin}", response_model=List[UserResponse])
 async def get_users_by_admin_status(
     is_admin: bool,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: ListSelection = Depends(list_fields(UserResponse))
 ):
-    return await user_service.get_by_admin_status(is_admin, skip, limit)
+    return fields.respond(
+        await user_service.get_by_admin_status(is_admin, skip, limit, fields.columns),
+        await user_service.count_by_admin_status(is_admin)
+    )
 
 
 @router.get("/name/{name}", response_model=UserResponse)
-async def get_user_by_name(name: str):
-    user = await user_service.get_by_name(name)
+async def get_user_by_name(name: str, fields: FieldSelection = Depends(select_fields(UserResponse))):
+    user = await user_service.get_by_name(name, fields.columns)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return fields.respond(user)
 
 
 @router.get("/teams-id/{teams_user_id}", response_model=UserResponse)
-async def get_user_by_teams_id(teams_user_id: str):
-    user = await user_service.get_by_teams_user_id(teams_user_id)
+async def get_user_by_teams_id(teams_user_id: str, fields: FieldSelection = Depends(select_fields(UserResponse))):
+    user = await user_service.get_by_teams_user_id(teams_user_id, fields.columns)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return fields.respond(user)
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -0,0 +1,57 @@
+from typing import Dict, Any
+from datetime import timedelta
+from app.repositories.archive_repository import ArchiveRepository
+from app.core.archive import archive_db_path, archive_boundary, archive_supported
+from app.core.database import db_manager
+from app.core.scheduler import local_now
+from app.core.config import settings
+
+
+class ArchiveService:
+    """Moves finished moments older than the retention window to the archive database"""
+
+    def __init__(self):
+        self.repository = ArchiveRepository()
+
+    @staticmethod
+    def cutoff():
+        return local_now().date() - timedelta(days=settings.archive_retention_days)
+
+    async def run(self) -> Dict[str, Any]:
+        """Archive the current tenant's finished moments past the retention window"""
+        if not archive_supported():
+            return {"skipped": True, "reason": "Archival is only supported with the SQLite backend"}
+        result = await self.repository.archive_before(self.cutoff(), settings.archive_batch_size)
+        if settings.enable_debug_logs:
+            print(f"Archived {result['moments_moved']} moments and {result['greetings_moved']} greetings "
+                  f"before {result['cutoff_date']} (tenant: {db_manager.current_tenant()})")
+        return result
+
+    async def run_all_tenants(self):
+        """Run archival for every tenant with an open pool"""
+        if not settings.archive_enabled:
+            return
+        for tenant_id in db_manager.open_tenants():
+            token = db_manager.set_current_tenant(tenant_id)
+            try:
+                await self.run()
+            finally:
+                db_manager.reset_current_tenant(token)
+
+    async def status(self) -> Dict[str, Any]:
+        """Get the archive location, boundary, archived row counts and recent runs"""
+        if not archive_supported():
+            return {"supported": False}
+        boundary = await archive_boundary()
+        return {
+            "supported": True,
+            "enabled": settings.archive_enabled,
+            "retention_days": settings.archive_retention_days,
+            "archive_path": archive_db_path(),
+            "boundary": boundary.isoformat() if boundary else None,
+            "archived": await self.repository.count_archived(),
+            "recent_runs": await self.repository.find_runs(),
+        }
+
+
+archiver = ArchiveService()
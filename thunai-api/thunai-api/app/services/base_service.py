@@ -1,25 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, TypeVar, Generic
+from typing import Any, List, Optional, Sequence, Type, TypeVar, Generic
+from pydantic import BaseModel
 from app.repositories.base import BaseRepository
+from app.core.projection import partial_model
+from app.core.counters import Total
 
 T = TypeVar('T')
 
 
 class BaseService(ABC, Generic[T]):
+    # Schema the service's rows are returned as; `fields=` projections narrow it
+    response_model: Type[BaseModel]
+    
     def __init__(self, repository: BaseRepository):
         self.repository = repository
     
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[T]:
-        data = await self.repository.find_all(skip, limit)
-        return [self._map_to_model(item) for item in data]
+    async def get_all(self, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[T]:
+        data = await self.repository.find_all(skip, limit, fields)
+        return [self._map(item, fields) for item in data]
     
-    async def get_by_id(self, id: int) -> Optional[T]:
-        data = await self.repository.find_by_id(id)
-        return self._map_to_model(data) if data else None
+    async def get_by_id(self, id: int, fields: Optional[Sequence[str]] = None) -> Optional[T]:
+        data = await self.repository.find_by_id(id, fields)
+        return self._map(data, fields) if data else None
     
     async def get_count(self) -> int:
         return await self.repository.count()
     
+    async def count_all(self) -> Total:
+        return await self.repository.count_rows()
+    
+    def _map(self, data: dict, fields: Optional[Sequence[str]] = None) -> Any:
+        """Map a row to the response schema, or to its projection when `fields` is given"""
+        if fields:
+            return partial_model(self.response_model, tuple(fields))(**data)
+        return self._map_to_model(data)
+    
     @abstractmethod
     def _map_to_model(self, data: dict) -> T:
-        pass
\ No newline at end of file
+        pass
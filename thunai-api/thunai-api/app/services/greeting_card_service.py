@@ -0,0 +1,215 @@
+import json
+import html
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.repositories.greeting_repository import GreetingRepository
+from app.repositories.moment_repository import MomentRepository
+from app.core.cache import current_table_versions, rewrite_version_key
+from app.core.config import settings
+from app.core.database import TenantScoped
+
+CARD_TITLES = {
+    'birthday': "Happy Birthday, {name}!",
+    'work_anniversary': "Happy Work Anniversary, {name}!",
+    'promotion': "Congratulations on your promotion, {name}!",
+    'achievement': "Congratulations, {name}!",
+    'new_hire': "Welcome to the team, {name}!",
+    'lwd': "Farewell and all the best, {name}!",
+}
+ADAPTIVE_SCHEMA = "http://adaptivecards.io/schemas/adaptive-card.json"
+# Room kept for the title, count and overflow blocks when budgeting greeting items
+HEADER_RESERVE_BYTES = 1024
+CARD_FORMATS = ("adaptive", "html")
+
+
+class CompiledCard:
+    """Rendered greeting card for one moment, extended one greeting at a time.
+
+    Each greeting is serialized once into an Adaptive Card element and an HTML
+    fragment; the full documents are only re-joined when they are next served.
+    A greeting collapsed into a near-duplicate adds its sender to that
+    greeting's entry instead of getting one of its own.
+    """
+
+    def __init__(self, moment: Dict[str, Any]):
+        self.moment_id = moment['id']
+        self.moment_version = (moment['person_name'], moment['moment_type'], moment['updated_at'])
+        self.title = CARD_TITLES.get(moment['moment_type'], "Celebrating {name}!").format(name=moment['person_name'])
+        self.last_greeting_id = 0
+        self.greeting_count = 0
+        self.text_length = 0
+        self.collapsed_count = 0
+        self.stamp = None
+        # Greetings rewrite version the card was compiled at (None: unknown, recompile on next use)
+        self.rewrites = None
+        self._adaptive_items: List[str] = []
+        self._html_items: List[str] = []
+        # Shown greeting id -> [position, text, senders, size]
+        self._entries: Dict[int, List[Any]] = {}
+        self._items_size = 0
+        # Running checksum of every greeting appended, so an edited greeting changes the ETag
+        self._content_crc = 0
+        self._documents: Dict[str, bytes] = {}
+
+    @property
+    def shown_count(self) -> int:
+        return len(self._adaptive_items)
+
+    @staticmethod
+    def _render_item(text: str, senders: List[str]) -> Tuple[str, str, int]:
+        byline = ", ".join(str(sender) for sender in senders)
+        adaptive = json.dumps({
+            "type": "Container",
+            "separator": True,
+            "items": [
+                {"type": "TextBlock", "text": text, "wrap": True},
+                {"type": "TextBlock", "text": f"- {byline}", "isSubtle": True, "spacing": "None"},
+            ],
+        })
+        fragment = f"<li><blockquote>{html.escape(text)}</blockquote><cite>{html.escape(byline)}</cite></li>"
+        return adaptive, fragment, max(len(adaptive), len(fragment.encode("utf-8"))) + 2
+
+    def append(self, greeting: Dict[str, Any]):
+        if greeting['id'] <= self.last_greeting_id:
+            return
+        self.last_greeting_id = greeting['id']
+        self.greeting_count += 1
+        self.text_length += len(greeting['greeting_text'])
+        self._documents.clear()
+
+        sender = greeting.get('sender_name') or greeting.get('greeting_from_name') or greeting.get('user_id') or "A teammate"
+        self._content_crc = zlib.crc32(f"{greeting['id']}|{sender}|{greeting['greeting_text']}".encode("utf-8"), self._content_crc)
+        entry = self._entries.get(greeting.get('collapsed_into'))
+        if entry is not None:
+            position, text, senders, old_size = entry
+            senders.append(sender)
+            adaptive, fragment, entry[3] = self._render_item(text, senders)
+            self._items_size += entry[3] - old_size
+            self._adaptive_items[position] = adaptive
+            self._html_items[position] = fragment
+            self.collapsed_count += 1
+            return
+
+        adaptive, fragment, size = self._render_item(greeting['greeting_text'], [sender])
+        budget = settings.greeting_card_max_bytes - HEADER_RESERVE_BYTES
+        if self._items_size + size > budget:
+            # Over the size limit: the greeting is counted but only summarized
+            return
+        self._items_size += size
+        self._entries[greeting['id']] = [len(self._adaptive_items), greeting['greeting_text'], [sender], size]
+        self._adaptive_items.append(adaptive)
+        self._html_items.append(fragment)
+
+    def _count_text(self) -> str:
+        noun = "greeting" if self.greeting_count == 1 else "greetings"
+        return f"{self.greeting_count} {noun} from the team"
+
+    def _overflow_text(self) -> Optional[str]:
+        hidden = self.greeting_count - self.shown_count - self.collapsed_count
+        if hidden <= 0:
+            return None
+        return f"...and {hidden} more {'greeting' if hidden == 1 else 'greetings'}"
+
+    def _render_adaptive(self) -> bytes:
+        blocks = [
+            json.dumps({"type": "TextBlock", "text": self.title, "size": "Large", "weight": "Bolder", "wrap": True}),
+            json.dumps({"type": "TextBlock", "text": self._count_text(), "isSubtle": True}),
+            *self._adaptive_items,
+        ]
+        overflow = self._overflow_text()
+        if overflow:
+            blocks.append(json.dumps({"type": "TextBlock", "text": overflow, "isSubtle": True, "wrap": True}))
+        return (
+            f'{{"type": "AdaptiveCard", "$schema": "{ADAPTIVE_SCHEMA}", "version": "1.4", '
+            f'"body": [{", ".join(blocks)}]}}'
+        ).encode("utf-8")
+
+    def _render_html(self) -> bytes:
+        overflow = self._overflow_text()
+        return (
+            '<article class="greeting-card">'
+            f"<h1>{html.escape(self.title)}</h1>"
+            f'<p class="greeting-count">{html.escape(self._count_text())}</p>'
+            f"<ul>{''.join(self._html_items)}</ul>"
+            + (f'<p class="greeting-overflow">{html.escape(overflow)}</p>' if overflow else "")
+            + "</article>"
+        ).encode("utf-8")
+
+    def document(self, card_format: str) -> bytes:
+        document = self._documents.get(card_format)
+        if document is None:
+            document = self._render_adaptive() if card_format == "adaptive" else self._render_html()
+            self._documents[card_format] = document
+        return document
+
+    def etag(self, card_format: str) -> str:
+        # Derived from content inputs so every worker produces the same tag
+        version = f"{self.moment_version}|{self.last_greeting_id}|{self.greeting_count}|{self._content_crc}|{card_format}"
+        return f'"card-{self.moment_id}-{zlib.crc32(version.encode("utf-8")):08x}"'
+
+
+class GreetingCardService:
+    """Keeps a compiled greeting card per moment, appended to as greetings arrive.
+
+    New greetings are appended. The greetings rewrite version covers the whole
+    table, so once any greeting was edited, deactivated or deleted (archived),
+    every card is compiled again from scratch on its next use.
+
+    Without table versions (PostgreSQL, cache disabled, inside a transaction)
+    a card is kept while the count and total text length of the greetings it
+    holds are unchanged in the database. An edit that keeps the text length
+    goes unnoticed there.
+    """
+
+    def __init__(self):
+        self.repository = GreetingRepository()
+        self.moment_repository = MomentRepository()
+        self._cards: TenantScoped["OrderedDict[int, CompiledCard]"] = TenantScoped(lambda tenant_id: OrderedDict())
+
+    async def _catch_up(self, card: CompiledCard):
+        for greeting in await self.repository.find_for_card(card.moment_id, card.last_greeting_id):
+            card.append(greeting)
+
+    async def get_card(self, moment_id: int) -> Optional[CompiledCard]:
+        """Get the up-to-date compiled card for a moment, or None if the moment doesn't exist"""
+        versions = await current_table_versions()
+        stamp = (versions.get('moments'), versions.get('greetings')) if versions else None
+        rewrites = versions.get(rewrite_version_key('greetings')) if versions else None
+        cards = self._cards.get()
+        card = cards.get(moment_id)
+        if card is not None and stamp is not None and card.stamp == stamp:
+            cards.move_to_end(moment_id)
+            return card
+
+        moment = await self.moment_repository.find_by_id(moment_id)
+        if not moment:
+            cards.pop(moment_id, None)
+            return None
+        stale = card is None or card.moment_version != (moment['person_name'], moment['moment_type'], moment['updated_at'])
+        if not stale:
+            if versions is not None:
+                stale = card.rewrites is None or card.rewrites != rewrites
+            else:
+                # Untracked: check the greetings the card holds are still the ones in the database
+                signature = await self.repository.find_card_signature(moment_id, card.last_greeting_id)
+                stale = signature != (card.greeting_count, card.text_length)
+        if stale:
+            card = cards[moment_id] = CompiledCard(moment)
+            while len(cards) > settings.greeting_card_cache_size:
+                cards.popitem(last=False)
+        cards.move_to_end(moment_id)
+
+        await self._catch_up(card)
+        card.stamp = stamp
+        card.rewrites = rewrites
+        return card
+
+    async def on_greeting_created(self, greeting: Dict[str, Any]):
+        """Append a new greeting to its moment's card if that card is compiled"""
+        card = self._cards.get().get(greeting.get('moment_id'))
+        if card is not None:
+            await self._catch_up(card)
+
+
+greeting_cards = GreetingCardService()
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.repositories.greeting_repository import GreetingRepository
+from app.repositories.greeting_duplicate_repository import GreetingDuplicateRepository
+from app.core.minhash import LSHIndex, MinHasher
+from app.core.database import TenantScoped
+from app.core.config import settings
+
+DEDUP_MODES = ("off", "flag", "collapse")
+
+
+class MomentSignatures:
+    """LSH index over one moment's greetings, extended as greetings arrive"""
+
+    def __init__(self, moment_id: int):
+        self.moment_id = moment_id
+        self.index = LSHIndex(settings.greeting_dedup_num_perm, settings.greeting_dedup_threshold)
+        self.last_greeting_id = 0
+
+
+class GreetingDedupService:
+    """Finds near-duplicate greetings for a moment without comparing against every greeting.
+
+    Each moment's greetings are kept as MinHash signatures in an LSH index,
+    built on first use and caught up with greetings written since (by any
+    worker) before every check. Near-duplicates are always stored and recorded
+    against the greeting they resemble: as `flagged`, or in `collapse` mode as
+    `collapsed`, which folds them into that greeting on the moment's card.
+    """
+
+    def __init__(self):
+        self.repository = GreetingDuplicateRepository()
+        self.greeting_repository = GreetingRepository()
+        self._hasher: Optional[MinHasher] = None
+        self._moments: TenantScoped["OrderedDict[int, MomentSignatures]"] = TenantScoped(lambda tenant_id: OrderedDict())
+
+    @property
+    def mode(self) -> str:
+        return settings.greeting_dedup_mode if settings.greeting_dedup_mode in DEDUP_MODES else "flag"
+
+    @property
+    def hasher(self) -> MinHasher:
+        if self._hasher is None or self._hasher.num_perm != settings.greeting_dedup_num_perm:
+            self._hasher = MinHasher(settings.greeting_dedup_num_perm)
+        return self._hasher
+
+    async def _signatures_for(self, moment_id: int) -> MomentSignatures:
+        moments = self._moments.get()
+        signatures = moments.get(moment_id)
+        if signatures is None:
+            signatures = moments[moment_id] = MomentSignatures(moment_id)
+            while len(moments) > settings.greeting_dedup_cache_size:
+                moments.popitem(last=False)
+        moments.move_to_end(moment_id)
+        for greeting in await self.greeting_repository.find_texts_for_moment(moment_id, signatures.last_greeting_id):
+            signatures.index.add(greeting['id'], self.hasher.signature(greeting['greeting_text']))
+            signatures.last_greeting_id = greeting['id']
+        return signatures
+
+    async def find_duplicate(self, moment_id: int, greeting_text: str) -> Optional[Tuple[int, float]]:
+        """Most similar existing greeting of the moment above the threshold, as (id, similarity)"""
+        if self.mode == "off":
+            return None
+        signatures = await self._signatures_for(moment_id)
+        return signatures.index.query(self.hasher.signature(greeting_text))
+
+    async def record_match(self, greeting: Dict[str, Any], match: Optional[Tuple[int, float]]):
+        """Link a stored near-duplicate to the greeting it resembles (flagged, or collapsed into it)"""
+        if self.mode == "off" or match is None or greeting.get('moment_id') is None:
+            return
+        action = "collapsed" if self.mode == "collapse" else "flagged"
+        await self.repository.record(
+            greeting['moment_id'], greeting['id'], match[0], match[1], action,
+            greeting.get('user_id'), greeting['greeting_text']
+        )
+
+    async def on_greeting_created(self, greeting: Dict[str, Any]):
+        """Index a stored greeting"""
+        if self.mode == "off" or greeting.get('moment_id') is None:
+            return
+        await self._signatures_for(greeting['moment_id'])
+
+    async def report(self, moment_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Get recorded near-duplicates with per-action totals"""
+        return {
+            "mode": self.mode,
+            "threshold": settings.greeting_dedup_threshold,
+            "totals": await self.repository.count_by_action(moment_id),
+            "duplicates": await self.repository.find_report(moment_id, skip, limit),
+        }
+
+
+greeting_dedup = GreetingDedupService()
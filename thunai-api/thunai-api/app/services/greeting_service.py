@@ -1,18 +1,25 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from app.services.base_service import BaseService
+from app.core.counters import Total
+from app.core.database import db_manager
 from app.repositories.greeting_repository import GreetingRepository
-from app.models.schemas import GreetingResponse, GreetingCreate
+from app.models.schemas import GreetingResponse, GreetingCreate, GreetingCreateResponse
+from app.services.greeting_card_service import greeting_cards
+from app.services.greeting_dedup_service import greeting_dedup
+from app.services.leaderboard_service import leaderboards
 from fastapi import HTTPException
 
 
 class GreetingService(BaseService[GreetingResponse]):
+    response_model = GreetingResponse
+    
     def __init__(self):
         super().__init__(GreetingRepository())
     
     def _map_to_model(self, data: dict) -> GreetingResponse:
         return GreetingResponse(**data)
     
-    async def create_greeting(self, greeting_data: GreetingCreate) -> Optional[GreetingResponse]:
+    async def create_greeting(self, greeting_data: GreetingCreate) -> Optional[GreetingCreateResponse]:
         """Create a new greeting (with duplicate check)"""
         # Check if user already sent a greeting for this moment
         existing = await self.repository.check_existing_greeting(
@@ -26,19 +33,50 @@ class GreetingService(BaseService[GreetingResponse]):
                 detail="User has already sent a greeting for this moment"
             )
         
+        match = await greeting_dedup.find_duplicate(greeting_data.moment_id, greeting_data.greeting_text)
+        
         data = greeting_data.model_dump()
-        result = await self.repository.create(data)
-        return self._map_to_model(result) if result else None
+        # The greeting and its duplicate link are committed together, so no card sees one without the other
+        async with db_manager.transaction():
+            result = await self.repository.create(data)
+            if result:
+                await greeting_dedup.record_match(result, match)
+                await db_manager.after_commit(self._on_created, result)
+        if not result:
+            return None
+        collapsed_into = match[0] if match and greeting_dedup.mode == "collapse" else None
+        return GreetingCreateResponse(**result, duplicate_of=collapsed_into)
+    
+    @staticmethod
+    async def _on_created(greeting: dict):
+        """Fold a committed greeting into this worker's dedup index, cards and leaderboards"""
+        await greeting_dedup.on_greeting_created(greeting)
+        await greeting_cards.on_greeting_created(greeting)
+        await leaderboards.on_greeting_created(greeting)
     
-    async def get_by_moment_id(self, moment_id: int, skip: int = 0, limit: int = 100) -> List[GreetingResponse]:
+    async def get_by_moment_id(self, moment_id: int, skip: int = 0, limit: int = 100,
+                               fields: Optional[Sequence[str]] = None) -> List[GreetingResponse]:
         """Get all greetings for a specific moment"""
-        data = await self.repository.find_by_moment_id(moment_id, skip, limit)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_moment_id(moment_id, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
     
-    async def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100) -> List[GreetingResponse]:
+    async def count_by_moment_id(self, moment_id: int) -> Total:
+        """Count all greetings for a specific moment"""
+        return await self.repository.count_by_moment_id(moment_id)
+    
+    async def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100,
+                             fields: Optional[Sequence[str]] = None) -> List[GreetingResponse]:
         """Get all greetings by a specific user"""
-        data = await self.repository.find_by_user_id(user_id, skip, limit)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_user_id(user_id, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
+    
+    async def count_by_user_id(self, user_id: int) -> Total:
+        """Count all greetings by a specific user"""
+        return await self.repository.count_by_user_id(user_id)
+    
+    async def get_duplicate_report(self, moment_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> dict:
+        """Get near-duplicate greetings found by the MinHash index"""
+        return await greeting_dedup.report(moment_id, skip, limit)
     
     async def get_greeting_count(self, moment_id: int) -> int:
         """Get total number of greetings for a moment"""
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+from typing import Any, Dict
+from pydantic import ValidationError
+from app.core.jobs import jobs, JobContext
+from app.core.backup import backups
+from app.core.export import ColumnarExport, write_export
+from app.core.storage import integrity_errors
+from app.models.schemas import UserCreate, UserUpdate
+from app.services.archive_service import archiver
+from app.services.maintenance_service import maintenance
+from app.services.notification_digest_service import notification_digest
+from app.services.user_service import UserService
+
+user_service = UserService()
+
+
+async def run_archive(context: JobContext) -> Dict[str, Any]:
+    return await archiver.run()
+
+
+async def run_maintenance(context: JobContext) -> Dict[str, Any]:
+    return await maintenance.run(force=True)
+
+
+async def run_backup(context: JobContext) -> Dict[str, Any]:
+    return await backups.backup()
+
+
+async def rebuild_digests(context: JobContext) -> Dict[str, Any]:
+    """Rebuild the notification digest for each date in `dates` (today by default)"""
+    dates = [date.fromisoformat(value) for value in context.params.get('dates') or []] or [notification_digest.today()]
+    built = {}
+    for done, digest_date in enumerate(dates):
+        built[digest_date.isoformat()] = await notification_digest.build(digest_date)
+        await context.report((done + 1) / len(dates), f"Built {digest_date}")
+    return {"built": built}
+
+
+async def import_users(context: JobContext) -> Dict[str, Any]:
+    """Create or update (by teams_user_id) every user in `users`"""
+    rows = context.params.get('users') or []
+    created = updated = 0
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            user = UserCreate(**row)
+            existing = await user_service.get_by_teams_user_id(user.teams_user_id)
+            if existing:
+                await user_service.update_user(existing.id, UserUpdate(**user.model_dump()))
+                updated += 1
+            else:
+                await user_service.create_user(user)
+                created += 1
+        except (ValidationError, TypeError, ValueError) as e:
+            errors.append({"index": index, "error": str(e)})
+        except integrity_errors() as e:
+            # e.g. the same teams_user_id created by someone else since the lookup
+            errors.append({"index": index, "error": f"Conflicts with an existing user: {e}"})
+        if (index + 1) % 25 == 0 or index + 1 == len(rows):
+            await context.report((index + 1) / len(rows), f"Imported {index + 1} of {len(rows)} users")
+    return {"created": created, "updated": updated, "errors": errors}
+
+
+async def export_table(context: JobContext) -> Dict[str, Any]:
+    """Write `table` as Arrow or Parquet under the export directory (optionally to `path` inside it)"""
+    params = context.params
+    since = params.get('since')
+    export = ColumnarExport(
+        params.get('table', ''), params.get('format', 'parquet'), params.get('columns'),
+        int(params.get('since_id') or 0), datetime.fromisoformat(since) if since else None
+    )
+
+    async def on_batch(progress: ColumnarExport):
+        await context.report(progress.progress, f"Exported {progress.rows} rows")
+
+    return await write_export(export, params.get('path'), on_batch)
+
+
+jobs.register("archive", run_archive)
+jobs.register("maintenance", run_maintenance)
+jobs.register("backup", run_backup)
+jobs.register("notification_digest", rebuild_digests)
+jobs.register("import_users", import_users)
+jobs.register("export", export_table)
@@ -0,0 +1,181 @@
+import asyncio
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from app.repositories.leaderboard_repository import LeaderboardRepository, METRIC_SOURCES, METRIC_TABLES
+from app.models.schemas import LeaderboardEntry, LeaderboardResponse
+from app.core.cache import current_table_versions
+from app.core.config import settings
+from app.core.database import TenantScoped
+from app.core.ranking import RankedScores
+from app.core.scheduler import local_now
+
+LEADERBOARD_METRICS = tuple(METRIC_SOURCES)
+ALL_TIME = "all"
+# Metric -> users column its subjects are (None: the subject is already a name)
+SUBJECT_USER_COLUMNS = {"accolades": "id", "greetings_sent": "teams_user_id", "greetings_received": None}
+
+
+def local_day(value: Any) -> date:
+    """Local calendar day of a stored date or UTC timestamp"""
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, date):
+        return value
+    else:
+        text = str(value)
+        if len(text) <= 10:
+            return date.fromisoformat(text)
+        moment = datetime.fromisoformat(text)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(ZoneInfo(settings.timezone)).date()
+
+
+class MetricBoards:
+    """One metric's rankings, one per window, covering source rows up to `last_id`"""
+
+    def __init__(self, metric: str):
+        self.metric = metric
+        self.boards: Dict[str, RankedScores] = {}
+        self.cutoffs: Dict[str, Optional[date]] = {}
+        self.last_id = 0
+        self.today: Optional[date] = None
+        self.stamp: Optional[int] = None
+        self.lock = asyncio.Lock()
+
+    def reset(self, today: date, windows: Dict[str, Optional[int]]):
+        self.today = today
+        self.boards = {window: RankedScores() for window in windows}
+        self.cutoffs = {
+            window: None if days is None else today - timedelta(days=days - 1) for window, days in windows.items()
+        }
+
+    def add(self, day: date, subject: str, score: int):
+        for window, board in self.boards.items():
+            cutoff = self.cutoffs[window]
+            if cutoff is None or day >= cutoff:
+                board.add(subject, score)
+
+
+class LeaderboardService:
+    """Top users by accolades, greetings sent and greetings received over rolling windows.
+
+    Every source row is folded once into `leaderboard_buckets` (score per
+    metric, local day and subject) behind a watermark, on writes and on
+    reads. Each worker keeps one ranking per metric and window in memory,
+    built from the buckets and then caught up with source rows past the
+    watermark, so an update is O(log n) and a top-k read O(k). The windows
+    are rebuilt from the buckets when the day rolls over.
+    """
+
+    def __init__(self):
+        self.repository = LeaderboardRepository()
+        self._boards: TenantScoped[Dict[str, MetricBoards]] = TenantScoped(
+            lambda tenant_id: {metric: MetricBoards(metric) for metric in LEADERBOARD_METRICS}
+        )
+
+    @property
+    def windows(self) -> Dict[str, Optional[int]]:
+        windows = {f"{days}d": days for days in sorted(set(settings.leaderboard_windows)) if days > 0}
+        windows[ALL_TIME] = None
+        return windows
+
+    @staticmethod
+    def _scores(rows: List[Dict[str, Any]]) -> "Counter[Tuple[date, str]]":
+        scores: Counter = Counter()
+        for row in rows:
+            scores[(local_day(row['happened_at']), str(row['subject']))] += 1
+        return scores
+
+    async def _fold_pending(self, metric: str):
+        """Fold source rows past the persisted watermark into the buckets"""
+        while True:
+            watermark = await self.repository.get_watermark(metric)
+            rows = await self.repository.find_source_rows(metric, watermark, settings.leaderboard_fold_batch)
+            if not rows:
+                return
+            await self.repository.fold(metric, watermark, rows[-1]['id'], self._scores(rows))
+            if len(rows) < settings.leaderboard_fold_batch:
+                return
+
+    async def _catch_up(self, boards: MetricBoards):
+        """Apply source rows past the in-memory watermark, folding those not yet in the buckets"""
+        while True:
+            rows = await self.repository.find_source_rows(boards.metric, boards.last_id, settings.leaderboard_fold_batch)
+            if not rows:
+                return
+            for (day, subject), score in self._scores(rows).items():
+                boards.add(day, subject, score)
+            boards.last_id = rows[-1]['id']
+            watermark = await self.repository.get_watermark(boards.metric)
+            unfolded = [row for row in rows if row['id'] > watermark]
+            if unfolded:
+                # Losing the race means another worker folded them; either way they are counted once
+                await self.repository.fold(boards.metric, watermark, unfolded[-1]['id'], self._scores(unfolded))
+            if len(rows) < settings.leaderboard_fold_batch:
+                return
+
+    async def _load(self, boards: MetricBoards, today: date):
+        """Rebuild a metric's rankings from the buckets, then catch up"""
+        await self._fold_pending(boards.metric)
+        windows = self.windows
+        while True:
+            watermark = await self.repository.get_watermark(boards.metric)
+            boards.reset(today, windows)
+            for window, cutoff in boards.cutoffs.items():
+                for row in await self.repository.find_totals(boards.metric, cutoff):
+                    boards.boards[window].add(row['subject'], int(row['score']))
+            # Buckets read while another worker folded more would count those rows twice
+            if await self.repository.get_watermark(boards.metric) == watermark:
+                break
+        boards.last_id = watermark
+        await self._catch_up(boards)
+        if settings.enable_debug_logs:
+            print(f"Loaded {boards.metric} leaderboards up to source id {watermark}")
+
+    async def _refresh(self, boards: MetricBoards):
+        async with boards.lock:
+            versions = await current_table_versions()
+            stamp = versions.get(METRIC_TABLES[boards.metric]) if versions else None
+            today = local_now().date()
+            if boards.today != today or set(boards.boards) != set(self.windows):
+                await self._load(boards, today)
+            elif stamp is None or stamp != boards.stamp:
+                await self._catch_up(boards)
+            boards.stamp = stamp
+
+    async def get_leaderboard(self, metric: str, window: str, limit: int) -> LeaderboardResponse:
+        """Top `limit` subjects of a metric over a window"""
+        if not await self.repository.has_source_table(metric):
+            return LeaderboardResponse(metric=metric, window=window, entries=[])
+        boards = self._boards.get()[metric]
+        await self._refresh(boards)
+        top = boards.boards[window].top(limit)
+        names: Dict[str, str] = {}
+        column = SUBJECT_USER_COLUMNS[metric]
+        if column == "id":
+            names = await self.repository.find_user_names(column, [int(subject) for subject, _ in top])
+        elif column:
+            names = await self.repository.find_user_names(column, [subject for subject, _ in top])
+        return LeaderboardResponse(metric=metric, window=window, entries=[
+            LeaderboardEntry(
+                rank=rank, subject=subject, score=score, name=subject if column is None else names.get(subject)
+            )
+            for rank, (subject, score) in enumerate(top, start=1)
+        ])
+
+    async def on_greeting_created(self, greeting: Dict[str, Any]):
+        """Fold a new greeting into the greeting leaderboards (and this worker's rankings, if loaded)"""
+        for metric, table in METRIC_TABLES.items():
+            if table != "greetings":
+                continue
+            boards = self._boards.get()[metric]
+            if boards.today is not None:
+                await self._refresh(boards)
+            else:
+                await self._fold_pending(metric)
+
+
+leaderboards = LeaderboardService()
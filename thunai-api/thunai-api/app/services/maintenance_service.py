@@ -0,0 +1,135 @@
+import time as clock
+from datetime import datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.repositories.maintenance_repository import MaintenanceRepository
+from app.core.database import db_manager
+from app.core.scheduler import local_now
+from app.core.config import settings
+
+# Tasks run in this order; later ones are skipped once the time budget is spent
+MAINTENANCE_TASKS = ("analyze", "optimize", "wal_checkpoint", "incremental_vacuum")
+
+
+class MaintenanceService:
+    """Runs SQLite housekeeping once a day inside the configured quiet window.
+
+    Every task is recorded in `maintenance_runs` with its status, duration and
+    what it did. A task is only started while the run's time budget lasts;
+    incremental vacuum works in page steps and stops when the budget runs out.
+    """
+
+    def __init__(self):
+        self.repository = MaintenanceRepository()
+
+    @staticmethod
+    def window() -> Tuple[time, time]:
+        return (time.fromisoformat(settings.maintenance_window_start),
+                time.fromisoformat(settings.maintenance_window_end))
+
+    def window_start(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Start of the quiet window `now` falls in, or None outside the window"""
+        now = now or local_now()
+        start, end = self.window()
+        today_start = now.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+        if start <= end:
+            return today_start if start <= now.time() < end else None
+        # Window crosses midnight, e.g. 23:00-02:00
+        if now.time() >= start:
+            return today_start
+        if now.time() < end:
+            return today_start - timedelta(days=1)
+        return None
+
+    async def _analyze(self, deadline: float) -> Tuple[str, str]:
+        await self.repository.analyze(settings.maintenance_analysis_limit)
+        return "ok", f"analysis_limit={settings.maintenance_analysis_limit}"
+
+    async def _optimize(self, deadline: float) -> Tuple[str, str]:
+        await self.repository.optimize()
+        return "ok", "PRAGMA optimize"
+
+    async def _wal_checkpoint(self, deadline: float) -> Tuple[str, str]:
+        journal_mode = str(await self.repository.pragma_value("journal_mode")).lower()
+        if journal_mode != "wal":
+            return "skipped", f"journal_mode is {journal_mode}"
+        result = await self.repository.wal_checkpoint()
+        values = list(result.values()) if result else [None, None, None]
+        return "ok", f"busy={values[0]} wal_pages={values[1]} checkpointed={values[2]}"
+
+    async def _incremental_vacuum(self, deadline: float) -> Tuple[str, str]:
+        auto_vacuum = await self.repository.pragma_value("auto_vacuum")
+        free_before = await self.repository.pragma_value("freelist_count")
+        if auto_vacuum != 2:
+            if not settings.maintenance_enable_incremental_vacuum:
+                return "skipped", f"auto_vacuum is not INCREMENTAL; {free_before} free pages"
+            await self.repository.enable_incremental_vacuum()
+            free_after = await self.repository.pragma_value("freelist_count")
+            return "ok", f"switched to INCREMENTAL with a full VACUUM; free pages {free_before} -> {free_after}"
+
+        free = free_before
+        while free and clock.monotonic() < deadline:
+            await self.repository.incremental_vacuum(settings.maintenance_vacuum_pages)
+            free = await self.repository.pragma_value("freelist_count")
+        status = "ok" if not free else "partial"
+        return status, f"free pages {free_before} -> {free}"
+
+    def _task(self, name: str) -> Callable[[float], Awaitable[Tuple[str, str]]]:
+        return getattr(self, f"_{name}")
+
+    async def run(self, force: bool = False) -> Dict[str, Any]:
+        """Run all maintenance tasks for the current tenant within the time budget"""
+        if db_manager.dialect != "sqlite":
+            return {"skipped": True, "reason": "Maintenance tasks are only needed for the SQLite backend"}
+        run_id = local_now().strftime("%Y-%m-%d %H:%M:%S")
+        started = clock.monotonic()
+        deadline = started + settings.maintenance_time_budget_ms / 1000
+        results: List[Dict[str, Any]] = []
+
+        for name in MAINTENANCE_TASKS:
+            task_started = clock.monotonic()
+            if task_started >= deadline:
+                status, detail = "skipped", "time budget exhausted"
+            else:
+                try:
+                    status, detail = await self._task(name)(deadline)
+                except Exception as e:
+                    status, detail = "error", str(e)
+            duration_ms = (clock.monotonic() - task_started) * 1000
+            await self.repository.record(run_id, name, status, duration_ms, detail)
+            results.append({"task": name, "status": status, "duration_ms": round(duration_ms, 3), "detail": detail})
+
+        if settings.enable_debug_logs:
+            print(f"Maintenance run {run_id} finished in {(clock.monotonic() - started) * 1000:.0f} ms "
+                  f"(tenant: {db_manager.current_tenant()})")
+        return {"run_id": run_id, "forced": force, "tasks": results}
+
+    async def run_due_tenants(self):
+        """Run maintenance for open tenants that haven't had a run in the current window"""
+        if not settings.maintenance_enabled:
+            return
+        window_start = self.window_start()
+        if window_start is None:
+            return
+        since = window_start.strftime("%Y-%m-%d %H:%M:%S")
+        for tenant_id in db_manager.open_tenants():
+            token = db_manager.set_current_tenant(tenant_id)
+            try:
+                # Checked in the database so several workers don't all run it
+                if not await self.repository.has_run_since(since):
+                    await self.run()
+            finally:
+                db_manager.reset_current_tenant(token)
+
+    async def status(self) -> Dict[str, Any]:
+        """Get the window, budget and recent task results for the current tenant"""
+        start, end = self.window()
+        return {
+            "enabled": settings.maintenance_enabled,
+            "window": f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')} {settings.timezone}",
+            "in_window": self.window_start() is not None,
+            "time_budget_ms": settings.maintenance_time_budget_ms,
+            "recent": await self.repository.find_recent() if db_manager.dialect == "sqlite" else [],
+        }
+
+
+maintenance = MaintenanceService()
@@ -1,13 +1,21 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from app.services.base_service import BaseService
-from app.repositories.moment_repository import MomentRepository
+from app.core.counters import Total
+from app.repositories.base import Filters
+from app.repositories.moment_repository import MomentRepository, category_types
 from app.repositories.user_repository import UserRepository
-from app.models.schemas import MomentResponse, MomentCreate, MomentUpdate
+from app.services.notification_digest_service import notification_digest
+from app.core.coalesce import coalesced
+from app.models.schemas import (
+    MomentResponse, MomentCreate, MomentUpdate, MomentDetailResponse, UserResponse, GreetingResponse
+)
 from datetime import date
 from fastapi import HTTPException
 
 
 class MomentService(BaseService[MomentResponse]):
+    response_model = MomentResponse
+    
     def __init__(self):
         super().__init__(MomentRepository())
         self.user_repository = UserRepository()
@@ -29,38 +37,85 @@ class MomentService(BaseService[MomentResponse]):
         # User exists - proceed with moment creation
         data = moment_data.model_dump()
         result = await self.repository.create(data)
+        if result and str(result['moment_date']) == notification_digest.today().isoformat():
+            await notification_digest.refresh_moment(result['id'])
         return self._map_to_model(result) if result else None
     
     async def update_moment(self, moment_id: int, update_data: MomentUpdate) -> Optional[MomentResponse]:
         """Update a moment"""
         data = update_data.model_dump(exclude_unset=True)
         result = await self.repository.update(moment_id, data)
+        if result:
+            await notification_digest.refresh_moment(moment_id)
         return self._map_to_model(result) if result else None
     
-    async def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100) -> List[MomentResponse]:
+    @staticmethod
+    def search_filters(moment_type: Optional[str] = None, category: Optional[str] = None,
+                       date_from: Optional[date] = None, date_to: Optional[date] = None,
+                       active: Optional[bool] = None, person_name: Optional[str] = None,
+                       notified: Optional[bool] = None) -> Filters:
+        """Combine the given moment filters; those left as None don't apply"""
+        return (
+            Filters()
+            .equals("moment_type", moment_type)
+            .any_of("moment_type", category_types(category) if category is not None else None)
+            .between("moment_date", date_from, date_to)
+            .equals("is_active", active)
+            .equals("person_name", person_name)
+            .equals("notification_sent", notified)
+        )
+    
+    async def search(self, filters: Filters, descending: bool = True, skip: int = 0, limit: int = 100,
+                     fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
+        """Get moments matching all filters, by date"""
+        data = await self.repository.search(filters, descending, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
+    
+    async def count_search(self, filters: Filters) -> Total:
+        """Count moments matching all filters"""
+        return await self.repository.count_search(filters)
+    
+    async def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100,
+                             fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get moments by user ID"""
-        data = await self.repository.find_by_user_id(user_id, skip, limit)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_user_id(user_id, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
+    
+    async def count_by_user_id(self, user_id: int) -> Total:
+        """Count moments by user ID"""
+        return await self.repository.count_by_user_id(user_id)
     
-    async def get_by_type(self, moment_type: str, skip: int = 0, limit: int = 100) -> List[MomentResponse]:
+    async def get_by_type(self, moment_type: str, skip: int = 0, limit: int = 100,
+                          fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get moments by type"""
-        data = await self.repository.find_by_type(moment_type, skip, limit)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_type(moment_type, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
     
-    async def get_by_status(self, status: str, skip: int = 0, limit: int = 100) -> List[MomentResponse]:
+    async def count_by_type(self, moment_type: str) -> Total:
+        """Count moments by type"""
+        return await self.repository.count_by_type(moment_type)
+    
+    async def get_by_status(self, status: str, skip: int = 0, limit: int = 100,
+                            fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get moments by status"""
-        data = await self.repository.find_by_status(status, skip, limit)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_status(status, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
+    
+    async def count_by_status(self, status: str) -> Total:
+        """Count moments by status"""
+        return await self.repository.count_by_status(status)
     
-    async def get_upcoming(self, days: int = 7) -> List[MomentResponse]:
+    @coalesced
+    async def get_upcoming(self, days: int = 7, fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get upcoming moments in the next N days"""
-        data = await self.repository.find_upcoming(days)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_upcoming(days, fields)
+        return [self._map(item, fields) for item in data]
     
-    async def get_by_date_range(self, start_date: date, end_date: date) -> List[MomentResponse]:
+    async def get_by_date_range(self, start_date: date, end_date: date,
+                                fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get moments within a date range"""
-        data = await self.repository.find_by_date_range(start_date, end_date)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_date_range(start_date, end_date, fields)
+        return [self._map(item, fields) for item in data]
     
     async def mark_as_notified(self, moment_id: int) -> Optional[MomentResponse]:
         """Mark moment as notified (team has been notified)"""
@@ -75,12 +130,36 @@ class MomentService(BaseService[MomentResponse]):
         )
         return await self.update_moment(moment_id, update_data)
     
-    async def get_by_category(self, category: str, skip: int = 0, limit: int = 100) -> List[MomentResponse]:
+    async def get_by_category(self, category: str, skip: int = 0, limit: int = 100,
+                              fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get moments by category (welcome/celebration/farewell)"""
-        data = await self.repository.find_by_category(category, skip, limit)
-        return [self._map_to_model(item) for item in data]
+        data = await self.repository.find_by_category(category, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
+    
+    async def count_by_category(self, category: str) -> Total:
+        """Count moments by category"""
+        return await self.repository.count_by_category(category)
     
-    async def get_moments_for_notification(self, target_date: date) -> List[MomentResponse]:
+    @coalesced
+    async def get_moments_for_notification(self, target_date: date,
+                                           fields: Optional[Sequence[str]] = None) -> List[MomentResponse]:
         """Get moments that need notification on target date"""
-        data = await self.repository.find_for_notification(target_date)
-        return [self._map_to_model(item) for item in data]
\ No newline at end of file
+        if target_date == notification_digest.today():
+            entries = await notification_digest.get_today()
+            # Served from the precomputed digest, so a projection only trims the response
+            return [self._map(entry.model_dump(), fields) for entry in entries] if fields else entries
+        data = await self.repository.find_for_notification(target_date, fields)
+        return [self._map(item, fields) for item in data]
+    
+    async def get_details(self, moment_ids: List[int], greetings_limit: int = 20) -> List[MomentDetailResponse]:
+        """Get moments with celebrant, greeting count and first page of greetings"""
+        data = await self.repository.find_details(moment_ids, greetings_limit)
+        return [
+            MomentDetailResponse(
+                moment=self._map_to_model(item['moment']),
+                celebrant=UserResponse(**item['celebrant']) if item['celebrant'] else None,
+                greeting_count=item['greeting_count'],
+                greetings=[GreetingResponse(**greeting) for greeting in item['greetings']],
+            )
+            for item in data
+        ]
@@ -0,0 +1,94 @@
+from typing import List, Dict, Any, Optional
+from datetime import date
+from app.services.base_service import BaseService
+from app.repositories.notification_digest_repository import NotificationDigestRepository
+from app.repositories.moment_repository import MomentRepository
+from app.models.schemas import NotificationDigestEntry, MOMENT_CATEGORIES
+from app.core.database import db_manager, TenantScoped
+from app.core.scheduler import local_now
+from app.core.config import settings
+
+
+class NotificationDigestService(BaseService[NotificationDigestEntry]):
+    """Precomputed list of moments due for notification today.
+    
+    The digest is built once per day (startup and midnight in the configured
+    timezone) from the moments/users join and stored in `notification_digest`.
+    Reads decode that table through the query cache, so serving today's
+    notifications does no join work. Moment writes patch single entries.
+    """
+    
+    def __init__(self):
+        super().__init__(NotificationDigestRepository())
+        self.moment_repository = MomentRepository()
+        # Dates known to have a built digest, per tenant
+        self._built_dates: TenantScoped[set] = TenantScoped(lambda tenant_id: set())
+    
+    def _map_to_model(self, data: dict) -> NotificationDigestEntry:
+        return NotificationDigestEntry(**data)
+    
+    @staticmethod
+    def today() -> date:
+        return local_now().date()
+    
+    @staticmethod
+    def _to_entry(row: Dict[str, Any]) -> Dict[str, Any]:
+        entry = dict(row)
+        entry['category'] = MOMENT_CATEGORIES.get(entry['moment_type'], 'celebration')
+        return entry
+    
+    @staticmethod
+    def _is_due(row: Dict[str, Any], digest_date: date) -> bool:
+        return (bool(row['is_active']) and not row['notification_sent']
+                and str(row['moment_date']) == digest_date.isoformat())
+    
+    async def _is_built(self, digest_date: date) -> bool:
+        built_dates = self._built_dates.get()
+        if digest_date not in built_dates:
+            if not await self.repository.is_built(digest_date):
+                return False
+            built_dates.add(digest_date)
+        return True
+    
+    async def build(self, digest_date: Optional[date] = None) -> int:
+        """Rebuild the digest for a date (today by default) with one join query"""
+        digest_date = digest_date or self.today()
+        rows = await self.moment_repository.find_for_notification(digest_date)
+        entries = [self._to_entry(row) for row in rows]
+        await self.repository.replace_day(digest_date, entries)
+        self._built_dates.get().add(digest_date)
+        if settings.enable_debug_logs:
+            print(f"Notification digest for {digest_date} built with {len(entries)} moments "
+                  f"(tenant: {db_manager.current_tenant()})")
+        return len(entries)
+    
+    async def build_all_tenants(self):
+        """Rebuild today's digest for every tenant with an open pool"""
+        for tenant_id in db_manager.open_tenants():
+            token = db_manager.set_current_tenant(tenant_id)
+            try:
+                await self.build()
+            finally:
+                db_manager.reset_current_tenant(token)
+    
+    async def get_today(self) -> List[NotificationDigestEntry]:
+        """Get today's due moments, building the digest first if needed"""
+        digest_date = self.today()
+        if not await self._is_built(digest_date):
+            await self.build(digest_date)
+        data = await self.repository.find_by_date(digest_date)
+        return [self._map_to_model(item) for item in data]
+    
+    async def refresh_moment(self, moment_id: int):
+        """Add, update or drop one moment in today's digest after it was written"""
+        digest_date = self.today()
+        if not await self._is_built(digest_date):
+            return
+        row = await self.moment_repository.find_notification_row(moment_id)
+        if row and self._is_due(row, digest_date):
+            await self.repository.upsert_entry(digest_date, self._to_entry(row))
+        else:
+            await self.repository.delete_entry(digest_date, moment_id)
+
+
+notification_digest = NotificationDigestService()
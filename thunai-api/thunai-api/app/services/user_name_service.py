@@ -0,0 +1,131 @@
+import time
+from typing import Any, Dict, List, Optional, Set
+from app.repositories.user_repository import UserRepository
+from app.core.name_matcher import NameAutomaton, name_variants, longest_matches, normalize_name
+from app.core.cache import current_table_versions
+from app.core.config import settings
+from app.core.database import TenantScoped
+
+# Users read per query while (re)loading an index
+LOAD_BATCH = 1000
+
+
+class UserNameIndex:
+    """One tenant's users and the automaton over their name variants"""
+
+    def __init__(self):
+        self.automaton = NameAutomaton()
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.variants: Dict[int, Set[str]] = {}
+        self.loaded = False
+        self.stamp: Optional[int] = None
+        # Highest user id read from the table, and when the index was last loaded in full
+        self.last_id = 0
+        self.loaded_at = 0.0
+
+    def put(self, user: Dict[str, Any]):
+        user_id = user['id']
+        new_variants = name_variants(user.get('name') or "")
+        for variant in self.variants.get(user_id, set()) - new_variants:
+            self.automaton.remove(variant, user_id)
+        for variant in new_variants - self.variants.get(user_id, set()):
+            self.automaton.add(variant, user_id)
+        self.variants[user_id] = new_variants
+        self.users[user_id] = {
+            "id": user_id, "teams_user_id": user.get('teams_user_id'), "name": user.get('name'),
+        }
+
+
+class UserNameService:
+    """Recognizes known users in free text with one scan per message.
+
+    The automaton is loaded from `users` once per tenant, then patched for
+    each user created or updated through the API. Writes made by other
+    workers are noticed through the `users` table version and trigger a
+    reload on the next scan. Without table versions, every scan picks up
+    users added since by id, and renames are seen on the full reload every
+    `user_name_index_reload_s`.
+
+    A full name or "first L" matches in any case. A lone first or last name
+    only matches where the text capitalizes it, so "welcome our new user"
+    doesn't find everyone whose last name is User.
+    """
+
+    def __init__(self):
+        self.repository = UserRepository()
+        self._indexes: TenantScoped[UserNameIndex] = TenantScoped(lambda tenant_id: UserNameIndex())
+
+    @staticmethod
+    async def users_version() -> Optional[int]:
+        versions = await current_table_versions()
+        return versions.get('users') if versions else None
+
+    async def _read_new_users(self, index: UserNameIndex):
+        while True:
+            users = await self.repository.find_names_after(index.last_id, LOAD_BATCH)
+            for user in users:
+                index.put(user)
+            if users:
+                index.last_id = users[-1]['id']
+            if len(users) < LOAD_BATCH:
+                return
+
+    async def _index(self) -> UserNameIndex:
+        index = self._indexes.get()
+        version = await self.users_version()
+        if version is None:
+            stale = not index.loaded or time.monotonic() - index.loaded_at >= settings.user_name_index_reload_s
+        else:
+            stale = not index.loaded or version != index.stamp
+        if stale:
+            index = UserNameIndex()
+            await self._read_new_users(index)
+            index.loaded = True
+            index.stamp = version
+            index.loaded_at = time.monotonic()
+            self._indexes.set(index)
+        elif version is None:
+            await self._read_new_users(index)
+        return index
+
+    async def on_user_saved(self, user: Dict[str, Any], version_before: Optional[int]):
+        """Add or re-index one user after a create or update.
+
+        `version_before` is the users version read before the write. The
+        index only moves its stamp past our own write when it was current
+        before it and nobody else wrote since; otherwise the next scan reloads.
+        """
+        index = self._indexes.get()
+        if not index.loaded:
+            return
+        index.put(user)
+        version = await self.users_version()
+        if version_before is not None and index.stamp == version_before and version == version_before + 1:
+            index.stamp = version
+
+    async def find_users(self, text: str) -> List[Dict[str, Any]]:
+        """Known users mentioned in `text`, longest name variant first at each position"""
+        index = await self._index()
+        found = [
+            (start, end, user_ids) for start, end, user_ids in index.automaton.find(text)
+            if _is_full_name(text[start:end]) or text[start].isupper()
+        ]
+        matches = []
+        for start, end, user_ids in longest_matches(found):
+            matches.append({
+                "matched_text": text[start:end],
+                "start": start,
+                "end": end,
+                "full_name": _is_full_name(text[start:end]),
+                "ambiguous": len(user_ids) > 1,
+                "users": [index.users[user_id] for user_id in sorted(user_ids) if user_id in index.users],
+            })
+        return matches
+
+
+def _is_full_name(matched_text: str) -> bool:
+    """A full name or "first L", as opposed to a lone first or last name"""
+    return " " in normalize_name(matched_text)
+
+
+user_names = UserNameService()
@@ -1,38 +1,91 @@
-from typing import List, Optional
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
 from app.services.base_service import BaseService
+from app.core.counters import Total
+from app.core.database import db_manager
 from app.repositories.user_repository import UserRepository
-from app.models.schemas import UserResponse, UserCreate, UserUpdate
+from app.repositories.moment_repository import MomentRepository
+from app.models.schemas import UserResponse, UserCreate, UserUpdate, MomentResponse, InboxBatchResponse, UserInbox
+from app.services.notification_digest_service import notification_digest
+from app.core.coalesce import coalesced
+from app.services.user_name_service import user_names
 
 
 class UserService(BaseService[UserResponse]):
+    response_model = UserResponse
+    
     def __init__(self):
         super().__init__(UserRepository())
+        self.moment_repository = MomentRepository()
     
     def _map_to_model(self, data: dict) -> UserResponse:
         return UserResponse(**data)
     
-    async def get_by_email(self, email: str) -> Optional[UserResponse]:
-        data = await self.repository.find_by_email(email)
-        return self._map_to_model(data) if data else None
+    async def get_by_email(self, email: str, fields: Optional[Sequence[str]] = None) -> Optional[UserResponse]:
+        data = await self.repository.find_by_email(email, fields)
+        return self._map(data, fields) if data else None
     
-    async def get_by_admin_status(self, is_admin: bool, skip: int = 0, limit: int = 100) -> List[UserResponse]:
-        data = await self.repository.find_by_admin_status(is_admin, skip, limit)
-        return [self._map_to_model(item) for item in data]
+    async def get_by_admin_status(self, is_admin: bool, skip: int = 0, limit: int = 100,
+                                  fields: Optional[Sequence[str]] = None) -> List[UserResponse]:
+        data = await self.repository.find_by_admin_status(is_admin, skip, limit, fields)
+        return [self._map(item, fields) for item in data]
     
-    async def get_by_name(self, name: str) -> Optional[UserResponse]:
-        data = await self.repository.find_by_name(name)
-        return self._map_to_model(data) if data else None
+    async def count_by_admin_status(self, is_admin: bool) -> Total:
+        return await self.repository.count_by_admin_status(is_admin)
     
-    async def get_by_teams_user_id(self, teams_user_id: str) -> Optional[UserResponse]:
-        data = await self.repository.find_by_teams_user_id(teams_user_id)
-        return self._map_to_model(data) if data else None
+    async def get_by_name(self, name: str, fields: Optional[Sequence[str]] = None) -> Optional[UserResponse]:
+        data = await self.repository.find_by_name(name, fields)
+        return self._map(data, fields) if data else None
+    
+    @coalesced
+    async def get_by_teams_user_id(self, teams_user_id: str,
+                                   fields: Optional[Sequence[str]] = None) -> Optional[UserResponse]:
+        data = await self.repository.find_by_teams_user_id(teams_user_id, fields)
+        return self._map(data, fields) if data else None
     
     async def create_user(self, user_create: UserCreate) -> UserResponse:
         user_data = user_create.model_dump()
+        users_version = await user_names.users_version()
         data = await self.repository.create(user_data)
+        await db_manager.after_commit(user_names.on_user_saved, data, users_version)
         return self._map_to_model(data)
     
     async def update_user(self, user_id: int, user_update: UserUpdate) -> Optional[UserResponse]:
         user_data = user_update.model_dump(exclude_unset=True)
+        users_version = await user_names.users_version()
         data = await self.repository.update(user_id, user_data)
-        return self._map_to_model(data) if data else None
\ No newline at end of file
+        if data:
+            await db_manager.after_commit(user_names.on_user_saved, data, users_version)
+        if data and ('name' in user_data or 'teams_user_id' in user_data):
+            # Celebrant info is denormalized into today's digest
+            await db_manager.after_commit(notification_digest.build)
+        return self._map_to_model(data) if data else None
+    
+    async def get_inbox(self, teams_user_id: str, days: int = 7) -> Optional[List[MomentResponse]]:
+        """Get today's and upcoming moments a user hasn't greeted yet, or None if the user doesn't exist"""
+        if not await self.repository.find_by_teams_user_id(teams_user_id, ("id",)):
+            return None
+        start = notification_digest.today()
+        data = await self.moment_repository.find_inbox(teams_user_id, start, start + timedelta(days=days))
+        return [MomentResponse(**item) for item in data]
+    
+    async def get_inboxes(self, days: int = 7) -> InboxBatchResponse:
+        """Get every user's inbox at once, with each pending moment listed once"""
+        start = notification_digest.today()
+        end = start + timedelta(days=days)
+        moments: Dict[int, MomentResponse] = {}
+        inboxes: Dict[str, UserInbox] = {}
+        for row in await self.moment_repository.find_inboxes(start, end):
+            teams_user_id = row.pop('inbox_teams_user_id')
+            name = row.pop('inbox_user_name')
+            if row['id'] not in moments:
+                moments[row['id']] = MomentResponse(**row)
+            inbox = inboxes.get(teams_user_id)
+            if inbox is None:
+                inbox = inboxes[teams_user_id] = UserInbox(teams_user_id=teams_user_id, name=name, moment_ids=[])
+            inbox.moment_ids.append(row['id'])
+        return InboxBatchResponse(
+            start_date=start, end_date=end,
+            moments=sorted(moments.values(), key=lambda moment: (moment.moment_date, moment.id)),
+            inboxes=list(inboxes.values())
+        )
@@ -1,9 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from datetime import time
 from app.core.database import db_manager
 from app.core.config import settings
-from app.routers import users, accolades, gossips, quests, thoughts, moments, greetings, moment_analysis
+from app.core.cache import close_caches
+from app.core.pagination import TOTAL_COUNT_HEADER, ESTIMATED_HEADER
+from app.core.scheduler import scheduler
+from app.core.backup import backups
+from app.services.notification_digest_service import notification_digest
+from app.services.archive_service import archiver
+from app.services.maintenance_service import maintenance
+from app.core.jobs import jobs as job_queue
+from app.services import job_handlers  # noqa: F401 (registers the job kinds)
+from app.core.tenancy import TenantMiddleware
+from app.core.rate_limit import AdmissionControlMiddleware
+from app.core.encoding import ResponseEncodingMiddleware
+from app.core.idempotency import IdempotencyMiddleware, purge_expired_keys
+from app.core.profiling import ProfilingMiddleware, PROFILE_ID_HEADER
+from app.core.export import EXPORT_WATERMARK_HEADER
+from app.routers import users, accolades, gossips, quests, thoughts, moments, greetings, moment_analysis, admin, jobs, batch, leaderboards, exports
 
 
 async def lifespan(app: FastAPI):
@@ -11,8 +27,20 @@ async def lifespan(app: FastAPI):
     if settings.enable_debug_logs:
         print("Database connected successfully!")
     
+    await notification_digest.build()
+    scheduler.daily("notification-digest", time(0, 0), notification_digest.build_all_tenants)
+    scheduler.daily("archive", time(3, 0), archiver.run_all_tenants)
+    scheduler.every("maintenance", 300, maintenance.run_due_tenants)
+    scheduler.every("idempotency-purge", 3600, purge_expired_keys)
+    scheduler.daily("backup", time.fromisoformat(settings.backup_time), backups.backup_all_tenants)
+    scheduler.start()
+    job_queue.start()
+    
     yield
     
+    await job_queue.stop()
+    await scheduler.stop()
+    await close_caches()
     await db_manager.close_pool()
     if settings.enable_debug_logs:
         print("Database connection closed.")
@@ -25,6 +53,22 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Answer retried POSTs carrying an Idempotency-Key from the stored first response
+# (inside admission control, so a request shed with 429 never claims or stores its key)
+app.add_middleware(IdempotencyMiddleware)
+
+# Per-client rate limits and write concurrency cap, shedding excess load with 429
+app.add_middleware(AdmissionControlMiddleware)
+
+# Route each request to its tenant database (no-op unless multi-tenant mode is enabled)
+app.add_middleware(TenantMiddleware)
+
+# Negotiated compression (gzip/brotli) and compact encodings (MessagePack, columnar JSON)
+app.add_middleware(ResponseEncodingMiddleware)
+
+# Sampling profiles of single requests (?profile=1 for admins, or a configured sample rate)
+app.add_middleware(ProfilingMiddleware)
+
 # CORS middleware for Teams bot
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +76,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TOTAL_COUNT_HEADER, ESTIMATED_HEADER, PROFILE_ID_HEADER, EXPORT_WATERMARK_HEADER],
 )
 
 # API routes
@@ -43,6 +88,11 @@ app.include_router(accolades.router, prefix="/api/v1")
 app.include_router(gossips.router, prefix="/api/v1")
 app.include_router(quests.router, prefix="/api/v1")
 app.include_router(thoughts.router, prefix="/api/v1")
+app.include_router(leaderboards.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(batch.router, prefix="/api/v1")
+app.include_router(exports.router, prefix="/api/v1")
 
 
 @app.get("/")
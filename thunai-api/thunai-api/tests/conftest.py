@@ -0,0 +1,138 @@
+"""Shared fixtures: a fresh database per test, on SQLite and (opt-in) PostgreSQL.
+
+SQLite tests run in the "memory" database mode (or "template" when
+DATABASE_MODE says so), so every test gets its own in-process database. Tests that need a database file
+(archival, backups, several connections watching the same file) use the
+`sqlite_file` fixture instead. PostgreSQL tests run only when
+TEST_POSTGRES_URL points at a throwaway database; its public schema is
+dropped and recreated before every test.
+"""
+import os
+from datetime import date
+from typing import Optional
+import aiosqlite
+import httpx
+import pytest
+from app.core.cache import close_caches
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.schema import BASE_SCHEMA
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+BACKENDS = [
+    "sqlite",
+    pytest.param("postgresql", marks=pytest.mark.skipif(
+        not POSTGRES_URL, reason="set TEST_POSTGRES_URL to a throwaway PostgreSQL database"
+    )),
+]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def test_settings(monkeypatch, tmp_path):
+    """Keep every test's files under its tmp_path, open the admin routes and lift the rate limits"""
+    overrides = {
+        "database_url": str(tmp_path / "thunai_culture.db"),
+        # DATABASE_MODE=template runs the suite on clones of a prebuilt template instead
+        "database_mode": os.environ.get("DATABASE_MODE", "memory"),
+        "database_seed_sql": None,
+        "database_template_path": str(tmp_path / "templates" / "thunai_culture_template.db"),
+        "tenant_database_dir": str(tmp_path / "tenants"),
+        "backup_dir": str(tmp_path / "backups"),
+        "export_dir": str(tmp_path / "exports"),
+        "multi_tenant_enabled": False,
+        "enable_debug_logs": False,
+        "admin_api_key": None,
+        "admin_auth_disabled": True,
+        # Buckets outlive a test; the tests about admission control turn it back on
+        "rate_limit_enabled": False,
+    }
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    return settings
+
+
+async def reset_postgres(url: str):
+    import asyncpg
+    connection = await asyncpg.connect(url)
+    try:
+        await connection.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    finally:
+        await connection.close()
+
+
+async def create_sqlite_file(path: str):
+    async with aiosqlite.connect(path) as connection:
+        await connection.executescript(BASE_SCHEMA)
+        await connection.commit()
+
+
+async def open_database():
+    await db_manager.create_pool()
+
+
+async def close_database():
+    await close_caches()
+    await db_manager.close_pool()
+
+
+@pytest.fixture(params=BACKENDS)
+async def database(request, monkeypatch, test_settings):
+    """An empty database on each backend, opened the way the app opens it"""
+    if request.param == "postgresql":
+        await reset_postgres(POSTGRES_URL)
+        monkeypatch.setattr(settings, "database_url", POSTGRES_URL)
+    await open_database()
+    yield request.param
+    await close_database()
+
+
+@pytest.fixture
+async def sqlite_file(monkeypatch, test_settings):
+    """An empty SQLite database file, for behaviour that needs one (archival, backups, other processes)"""
+    monkeypatch.setattr(settings, "database_mode", "file")
+    await create_sqlite_file(settings.database_url)
+    await open_database()
+    yield settings.database_url
+    await close_database()
+
+
+@pytest.fixture
+async def client(test_settings):
+    """An HTTP client for the app, run through its lifespan on a fresh in-memory database"""
+    from main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+            yield http
+
+
+@pytest.fixture
+def add_user(client):
+    """Create a user through the API; "Priya Sharma" gets the Teams id "t-priyasharma" """
+    async def add(name: str, **extra):
+        handle = name.lower().replace(" ", "")
+        response = await client.post("/api/v1/users/", json={
+            "teams_user_id": f"t-{handle}", "name": name, "email": f"{handle}@example.com", **extra,
+        })
+        assert response.status_code == 201, response.text
+        return response.json()
+    return add
+
+
+@pytest.fixture
+def add_moment(client):
+    """Create a moment through the API (a birthday today unless told otherwise)"""
+    async def add(person_name: str, created_by: str, moment_type: str = "birthday", moment_date: Optional[date] = None):
+        response = await client.post("/api/v1/moments/", json={
+            "person_name": person_name, "moment_type": moment_type,
+            "moment_date": (moment_date or date.today()).isoformat(), "created_by": created_by,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return add
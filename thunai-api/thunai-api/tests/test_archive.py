@@ -0,0 +1,175 @@
+"""Archival: history pages and counts span hot and archived rows, and only look in the archive when they must"""
+from datetime import date
+import pytest
+from app.core.archive import archive_boundary
+from app.core.database import db_manager
+from app.repositories import greeting_repository, moment_repository
+from app.repositories.archive_repository import ArchiveRepository
+from app.repositories.base import Filters
+from app.repositories.greeting_repository import GreetingRepository
+from app.repositories.moment_repository import MomentRepository
+from app.repositories.user_repository import UserRepository
+from app.services.greeting_card_service import greeting_cards
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+moments = MomentRepository()
+greetings = GreetingRepository()
+archive = ArchiveRepository()
+CUTOFF = date(2025, 1, 1)
+
+
+@pytest.fixture
+def archive_reads(monkeypatch):
+    """Counts the reads that went to the archive"""
+    calls = []
+    for module in (greeting_repository, moment_repository):
+        original = module.fetch_with_archive
+
+        async def spy(*args, _original=original, **kwargs):
+            calls.append(args[1])
+            return await _original(*args, **kwargs)
+
+        monkeypatch.setattr(module, "fetch_with_archive", spy)
+    return calls
+
+
+async def add_moment(person: str, moment_date: date, finished: bool):
+    moment = await moments.create({
+        "person_name": person, "moment_type": "birthday", "moment_date": moment_date, "created_by": "t-bob",
+    })
+    if finished:
+        await moments.update(moment["id"], {"notification_sent": True})
+    return moment
+
+
+async def greet(moment, sender: str, text: str):
+    return await greetings.create({
+        "moment_id": moment["id"], "user_id": sender, "greeting_text": text, "moment_type": "birthday",
+    })
+
+
+@pytest.fixture
+async def history(sqlite_file):
+    for name in ("Alice", "Bob"):
+        await users.create({"teams_user_id": f"t-{name.lower()}", "name": name, "email": f"{name.lower()}@example.com"})
+    old = [await add_moment("Alice", date(2024, 3, day), finished=True) for day in (1, 2, 3)]
+    recent = [await add_moment("Alice", date(2025, 6, day), finished=False) for day in (1, 2)]
+    for moment in old + recent:
+        await greet(moment, "t-bob", f"Greeting for {moment['moment_date']}")
+    await greet(old[0], "t-alice", "Second greeting")
+    return old, recent
+
+
+async def test_empty_run_does_not_move_the_boundary(history):
+    assert (await archive.archive_before(date(2020, 1, 1)))["moments_moved"] == 0
+    assert await archive_boundary() is None
+
+    assert (await archive.archive_before(CUTOFF))["moments_moved"] == 3
+    assert await archive_boundary() == CUTOFF
+    assert (await archive.archive_before(date(2025, 2, 1)))["moments_moved"] == 0
+    assert await archive_boundary() == CUTOFF
+
+
+async def test_pages_span_hot_and_archived_rows(history, archive_reads):
+    old, recent = history
+    await archive.archive_before(CUTOFF)
+    alice = await users.find_by_teams_user_id("t-alice")
+
+    sent = await greetings.find_by_user_id("t-bob", limit=100)
+    assert len(sent) == 5
+    assert [g["id"] for g in await greetings.find_by_user_id("t-bob", skip=3, limit=2)] == [g["id"] for g in sent[3:]]
+    assert (await greetings.count_by_user_id("t-bob")).value == 5
+
+    celebrated = await moments.find_by_user_id(alice["id"], limit=100)
+    assert [str(m["moment_date"]) for m in celebrated] == [
+        "2025-06-02", "2025-06-01", "2024-03-03", "2024-03-02", "2024-03-01",
+    ]
+    assert (await moments.count_by_user_id(alice["id"])).value == 5
+
+    archived_moment = old[0]["id"]
+    assert {g["greeting_text"] for g in await greetings.find_by_moment_id(archived_moment)} == {
+        "Greeting for 2024-03-01", "Second greeting",
+    }
+    assert (await greetings.count_by_moment_id(archived_moment)).value == 2
+    assert await greetings.count_greetings_for_moment(archived_moment) == 2
+    assert archive_reads
+
+
+async def test_search_pages_merge_the_archive_in_either_order(history):
+    await archive.archive_before(CUTOFF)
+    alice = Filters().equals("person_name", "Alice")
+
+    def dates(rows):
+        return [str(m["moment_date"]) for m in rows]
+
+    # A full page of hot rows ascending would skip the older, archived ones
+    assert dates(await moments.search(alice, descending=False, limit=2)) == ["2024-03-01", "2024-03-02"]
+    assert dates(await moments.search(alice, descending=False, skip=2, limit=2)) == ["2024-03-03", "2025-06-01"]
+    assert dates(await moments.search(alice, limit=2)) == ["2025-06-02", "2025-06-01"]
+    assert dates(await moments.search(alice, skip=1, limit=2)) == ["2025-06-01", "2024-03-03"]
+
+
+async def test_lookups_find_archived_moments(history):
+    old, recent = history
+    await archive.archive_before(CUTOFF)
+    archived_id = old[0]["id"]
+
+    assert (await moments.find_by_id(archived_id))["moment_date"] == old[0]["moment_date"]
+    assert await moments.find_by_id(10_000) is None
+    # Archived moments are read-only
+    assert await moments.update(archived_id, {"description": "edited"}) is None
+
+    assert len(await moments.find_by_type("birthday")) == 5
+    assert (await moments.count_by_type("birthday")).value == 5
+    assert len(await moments.find_by_status("active", limit=3)) == 3
+    assert (await moments.count_by_status("active")).value == 5
+    assert (await moments.count_by_category("celebration")).value == 5
+
+    [detail] = await moments.find_details([archived_id, 10_000], greetings_limit=1)
+    assert detail["moment"]["id"] == archived_id and detail["celebrant"]["name"] == "Alice"
+    assert detail["greeting_count"] == 2 and len(detail["greetings"]) == 1
+
+    card = await greeting_cards.get_card(archived_id)
+    assert card.greeting_count == 2
+    assert "Second greeting" in card.document("html").decode("utf-8")
+
+
+async def test_hot_only_requests_stay_out_of_the_archive(history, archive_reads):
+    old, recent = history
+    await archive.archive_before(CUTOFF)
+
+    # A hot moment's greetings were never archived, even on a short or empty page
+    assert len(await greetings.find_by_moment_id(recent[0]["id"], limit=10)) == 1
+    assert await greetings.find_by_moment_id(recent[0]["id"], skip=5) == []
+    assert (await greetings.count_by_moment_id(recent[0]["id"])).value == 1
+    # Carol has nothing archived, so her short pages don't look there either
+    await users.create({"teams_user_id": "t-carol", "name": "Carol", "email": "carol@example.com"})
+    await greet(recent[1], "t-carol", "Hello")
+    assert len(await greetings.find_by_user_id("t-carol")) == 1
+    carol = await users.find_by_teams_user_id("t-carol")
+    assert await moments.find_by_user_id(carol["id"]) == []
+    assert archive_reads == []
+
+
+async def test_hot_and_archived_counts_agree_before_archival(history):
+    old, _ = history
+    assert await greetings.count_greetings_for_moment(old[0]["id"]) == 2
+    assert (await greetings.count_by_moment_id(old[0]["id"])).value == 2
+
+
+async def test_archived_reads_inside_a_transaction(history):
+    old, _ = history
+    await archive.archive_before(CUTOFF)
+    # Fresh connections, so none has the archive attached yet
+    await db_manager.close_pool()
+    await db_manager.create_pool()
+
+    async with db_manager.transaction() as connection:
+        # Attached before the first statement: SQLite may refuse ATTACH inside a transaction
+        assert "archive" in [row["name"] for row in await connection.fetch_all("PRAGMA database_list")]
+        await users.create({"teams_user_id": "t-carol", "name": "Carol", "email": "carol@example.com"})
+        assert (await moments.find_by_id(old[0]["id"]))["person_name"] == "Alice"
+        assert (await greetings.count_by_moment_id(old[0]["id"])).value == 2
+    assert await users.find_by_teams_user_id("t-carol") is not None
@@ -0,0 +1,42 @@
+"""Backups: one scheduled snapshot per day whatever the number of worker processes"""
+import asyncio
+from datetime import datetime
+import pytest
+from app.core import backup as backup_module
+from app.core.backup import BackupError, BackupManager
+
+pytestmark = pytest.mark.anyio
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 3, 1, 1, 30, 0)
+
+
+def worker(name: str) -> BackupManager:
+    manager = BackupManager()
+    manager._process = name
+    return manager
+
+
+async def test_scheduled_backup_is_taken_by_one_worker(sqlite_file, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "backup_enabled", True)
+    workers = [worker(f"host:{pid}") for pid in range(3)]
+    await asyncio.gather(*(w.backup_all_tenants() for w in workers))
+    assert len(workers[0].list_snapshots("default")) == 1
+    assert sum(w.status("default")["last_run"] is not None for w in workers) == 1
+
+    # Later the same day nobody takes another one
+    await workers[1].backup_all_tenants()
+    assert len(workers[0].list_snapshots("default")) == 1
+
+
+async def test_same_second_snapshot_fails_without_touching_the_first(sqlite_file, monkeypatch):
+    monkeypatch.setattr(backup_module, "datetime", FrozenDatetime)
+    first = await worker("host:1").backup("default")
+    with pytest.raises(BackupError):
+        await worker("host:2").backup("default")
+    [snapshot] = worker("host:3").list_snapshots("default")
+    assert snapshot["snapshot"] == first["snapshot"]
+    assert snapshot["integrity"] == "ok"
@@ -0,0 +1,56 @@
+"""Transactional batches: a rolled-back batch leaves nothing behind, in the database or in memory"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def moment(test_settings, monkeypatch, add_user, add_moment):
+    monkeypatch.setattr(test_settings, "greeting_dedup_mode", "flag")
+    for name in ("Alice", "Bob", "Carol"):
+        await add_user(name)
+    return await add_moment("Alice", "t-carol")
+
+
+def greeting(moment, sender, text):
+    return {"moment_id": moment["id"], "user_id": sender, "greeting_text": text, "moment_type": "birthday"}
+
+
+async def test_rolled_back_greeting_leaves_no_trace_in_memory(client, moment):
+    card_url = f"/api/v1/moments/{moment['id']}/card?format=html"
+    # Compile the card and load the leaderboard and the dedup index first
+    assert "Happy birthday" not in (await client.get(card_url)).text
+    assert (await client.get("/api/v1/leaderboards/greetings_sent")).json()["entries"] == []
+
+    batch = await client.post("/api/v1/batch", json={"transactional": True, "requests": [
+        {"method": "POST", "path": "/greetings/", "body": greeting(moment, "t-bob", "Happy birthday Alice, enjoy the day!")},
+        {"method": "GET", "path": "/users/teams-id/nope"},
+    ]})
+    assert batch.status_code == 200
+    assert batch.json()["committed"] is False
+    assert [r["status"] for r in batch.json()["results"]] == [200, 404]
+
+    assert "Happy birthday" not in (await client.get(card_url)).text
+    assert (await client.get("/api/v1/leaderboards/greetings_sent")).json()["entries"] == []
+
+    # Carol's greeting gets the id the rolled-back one had; it is counted and nothing duplicates it
+    created = await client.post("/api/v1/greetings/", json=greeting(moment, "t-carol", "Happy birthday Alice, enjoy the day!"))
+    assert created.status_code == 200
+    assert (await client.get(f"/api/v1/greetings/duplicates?moment_id={moment['id']}")).json()["totals"] == {}
+    entries = (await client.get("/api/v1/leaderboards/greetings_sent")).json()["entries"]
+    assert [(e["subject"], e["score"]) for e in entries] == [("t-carol", 1)]
+    assert "Carol" in (await client.get(card_url)).text
+
+
+async def test_committed_batch_updates_memory_after_commit(client, moment):
+    card_url = f"/api/v1/moments/{moment['id']}/card?format=html"
+    await client.get(card_url)
+    batch = await client.post("/api/v1/batch", json={"transactional": True, "requests": [
+        {"method": "POST", "path": "/greetings/", "body": greeting(moment, "t-bob", "Happy birthday!")},
+        {"method": "POST", "path": "/greetings/", "body": greeting(moment, "t-carol", "Many happy returns")},
+    ]})
+    assert batch.json()["committed"] is True
+    card = (await client.get(card_url)).text
+    assert "Happy birthday!" in card and "Many happy returns" in card
+    entries = (await client.get("/api/v1/leaderboards/greetings_sent")).json()["entries"]
+    assert sorted(e["subject"] for e in entries) == ["t-bob", "t-carol"]
@@ -0,0 +1,62 @@
+"""The query cache: hits while nothing changed, misses after any connection's commit"""
+import sqlite3
+import pytest
+from app.core.cache import cache_stats
+from app.core.database import DEFAULT_TENANT
+from app.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+
+
+def stats():
+    return cache_stats()[DEFAULT_TENANT]
+
+
+async def test_repeated_read_is_served_from_cache(sqlite_file):
+    await users.create({"teams_user_id": "t-alice", "name": "Alice", "email": "alice@example.com"})
+    await users.find_by_teams_user_id("t-alice")
+    hits = stats()["hits"]
+    assert (await users.find_by_teams_user_id("t-alice"))["name"] == "Alice"
+    assert stats()["hits"] == hits + 1
+
+
+async def test_write_through_the_app_invalidates(sqlite_file):
+    alice = await users.create({"teams_user_id": "t-alice", "name": "Alice", "email": "alice@example.com"})
+    await users.find_by_teams_user_id("t-alice")
+    await users.update(alice["id"], {"name": "Alicia"})
+    assert (await users.find_by_teams_user_id("t-alice"))["name"] == "Alicia"
+
+
+async def test_commit_by_another_process_invalidates(sqlite_file):
+    await users.create({"teams_user_id": "t-alice", "name": "Alice", "email": "alice@example.com"})
+    assert (await users.find_by_teams_user_id("t-alice"))["name"] == "Alice"
+
+    # Another worker process: its own connection, none of this process's caches
+    other = sqlite3.connect(sqlite_file)
+    try:
+        other.execute("UPDATE users SET name = 'Alicia' WHERE teams_user_id = 't-alice'")
+        other.commit()
+    finally:
+        other.close()
+
+    assert (await users.find_by_teams_user_id("t-alice"))["name"] == "Alicia"
+    assert await users.count() == 1
+
+
+async def test_unrelated_table_write_keeps_entries(sqlite_file):
+    alice = await users.create({"teams_user_id": "t-alice", "name": "Alice", "email": "alice@example.com"})
+    await users.find_by_teams_user_id("t-alice")
+    other = sqlite3.connect(sqlite_file)
+    try:
+        other.execute(
+            "INSERT INTO moments (person_name, moment_type, moment_date, created_by) "
+            "VALUES ('Alice', 'birthday', '2026-01-01', 't-alice')"
+        )
+        other.commit()
+    finally:
+        other.close()
+    hits = stats()["hits"]
+    assert (await users.find_by_teams_user_id("t-alice"))["id"] == alice["id"]
+    assert stats()["hits"] == hits + 1
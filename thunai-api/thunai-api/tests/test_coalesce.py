@@ -0,0 +1,60 @@
+"""Single-flight coalescing: identical concurrent calls run once and every caller gets its own copy"""
+import asyncio
+import pytest
+from app.core.coalesce import SingleFlight, coalesced
+from app.core.database import db_manager
+
+pytestmark = pytest.mark.anyio
+
+
+class Lookups:
+    def __init__(self):
+        self.runs = 0
+
+    @coalesced
+    async def find(self, name):
+        self.runs += 1
+        await asyncio.sleep(0.01)
+        return {"name": name, "tags": []}
+
+
+async def test_concurrent_identical_calls_run_once(database):
+    lookups = Lookups()
+    results = await asyncio.gather(*(lookups.find("alice") for _ in range(5)), lookups.find("bob"))
+    assert lookups.runs == 2
+    assert [r["name"] for r in results] == ["alice"] * 5 + ["bob"]
+
+    # Each caller got its own copy of the shared result
+    results[0]["tags"].append("edited")
+    assert results[1]["tags"] == []
+
+
+async def test_tenants_and_transactions_are_not_shared(database):
+    lookups = Lookups()
+    token = db_manager.set_current_tenant("acme")
+    try:
+        other_tenant = asyncio.ensure_future(lookups.find("alice"))
+    finally:
+        db_manager.reset_current_tenant(token)
+    await asyncio.gather(other_tenant, lookups.find("alice"))
+    assert lookups.runs == 2
+
+    async with db_manager.transaction():
+        await asyncio.gather(lookups.find("alice"), lookups.find("alice"))
+    assert lookups.runs == 4
+
+
+async def test_finished_results_are_reused_for_the_ttl(test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "coalesce_ttl_ms", 60_000)
+    flight = SingleFlight()
+    runs = []
+
+    async def load():
+        runs.append(1)
+        return ["row"]
+
+    first = await flight.do("load", "key", load)
+    first.append("edited")
+    assert await flight.do("load", "key", load) == ["row"]
+    assert len(runs) == 1
+    assert flight.stats()["methods"]["load"] == {"calls": 2, "executions": 1, "collapsed": 0, "ttl_hits": 1}
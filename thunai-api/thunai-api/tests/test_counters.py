@@ -0,0 +1,87 @@
+"""Maintained row counts agree with COUNT(*) through inserts, updates and deletes, and feed X-Total-Count"""
+import sqlite3
+import pytest
+from app.core.counters import COUNTED_COLUMNS, maintained_count
+from app.core.database import db_manager
+from app.core.pagination import TOTAL_COUNT_HEADER
+from app.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+
+
+async def assert_counts_match():
+    async with db_manager.get_connection() as conn:
+        for table, columns in COUNTED_COLUMNS.items():
+            exists = await conn.fetch_value("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            if not exists:
+                continue
+            assert await maintained_count(table) == await conn.fetch_value(f"SELECT COUNT(*) FROM {table}"), table
+            for column in columns:
+                rows = await conn.fetch_all(
+                    f"SELECT {column} AS value, COUNT(*) AS n FROM {table} WHERE {column} IS NOT NULL GROUP BY {column}"
+                )
+                for row in rows:
+                    assert await maintained_count(table, column, row["value"]) == row["n"], (table, column, row["value"])
+
+
+async def test_counts_follow_every_kind_of_write(sqlite_file):
+    await assert_counts_match()
+    writer = sqlite3.connect(sqlite_file)
+    try:
+        writer.executemany(
+            "INSERT INTO users (teams_user_id, name, email, is_admin) VALUES (?, ?, ?, ?)",
+            [(f"t-{i}", f"User {i}", f"u{i}@example.com", i % 3 == 0) for i in range(30)],
+        )
+        writer.executemany(
+            "INSERT INTO moments (person_name, moment_type, moment_date, created_by) VALUES (?, ?, ?, ?)",
+            [(f"User {i % 7}", ("birthday", "promotion", "lwd")[i % 3], f"2026-01-{i % 28 + 1:02d}", "t-0")
+             for i in range(60)],
+        )
+        writer.executemany(
+            "INSERT INTO greetings (moment_id, user_id, greeting_text, moment_type) VALUES (?, ?, 'Hi', 'birthday')",
+            [(i % 11 + 1, f"t-{i % 5}") for i in range(80)],
+        )
+        writer.commit()
+        await assert_counts_match()
+
+        writer.execute("UPDATE moments SET moment_type = 'promotion', is_active = FALSE WHERE id % 4 = 0")
+        writer.execute("UPDATE moments SET description = 'unchanged counts' WHERE id % 5 = 0")
+        writer.execute("UPDATE greetings SET moment_id = 1 WHERE id % 6 = 0")
+        writer.execute("UPDATE users SET is_admin = NOT is_admin WHERE id % 2 = 0")
+        writer.commit()
+        await assert_counts_match()
+
+        writer.execute("DELETE FROM greetings WHERE user_id = 't-3'")
+        writer.execute("DELETE FROM moments WHERE moment_type = 'lwd'")
+        writer.commit()
+        await assert_counts_match()
+    finally:
+        writer.close()
+
+
+async def test_rolled_back_writes_leave_counts_alone(sqlite_file):
+    async with db_manager.get_connection() as conn:
+        await conn.execute("INSERT INTO users (teams_user_id, name) VALUES ('t-a', 'A')")
+        await conn.rollback()
+    assert await maintained_count("users") == 0
+    await assert_counts_match()
+
+
+async def test_counts_on_every_backend(database):
+    for i, name in enumerate(("Alice", "Bob", "Carol")):
+        await users.create({"teams_user_id": f"t-{name.lower()}", "name": name, "email": None, "is_admin": i == 0})
+
+    assert await users.count() == 3
+    assert (await users.count_rows()).value == 3
+    assert (await users.count_by_admin_status(True)).value == 1
+    assert (await users.count_by_admin_status(False)).value == 2
+
+
+async def test_list_routes_send_the_total(client, add_user):
+    for name in ("Alice", "Bob", "Carol"):
+        await add_user(name)
+    response = await client.get("/api/v1/users/?limit=2")
+    assert len(response.json()) == 2
+    assert response.headers[TOTAL_COUNT_HEADER] == "3"
@@ -0,0 +1,52 @@
+"""Template mode: the schema and seed are built once, and every pool open gets an isolated clone"""
+import pytest
+from app.core.cache import close_caches
+from app.core.database import db_manager
+
+pytestmark = pytest.mark.anyio
+
+
+async def close_database():
+    await close_caches()
+    await db_manager.close_pool()
+
+
+async def user_names():
+    async with db_manager.get_connection() as connection:
+        return [row["name"] for row in await connection.fetch_all("SELECT name FROM users ORDER BY id")]
+
+
+async def test_template_is_built_once_and_cloned_per_open(test_settings, tmp_path, monkeypatch):
+    seed = tmp_path / "seed.sql"
+    seed.write_text("INSERT INTO users (teams_user_id, name, email) VALUES ('t-alice', 'Alice', 'alice@example.com');")
+    monkeypatch.setattr(test_settings, "database_mode", "template")
+    monkeypatch.setattr(test_settings, "database_seed_sql", str(seed))
+    builds = []
+    populate = db_manager._populate
+
+    async def counting_populate(connection):
+        builds.append(1)
+        await populate(connection)
+
+    monkeypatch.setattr(db_manager, "_populate", counting_populate)
+
+    await db_manager.create_pool()
+    try:
+        assert await user_names() == ["Alice"]
+        async with db_manager.get_connection() as connection:
+            await connection.execute(
+                "INSERT INTO users (teams_user_id, name, email) VALUES ('t-bob', 'Bob', 'bob@example.com')"
+            )
+            await connection.commit()
+        assert await user_names() == ["Alice", "Bob"]
+    finally:
+        await close_database()
+
+    # A fresh open is a fresh clone: Bob is gone, and the template was not rebuilt
+    await db_manager.create_pool()
+    try:
+        assert await user_names() == ["Alice"]
+    finally:
+        await close_database()
+    assert builds == [1]
+    assert (tmp_path / "templates" / "thunai_culture_template.db").exists()
@@ -0,0 +1,72 @@
+"""Negotiated response encodings: gzip, the columnar representation, Vary, and responses left alone"""
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from app.core.encoding import COLUMNAR_TYPE, ResponseEncodingMiddleware, to_columnar
+
+pytestmark = pytest.mark.anyio
+
+
+def vary(response):
+    return [value.strip() for value in response.headers.get("vary", "").split(",")]
+
+
+async def test_large_json_is_gzipped(client, add_user, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "compression_min_bytes", 64)
+    for name in ("Alice", "Bob", "Carol"):
+        await add_user(name)
+
+    response = await client.get("/api/v1/users/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in vary(response)
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert [user["name"] for user in response.json()] == ["Alice", "Bob", "Carol"]
+
+
+async def test_small_bodies_are_sent_as_is_but_still_vary(client, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "compression_min_bytes", 1_000_000)
+    response = await client.get("/api/v1/users/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in vary(response)
+
+
+async def test_columnar_sends_each_key_once(client, add_user):
+    await add_user("Alice")
+    await add_user("Bob")
+
+    response = await client.get("/api/v1/users/", headers={"Accept": COLUMNAR_TYPE, "Accept-Encoding": "identity"})
+    assert response.headers["content-type"] == COLUMNAR_TYPE
+    assert "Accept" in vary(response)
+    body = response.json()
+    plain = (await client.get("/api/v1/users/", headers={"Accept-Encoding": "identity"})).json()
+    assert body == to_columnar(plain)
+    assert [row[body["columns"].index("name")] for row in body["rows"]] == ["Alice", "Bob"]
+
+
+async def test_empty_and_streaming_responses_pass_through():
+    async def no_content(request):
+        return Response(status_code=204)
+
+    async def stream(request):
+        async def chunks():
+            yield b'[{"a": 1},'
+            yield b'{"a": 2}]'
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    app = ResponseEncodingMiddleware(Starlette(routes=[Route("/empty", no_content), Route("/stream", stream)]))
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Accept": COLUMNAR_TYPE, "Accept-Encoding": "gzip"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+        empty = await http.get("/empty", headers=headers)
+        assert empty.status_code == 204
+        assert empty.content == b""
+        assert "vary" not in empty.headers
+
+        streamed = await http.get("/stream", headers=headers)
+        assert "content-encoding" not in streamed.headers
+        assert streamed.headers["content-type"] == "application/json"
+        assert streamed.json() == [{"a": 1}, {"a": 2}]
+
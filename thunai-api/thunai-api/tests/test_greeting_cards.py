@@ -0,0 +1,87 @@
+"""Compiled greeting cards follow new, edited, deactivated and deleted greetings"""
+from datetime import date
+import pytest
+from app.core.database import db_manager
+from app.repositories.greeting_repository import GreetingRepository
+from app.repositories.moment_repository import MomentRepository
+from app.repositories.user_repository import UserRepository
+from app.services.greeting_card_service import greeting_cards
+
+pytestmark = pytest.mark.anyio
+
+greetings = GreetingRepository()
+
+
+async def execute(query, params=()):
+    async with db_manager.get_connection() as conn:
+        await conn.execute(query, params)
+        await conn.commit()
+
+
+async def card_text(moment_id):
+    card = await greeting_cards.get_card(moment_id)
+    return card.document("html").decode("utf-8"), card.etag("html")
+
+
+@pytest.fixture
+async def moment(database):
+    users = UserRepository()
+    for name in ("Alice", "Bob", "Carol"):
+        await users.create({"teams_user_id": f"t-{name.lower()}", "name": name, "email": f"{name.lower()}@example.com"})
+    return await MomentRepository().create({
+        "person_name": "Alice", "moment_type": "birthday", "moment_date": date.today(), "created_by": "t-bob",
+    })
+
+
+async def greet(moment, sender, text, is_active=True):
+    greeting = await greetings.create({
+        "moment_id": moment["id"], "user_id": sender, "greeting_text": text, "moment_type": "birthday",
+        "is_active": is_active,
+    })
+    await greeting_cards.on_greeting_created(greeting)
+    return greeting
+
+
+async def test_card_appends_and_skips_inactive(moment):
+    await greet(moment, "t-bob", "Happy birthday from Bob")
+    html, _ = await card_text(moment["id"])
+    assert "Happy birthday from Bob" in html and "1 greeting from the team" in html
+
+    await greet(moment, "t-carol", "Hidden draft", is_active=False)
+    await greet(moment, "t-carol", "Cheers from Carol")
+    html, _ = await card_text(moment["id"])
+    assert "Cheers from Carol" in html and "Hidden draft" not in html
+    assert "2 greetings from the team" in html
+
+
+async def test_card_reflects_edits_deactivation_and_deletes(moment):
+    bob = await greet(moment, "t-bob", "Happy birthday from Bob")
+    carol = await greet(moment, "t-carol", "Cheers from Carol")
+    _, etag = await card_text(moment["id"])
+
+    await execute("UPDATE greetings SET greeting_text = ? WHERE id = ?", ("Many happy returns", bob["id"]))
+    html, edited_etag = await card_text(moment["id"])
+    assert "Many happy returns" in html and "Happy birthday from Bob" not in html
+    assert edited_etag != etag
+
+    await execute("UPDATE greetings SET is_active = FALSE WHERE id = ?", (carol["id"],))
+    html, _ = await card_text(moment["id"])
+    assert "Cheers from Carol" not in html and "1 greeting from the team" in html
+
+    await execute("DELETE FROM greetings WHERE id = ?", (bob["id"],))
+    html, _ = await card_text(moment["id"])
+    assert "Many happy returns" not in html and "0 greetings from the team" in html
+
+
+async def test_card_is_kept_without_table_versions(moment, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "query_cache_enabled", False)
+    bob = await greet(moment, "t-bob", "Happy birthday from Bob")
+    card = await greeting_cards.get_card(moment["id"])
+
+    await greet(moment, "t-carol", "Cheers from Carol")
+    assert await greeting_cards.get_card(moment["id"]) is card
+    assert card.greeting_count == 2
+
+    await execute("UPDATE greetings SET greeting_text = ? WHERE id = ?", ("Many happy returns", bob["id"]))
+    html, _ = await card_text(moment["id"])
+    assert "Many happy returns" in html and "Happy birthday from Bob" not in html
@@ -0,0 +1,52 @@
+"""Near-duplicate greetings are kept for their sender and linked to the greeting they resemble"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def moment(add_user, add_moment):
+    for name in ("Alice", "Bob", "Carol", "Dave"):
+        await add_user(name)
+    return await add_moment("Alice", "t-dave")
+
+
+async def greet(client, moment, sender, text):
+    response = await client.post("/api/v1/greetings/", json={
+        "moment_id": moment["id"], "user_id": sender, "greeting_text": text, "moment_type": "birthday",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_collapse_keeps_the_callers_greeting(client, moment, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "greeting_dedup_mode", "collapse")
+    original = await greet(client, moment, "t-bob", "Happy birthday Alice, have a wonderful day!!")
+    echo = await greet(client, moment, "t-carol", "Happy birthday Alice, have a wonderful day!!!")
+
+    assert echo["id"] != original["id"]
+    assert echo["user_id"] == "t-carol"
+    assert echo["duplicate_of"] == original["id"]
+    stored = (await client.get(f"/api/v1/greetings/moment/{moment['id']}")).json()
+    assert {(g["id"], g["user_id"]) for g in stored} == {(original["id"], "t-bob"), (echo["id"], "t-carol")}
+
+    card = (await client.get(f"/api/v1/moments/{moment['id']}/card?format=html")).text
+    assert card.count("<li>") == 1
+    assert "Bob, Carol" in card and "2 greetings from the team" in card and "more greeting" not in card
+
+    report = (await client.get(f"/api/v1/greetings/duplicates?moment_id={moment['id']}")).json()
+    assert report["totals"] == {"collapsed": 1}
+    assert report["duplicates"][0]["greeting_id"] == echo["id"]
+
+
+async def test_flag_keeps_separate_entries(client, moment):
+    original = await greet(client, moment, "t-bob", "Happy birthday Alice, have a wonderful day!!")
+    echo = await greet(client, moment, "t-carol", "Happy birthday Alice, have a wonderful day!!!")
+    distinct = await greet(client, moment, "t-dave", "Enjoy the cake")
+
+    assert echo["duplicate_of"] is None and distinct["duplicate_of"] is None
+    card = (await client.get(f"/api/v1/moments/{moment['id']}/card?format=html")).text
+    assert card.count("<li>") == 3
+    report = (await client.get(f"/api/v1/greetings/duplicates?moment_id={moment['id']}")).json()
+    assert report["totals"] == {"flagged": 1}
+    assert report["duplicates"][0]["duplicate_of"] == original["id"]
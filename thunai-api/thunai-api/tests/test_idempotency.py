@@ -0,0 +1,52 @@
+"""Idempotency keys: which first responses a retry gets back, and which it runs again"""
+import httpx
+import pytest
+from app.core.idempotency import REPLAYED_HEADER
+from app.repositories.idempotency_repository import IdempotencyRepository
+from main import app
+
+pytestmark = pytest.mark.anyio
+
+keys = IdempotencyRepository()
+
+
+async def test_retry_gets_the_stored_response(client, add_user):
+    await add_user("Alice")
+    moment = {"person_name": "Alice", "moment_type": "birthday", "moment_date": "2026-05-01", "created_by": "t-alice"}
+    first = await client.post("/api/v1/moments/", json=moment, headers={"Idempotency-Key": "m-1"})
+    retry = await client.post("/api/v1/moments/", json=moment, headers={"Idempotency-Key": "m-1"})
+    assert retry.headers.get(REPLAYED_HEADER) == "true"
+    assert retry.json() == first.json()
+
+
+async def test_refused_request_is_run_again_on_retry(client, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "admin_auth_disabled", False)
+    monkeypatch.setattr(test_settings, "admin_api_key", "secret")
+    job = {"kind": "notification_digest", "params": {}}
+    refused = await client.post("/api/v1/jobs/", json=job, headers={"Idempotency-Key": "job-1"})
+    assert refused.status_code == 403
+    assert await keys.find("job-1") is None
+
+    accepted = await client.post("/api/v1/jobs/", json=job, headers={"Idempotency-Key": "job-1", "X-Admin-Key": "secret"})
+    assert accepted.status_code == 202
+    assert REPLAYED_HEADER not in accepted.headers
+
+
+async def test_unrouted_request_does_not_keep_its_key(client):
+    response = await client.post("/api/v1/nowhere", json={}, headers={"Idempotency-Key": "lost-1"})
+    assert response.status_code == 404
+    assert await keys.find("lost-1") is None
+
+
+async def test_request_shed_by_admission_control_never_claims_its_key(client, add_user, test_settings, monkeypatch):
+    await add_user("Alice")
+    monkeypatch.setattr(test_settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(test_settings, "rate_limit_write_burst", 1)
+    monkeypatch.setattr(test_settings, "rate_limit_write_per_second", 0.01)
+    moment = {"person_name": "Alice", "moment_type": "birthday", "moment_date": "2026-05-01", "created_by": "t-alice"}
+    transport = httpx.ASGITransport(app=app, client=("10.0.1.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+        assert (await http.post("/api/v1/moments/", json=moment, headers={"Idempotency-Key": "w-1"})).status_code == 200
+        shed = await http.post("/api/v1/moments/", json=moment, headers={"Idempotency-Key": "w-2"})
+    assert shed.status_code == 429
+    assert await keys.find("w-2") is None
@@ -0,0 +1,59 @@
+"""Pending-greeting inboxes: moments a user still has to greet, per user and for everyone at once"""
+from datetime import date
+import pytest
+from app.repositories.greeting_repository import GreetingRepository
+from app.repositories.moment_repository import MomentRepository
+from app.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+moments = MomentRepository()
+greetings = GreetingRepository()
+
+
+async def add_user(name: str):
+    teams_id = f"teams-{name.lower().replace(' ', '-')}"
+    return await users.create({"teams_user_id": teams_id, "name": name, "email": f"{teams_id}@example.com"})
+
+
+async def add_moment(person_name: str, moment_type: str, moment_date: date, created_by: str):
+    return await moments.create({
+        "person_name": person_name, "moment_type": moment_type, "moment_date": moment_date, "created_by": created_by,
+    })
+
+
+async def test_inbox_anti_join(database):
+    alice = await add_user("Alice Smith")
+    bob = await add_user("Bob Jones")
+    today = date.today()
+    birthday = await add_moment("Alice Smith", "birthday", today, bob["teams_user_id"])
+    promotion = await add_moment("Bob Jones", "promotion", today, alice["teams_user_id"])
+    await greetings.create({
+        "moment_id": promotion["id"], "user_id": alice["teams_user_id"], "greeting_text": "Congrats",
+        "moment_type": "promotion",
+    })
+
+    assert [m["id"] for m in await moments.find_inbox(bob["teams_user_id"], today, today)] == [birthday["id"]]
+    assert await moments.find_inbox(alice["teams_user_id"], today, today) == []
+    rows = await moments.find_inboxes(today, today)
+    assert [(r["inbox_teams_user_id"], r["id"]) for r in rows] == [(bob["teams_user_id"], birthday["id"])]
+
+
+async def test_inbox_routes(client, add_user, add_moment):
+    for name in ("Alice", "Bob", "Carol"):
+        await add_user(name)
+    moment = await add_moment("Alice", "t-carol")
+    greeted = await client.post("/api/v1/greetings/", json={
+        "moment_id": moment["id"], "user_id": "t-bob", "greeting_text": "Happy birthday", "moment_type": "birthday",
+    })
+    assert greeted.status_code == 200
+
+    assert (await client.get("/api/v1/users/t-bob/inbox")).json() == []
+    assert [m["id"] for m in (await client.get("/api/v1/users/t-carol/inbox")).json()] == [moment["id"]]
+    assert (await client.get("/api/v1/users/t-nobody/inbox")).status_code == 404
+
+    batch = (await client.get("/api/v1/users/inbox")).json()
+    assert [m["id"] for m in batch["moments"]] == [moment["id"]]
+    pending = {inbox["teams_user_id"]: inbox["moment_ids"] for inbox in batch["inboxes"]}
+    assert pending.get("t-carol") == [moment["id"]] and "t-bob" not in pending
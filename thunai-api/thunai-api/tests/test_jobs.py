@@ -0,0 +1,75 @@
+"""Background jobs: every tenant's queue gets drained, and imports report bad rows instead of failing"""
+import asyncio
+import pytest
+from app.core.database import db_manager
+from app.core.jobs import jobs, FINISHED_STATUSES
+
+pytestmark = pytest.mark.anyio
+
+
+async def wait_for(client, job_id):
+    for _ in range(200):
+        if (await client.get(f"/api/v1/jobs/{job_id}")).json()["status"] in FINISHED_STATUSES:
+            return (await client.get(f"/api/v1/jobs/{job_id}/result")).json()
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+async def test_import_reports_a_conflicting_row_as_an_error(client, add_user, monkeypatch):
+    from app.services import job_handlers
+    await add_user("Alice")
+
+    # Alice is created elsewhere between the import's lookup and its insert
+    async def not_found_yet(teams_user_id):
+        return None
+
+    monkeypatch.setattr(job_handlers.user_service, "get_by_teams_user_id", not_found_yet)
+    rows = [
+        {"teams_user_id": "t-bob", "name": "Bob", "email": "bob@example.com"},
+        {"teams_user_id": "t-alice", "name": "Alice Smith", "email": "alice@example.com"},
+    ]
+    submitted = await client.post("/api/v1/jobs/", json={"kind": "import_users", "params": {"users": rows}})
+    assert submitted.status_code == 202, submitted.text
+
+    job = await wait_for(client, submitted.json()["id"])
+    assert job["status"] == "succeeded", job
+    assert job["result"]["created"] == 1
+    [error] = job["result"]["errors"]
+    assert error["index"] == 1 and "users.teams_user_id" in error["error"]
+
+
+async def test_jobs_of_a_tenant_with_a_closed_pool_still_run(sqlite_file, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "multi_tenant_enabled", True)
+    monkeypatch.setattr(test_settings, "max_open_tenants", 1)
+    ran = []
+
+    async def record(context):
+        ran.append(db_manager.current_tenant())
+
+    monkeypatch.setitem(jobs._handlers, "record", record)
+    monkeypatch.setattr(jobs, "_pending", set())
+    for tenant_id in ("acme", "beta"):
+        await db_manager.provision_tenant(tenant_id)
+
+    token = db_manager.set_current_tenant("acme")
+    try:
+        job = await jobs.submit("record")
+    finally:
+        db_manager.reset_current_tenant(token)
+    # Opening another tenant evicts acme's pool before a worker gets to the job
+    token = db_manager.set_current_tenant("beta")
+    try:
+        async with db_manager.get_connection():
+            pass
+    finally:
+        db_manager.reset_current_tenant(token)
+    assert "acme" not in db_manager.open_tenants()
+
+    assert await jobs._run_one()
+    assert ran == ["acme"]
+    token = db_manager.set_current_tenant("acme")
+    try:
+        assert (await jobs.repository.find_by_id(job["id"]))["status"] == "succeeded"
+    finally:
+        db_manager.reset_current_tenant(token)
+    assert not await jobs._run_one()
@@ -0,0 +1,51 @@
+"""Leaderboards: greeting rankings, and boards whose source table this database lacks"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_board_without_its_source_table_is_empty(client):
+    for window in ("all", "7d"):
+        response = await client.get(f"/api/v1/leaderboards/accolades?window={window}")
+        assert response.status_code == 200, response.text
+        assert response.json() == {"metric": "accolades", "window": window, "entries": []}
+
+
+async def test_greetings_are_ranked_by_sender_and_celebrant(client, add_user, add_moment):
+    for name in ("Alice", "Bob", "Carol"):
+        await add_user(name)
+    moments = [await add_moment("Alice", "t-carol"), await add_moment("Bob", "t-carol", moment_type="promotion")]
+    for moment, sender in ((moments[0], "t-bob"), (moments[0], "t-carol"), (moments[1], "t-carol")):
+        response = await client.post("/api/v1/greetings/", json={
+            "moment_id": moment["id"], "user_id": sender, "greeting_text": f"Congrats from {sender}",
+            "moment_type": moment["moment_type"],
+        })
+        assert response.status_code == 200, response.text
+
+    sent = (await client.get("/api/v1/leaderboards/greetings_sent?window=7d")).json()["entries"]
+    assert [(e["subject"], e["name"], e["score"]) for e in sent] == [("t-carol", "Carol", 2), ("t-bob", "Bob", 1)]
+    received = (await client.get("/api/v1/leaderboards/greetings_received")).json()["entries"]
+    assert [(e["rank"], e["subject"], e["score"]) for e in received] == [(1, "Alice", 2), (2, "Bob", 1)]
+
+
+async def test_inactive_and_collapsed_greetings_do_not_count(client, add_user, add_moment, test_settings, monkeypatch):
+    from app.repositories.greeting_repository import GreetingRepository
+    monkeypatch.setattr(test_settings, "greeting_dedup_mode", "collapse")
+    for name in ("Alice", "Bob", "Carol", "Dave"):
+        await add_user(name)
+    moment = await add_moment("Alice", "t-carol")
+    text = "Happy birthday Alice, wishing you a wonderful year ahead!"
+    for sender in ("t-bob", "t-carol"):
+        response = await client.post("/api/v1/greetings/", json={
+            "moment_id": moment["id"], "user_id": sender, "greeting_text": text, "moment_type": "birthday",
+        })
+        assert response.status_code == 200, response.text
+    await GreetingRepository().create({
+        "moment_id": moment["id"], "user_id": "t-dave", "greeting_text": "Hidden", "moment_type": "birthday",
+        "is_active": False,
+    })
+
+    sent = (await client.get("/api/v1/leaderboards/greetings_sent")).json()["entries"]
+    assert [(e["subject"], e["score"]) for e in sent] == [("t-bob", 1)]
+    received = (await client.get("/api/v1/leaderboards/greetings_received")).json()["entries"]
+    assert [(e["subject"], e["score"]) for e in received] == [("Alice", 1)]
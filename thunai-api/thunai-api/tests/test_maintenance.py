@@ -0,0 +1,44 @@
+"""Database maintenance: every task is recorded, and tasks stop once the run's time budget is spent"""
+import asyncio
+from datetime import datetime
+import pytest
+from app.services.maintenance_service import MAINTENANCE_TASKS, maintenance
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_run_within_budget_records_every_task(sqlite_file):
+    result = await maintenance.run(force=True)
+    assert [task["task"] for task in result["tasks"]] == list(MAINTENANCE_TASKS)
+    statuses = {task["task"]: task["status"] for task in result["tasks"]}
+    assert statuses["analyze"] == statuses["optimize"] == "ok"
+    assert "error" not in statuses.values()
+
+    recent = (await maintenance.status())["recent"]
+    assert {row["task"] for row in recent if row["run_id"] == result["run_id"]} == set(MAINTENANCE_TASKS)
+
+
+async def test_tasks_after_the_budget_are_skipped(sqlite_file, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "maintenance_time_budget_ms", 20)
+    analyze = maintenance.repository.analyze
+
+    async def slow_analyze(limit):
+        await asyncio.sleep(0.05)
+        await analyze(limit)
+
+    monkeypatch.setattr(maintenance.repository, "analyze", slow_analyze)
+
+    result = await maintenance.run(force=True)
+    tasks = {task["task"]: task for task in result["tasks"]}
+    assert tasks["analyze"]["status"] == "ok"
+    for name in MAINTENANCE_TASKS[1:]:
+        assert tasks[name]["status"] == "skipped"
+        assert tasks[name]["detail"] == "time budget exhausted"
+
+
+async def test_window_can_cross_midnight(test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "maintenance_window_start", "23:00")
+    monkeypatch.setattr(test_settings, "maintenance_window_end", "02:00")
+    assert maintenance.window_start(datetime(2025, 3, 2, 1, 30)) == datetime(2025, 3, 1, 23, 0)
+    assert maintenance.window_start(datetime(2025, 3, 2, 23, 30)) == datetime(2025, 3, 2, 23, 0)
+    assert maintenance.window_start(datetime(2025, 3, 2, 12, 0)) is None
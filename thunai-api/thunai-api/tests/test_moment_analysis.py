@@ -0,0 +1,74 @@
+"""Moment analysis: which known users a message names, and when that decides the celebrant"""
+import pytest
+from app.services.user_name_service import user_names
+
+pytestmark = pytest.mark.anyio
+
+
+async def parse(client, text):
+    response = await client.post("/api/v1/moment-analysis/parse", json={"text": text})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+async def team(add_user):
+    for name in ("Priya Sharma", "Ravi Kumar", "Anna User", "Ben User", "5th"):
+        await add_user(name)
+
+
+async def test_lone_names_match_only_when_capitalized(client, team):
+    result = await parse(client, "Our new user joins on the 5th, say hi")
+    assert result["extracted_info"]["matched_users"] == []
+    assert result["extracted_info"]["celebrant_user_id"] is None
+
+    result = await parse(client, "Say hi to Anna User and thank our User team")
+    [full, ambiguous] = result["extracted_info"]["matched_users"]
+    assert full["matched_text"] == "Anna User" and full["full_name"] and not full["ambiguous"]
+    assert ambiguous["matched_text"] == "User" and ambiguous["ambiguous"]
+
+
+async def test_full_name_in_any_case_names_the_celebrant(client, team):
+    result = await parse(client, "happy birthday to priya sharma!")
+    assert result["celebrant_name"] == "Priya Sharma"
+    assert result["extracted_info"]["celebrant_teams_user_id"] == "t-priyasharma"
+
+
+async def test_lone_name_does_not_override_the_pattern_guess(client, team):
+    result = await parse(client, "Meera is celebrating with Ravi today")
+    assert result["celebrant_name"] == "Meera"
+    assert result["extracted_info"]["celebrant_user_id"] is None
+
+    result = await parse(client, "Ravi has a birthday today")
+    assert result["celebrant_name"] == "Ravi"
+    assert result["extracted_info"]["celebrant_teams_user_id"] == "t-ravikumar"
+
+
+async def test_own_writes_keep_the_index_and_foreign_writes_reload_it(client, team, add_user):
+    await parse(client, "Priya Sharma")
+    await add_user("Omar Farouk")
+    assert [m["matched_text"] for m in await user_names.find_users("Omar Farouk")] == ["Omar Farouk"]
+
+    # Someone else's write lands between our read of the version and our own write
+    users_version = await user_names.users_version()
+    assert users_version is not None
+    await user_names.repository.create({"teams_user_id": "t-lena", "name": "Lena Park", "email": "lena@example.com"})
+    stale = await user_names.repository.create({"teams_user_id": "t-kai", "name": "Kai Ito", "email": "kai@example.com"})
+    await user_names.on_user_saved(stale, users_version)
+    assert [m["matched_text"] for m in await user_names.find_users("Lena Park")] == ["Lena Park"]
+
+
+async def test_index_without_table_versions_catches_up_and_reloads(client, team, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "query_cache_enabled", False)
+    assert await user_names.users_version() is None
+    assert [m["matched_text"] for m in await user_names.find_users("Priya Sharma")] == ["Priya Sharma"]
+
+    # Written behind the index's back, as another worker would
+    created = await user_names.repository.create({"teams_user_id": "t-lena", "name": "Lena Park", "email": "lena@example.com"})
+    assert [m["matched_text"] for m in await user_names.find_users("Lena Park")] == ["Lena Park"]
+
+    await user_names.repository.update(created["id"], {"name": "Lena Ito"})
+    # The lone first name still matches; the new full name waits for the reload
+    assert [m["matched_text"] for m in await user_names.find_users("Lena Ito")] == ["Lena"]
+    monkeypatch.setattr(test_settings, "user_name_index_reload_s", 0)
+    assert [m["matched_text"] for m in await user_names.find_users("Lena Ito")] == ["Lena Ito"]
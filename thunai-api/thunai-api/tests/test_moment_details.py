@@ -0,0 +1,63 @@
+"""Composite moment detail: moment, celebrant, greeting count and first greetings page in one call"""
+import pytest
+from app.repositories.moment_repository import MomentRepository
+
+pytestmark = pytest.mark.anyio
+
+
+async def greet(client, moment, teams_user_id, text):
+    response = await client.post("/api/v1/greetings/", json={
+        "moment_id": moment["id"], "user_id": teams_user_id, "greeting_text": text, "moment_type": moment["moment_type"],
+    })
+    assert response.status_code == 200, response.text
+
+
+async def test_detail_returns_celebrant_count_and_first_page(client, add_user, add_moment):
+    await add_user("Alice")
+    await add_user("Bob")
+    await add_user("Carol")
+    moment = await add_moment("Alice", "t-bob")
+    await greet(client, moment, "t-bob", "Happy birthday Alice!")
+    await greet(client, moment, "t-carol", "Have a wonderful year ahead, from Carol")
+
+    response = await client.get(f"/api/v1/moments/{moment['id']}/detail?greetings_limit=1")
+    assert response.status_code == 200, response.text
+    detail = response.json()
+    assert detail["moment"]["id"] == moment["id"]
+    assert detail["celebrant"]["teams_user_id"] == "t-alice"
+    assert detail["greeting_count"] == 2
+    assert [g["greeting_text"] for g in detail["greetings"]] == ["Happy birthday Alice!"]
+
+    assert (await client.get("/api/v1/moments/999/detail")).status_code == 404
+
+
+async def test_details_keep_the_order_of_ids_and_skip_unknown_ones(client, add_user, add_moment):
+    await add_user("Alice")
+    await add_user("Bob")
+    first = await add_moment("Alice", "t-bob")
+    second = await add_moment("Bob", "t-alice", moment_type="work_anniversary")
+
+    response = await client.get(f"/api/v1/moments/details?ids={second['id']},999,{first['id']}")
+    assert response.status_code == 200, response.text
+    details = response.json()
+    assert [d["moment"]["id"] for d in details] == [second["id"], first["id"]]
+    assert [d["celebrant"]["name"] for d in details] == ["Bob", "Alice"]
+    assert [d["greeting_count"] for d in details] == [0, 0]
+
+    assert (await client.get("/api/v1/moments/details?ids=1,x")).status_code == 400
+
+
+async def test_callers_get_their_own_copy_of_cached_details(client, add_user, add_moment):
+    await add_user("Alice")
+    await add_user("Bob")
+    moment = await add_moment("Alice", "t-bob")
+    await greet(client, moment, "t-bob", "Happy birthday Alice!")
+
+    repository = MomentRepository()
+    details = await repository.find_details([moment["id"]])
+    details[0]["moment"]["person_name"] = "Mallory"
+    details[0]["greetings"].clear()
+
+    again = await repository.find_details([moment["id"]])
+    assert again[0]["moment"]["person_name"] == "Alice"
+    assert len(again[0]["greetings"]) == 1
@@ -0,0 +1,64 @@
+"""Moment search: composable filters in one query, on every backend and through GET /moments"""
+from datetime import date, timedelta
+import pytest
+from app.repositories.base import Filters
+from app.repositories.moment_repository import MomentRepository
+from app.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+moments = MomentRepository()
+
+
+def day(value) -> str:
+    return str(value)[:10]
+
+
+async def add_user(name: str):
+    teams_id = f"teams-{name.lower().replace(' ', '-')}"
+    return await users.create({"teams_user_id": teams_id, "name": name, "email": f"{teams_id}@example.com"})
+
+
+async def add_moment(person_name: str, moment_type: str, moment_date: date, created_by: str):
+    return await moments.create({
+        "person_name": person_name, "moment_type": moment_type, "moment_date": moment_date, "created_by": created_by,
+    })
+
+
+async def test_moment_search_filters(database):
+    alice = await add_user("Alice Smith")
+    await add_user("Bob Jones")
+    start = date(2026, 1, 1)
+    for offset, (person, moment_type) in enumerate([
+        ("Alice Smith", "birthday"), ("Bob Jones", "birthday"), ("Bob Jones", "promotion"), ("Alice Smith", "lwd"),
+    ]):
+        await add_moment(person, moment_type, start + timedelta(days=offset), alice["teams_user_id"])
+
+    filters = Filters().equals("moment_type", "birthday").between("moment_date", start, start + timedelta(days=1))
+    found = await moments.search(filters, descending=False)
+    assert [(m["person_name"], day(m["moment_date"])) for m in found] == [
+        ("Alice Smith", "2026-01-01"), ("Bob Jones", "2026-01-02"),
+    ]
+    assert (await moments.count_search(filters)).value == 2
+
+    everyone = await moments.search(Filters().any_of("moment_type", ["promotion", "lwd"]))
+    assert [m["moment_type"] for m in everyone] == ["lwd", "promotion"]
+    assert await moments.search(Filters().any_of("moment_type", [])) == []
+    assert (await moments.count_search(Filters().equals("person_name", "Bob Jones"))).value == 2
+
+
+async def test_search_route_combines_filters(client, add_user, add_moment):
+    for name in ("Alice", "Bob"):
+        await add_user(name)
+    start = date(2026, 1, 1)
+    for offset, (person, moment_type) in enumerate([("Alice", "birthday"), ("Bob", "birthday"), ("Bob", "lwd")]):
+        await add_moment(person, "t-alice", moment_type=moment_type, moment_date=start + timedelta(days=offset))
+
+    response = await client.get("/api/v1/moments/?category=celebration&from=2026-01-01&order=asc")
+    assert [(m["person_name"], m["moment_date"]) for m in response.json()] == [
+        ("Alice", "2026-01-01"), ("Bob", "2026-01-02"),
+    ]
+    assert response.headers["X-Total-Count"] == "2"
+    assert [m["moment_type"] for m in (await client.get("/api/v1/moments/?person=Bob")).json()] == ["lwd", "birthday"]
+    assert (await client.get("/api/v1/moments/?from=2026-02-01&to=2026-01-01")).status_code == 400
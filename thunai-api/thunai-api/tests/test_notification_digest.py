@@ -0,0 +1,66 @@
+"""Today's notifications: built once from the moments/users join, then patched by moment writes"""
+from datetime import datetime, timedelta
+import pytest
+from app.core.scheduler import local_now
+from app.repositories import moment_repository
+from app.services.notification_digest_service import notification_digest
+
+pytestmark = pytest.mark.anyio
+
+
+async def todays_ids(client):
+    response = await client.get("/api/v1/moments/notifications/today")
+    assert response.status_code == 200, response.text
+    return [entry["id"] for entry in response.json()]
+
+
+async def test_today_lists_due_moments_with_their_celebrant(client, add_user, add_moment):
+    await add_user("Alice")
+    await add_user("Bob")
+    today = local_now().date()
+    due = await add_moment("Alice", "t-bob", moment_date=today)
+    await add_moment("Bob", "t-alice", moment_date=today + timedelta(days=1))
+
+    response = await client.get("/api/v1/moments/notifications/today")
+    assert response.status_code == 200, response.text
+    [entry] = response.json()
+    assert entry["id"] == due["id"]
+    assert entry["celebrant_name"] == "Alice"
+    assert entry["celebrant_teams_id"] == "t-alice"
+    assert entry["category"] == "celebration"
+
+    # The nightly rebuild comes to the same answer
+    assert await notification_digest.build() == 1
+
+
+async def test_moment_writes_patch_todays_digest(client, add_user, add_moment):
+    await add_user("Alice")
+    await add_user("Bob")
+    today = local_now().date()
+    first = await add_moment("Alice", "t-bob", moment_date=today)
+    later = await add_moment("Bob", "t-alice", moment_date=today + timedelta(days=3))
+    assert await todays_ids(client) == [first["id"]]
+
+    # Created today after the build, moved onto today, and sent: each refreshes one entry
+    second = await add_moment("Bob", "t-alice", moment_type="work_anniversary", moment_date=today)
+    moved = await client.put(f"/api/v1/moments/{later['id']}", json={"moment_date": today.isoformat()})
+    assert moved.status_code == 200, moved.text
+    sent = await client.put(f"/api/v1/moments/{first['id']}", json={"notification_sent": True})
+    assert sent.status_code == 200, sent.text
+
+    assert sorted(await todays_ids(client)) == sorted([second["id"], later["id"]])
+    assert await notification_digest.build() == 2
+
+
+async def test_upcoming_counts_from_the_configured_timezone(client, add_user, add_moment, monkeypatch):
+    await add_user("Alice")
+    await add_user("Bob")
+    local_today = local_now().date() + timedelta(days=30)
+    # Local time runs a month ahead of the host clock
+    monkeypatch.setattr(moment_repository, "local_now", lambda: datetime.combine(local_today, datetime.min.time()))
+    soon = await add_moment("Alice", "t-bob", moment_date=local_today + timedelta(days=2))
+    await add_moment("Bob", "t-alice", moment_date=local_now().date())
+
+    response = await client.get("/api/v1/moments/upcoming/7")
+    assert response.status_code == 200, response.text
+    assert [moment["id"] for moment in response.json()] == [soon["id"]]
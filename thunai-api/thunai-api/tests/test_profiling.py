@@ -0,0 +1,53 @@
+"""Request profiling: ?profile=1 names the profile in X-Profile-Id and its collapsed stacks are served"""
+import asyncio
+import pytest
+from app.core.profiling import PROFILE_ID_HEADER
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_profiled_request_serves_its_collapsed_stacks(client, add_user, test_settings, monkeypatch):
+    from app.routers import users
+    monkeypatch.setattr(test_settings, "profile_interval_ms", 1.0)
+    await add_user("Alice")
+    get_all = users.user_service.get_all
+
+    async def slow_get_all(*args):
+        # Long enough for the sampler to catch the request waiting
+        await asyncio.sleep(0.05)
+        return await get_all(*args)
+
+    monkeypatch.setattr(users.user_service, "get_all", slow_get_all)
+
+    response = await client.get("/api/v1/users/?profile=1")
+    assert response.status_code == 200, response.text
+    assert [user["name"] for user in response.json()] == ["Alice"]
+    profile_id = response.headers[PROFILE_ID_HEADER]
+
+    listed = (await client.get("/api/v1/admin/profiles")).json()
+    summary = next(profile for profile in listed if profile["id"] == profile_id)
+    assert summary["path"] == "/api/v1/users/"
+    assert summary["status_code"] == 200
+    assert summary["samples"] > 0
+
+    collapsed = await client.get(f"/api/v1/admin/profiles/{profile_id}?format=collapsed")
+    assert collapsed.status_code == 200
+    lines = collapsed.text.splitlines()
+    assert lines
+    for line in lines:
+        frames, weight = line.rsplit(" ", 1)
+        assert frames and int(weight) > 0
+    assert any("slow_get_all" in line for line in lines)
+
+    assert (await client.get("/api/v1/admin/profiles/no-such-profile")).status_code == 404
+
+
+async def test_profiling_needs_an_admin_key(client, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "admin_api_key", "secret")
+    response = await client.get("/api/v1/users/?profile=1")
+    assert response.status_code == 403
+    assert PROFILE_ID_HEADER not in response.headers
+
+    response = await client.get("/api/v1/users/?profile=1", headers={"X-Admin-Key": "secret"})
+    assert response.status_code == 200
+    assert PROFILE_ID_HEADER in response.headers
@@ -0,0 +1,27 @@
+"""Column projection: `fields=` narrows both the SELECT and the JSON"""
+import pytest
+from app.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+
+
+async def test_projection_selects_only_requested_columns(database):
+    alice = await users.create({"teams_user_id": "t-alice", "name": "Alice Smith", "email": "alice@example.com"})
+    row = await users.find_by_id(alice["id"], fields=["id", "name"])
+    assert set(row) == {"id", "name"}
+
+
+async def test_routes_return_only_requested_fields(client, add_user):
+    alice = await add_user("Alice")
+    listed = await client.get("/api/v1/users/?fields=name")
+    assert listed.json() == [{"id": alice["id"], "name": "Alice"}]
+    detail = await client.get(f"/api/v1/users/{alice['id']}?fields=email,name")
+    assert detail.json() == {"id": alice["id"], "email": "alice@example.com", "name": "Alice"}
+
+
+async def test_unknown_field_is_rejected(client):
+    response = await client.get("/api/v1/users/?fields=name,password")
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
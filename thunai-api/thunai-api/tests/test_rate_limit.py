@@ -0,0 +1,77 @@
+"""Admission control: who a token bucket belongs to, and what a batch costs"""
+import itertools
+import httpx
+import pytest
+from main import app
+
+pytestmark = pytest.mark.anyio
+
+# Buckets live as long as the app, so every test is a different peer
+_peers = (f"10.0.0.{n}" for n in itertools.count(1))
+
+
+@pytest.fixture
+def limits(test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(test_settings, "rate_limit_read_burst", 3)
+    monkeypatch.setattr(test_settings, "rate_limit_read_per_second", 0.01)
+    monkeypatch.setattr(test_settings, "rate_limit_write_burst", 10)
+    monkeypatch.setattr(test_settings, "rate_limit_write_per_second", 0.01)
+    return test_settings
+
+
+def peer_client(peer: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(peer, 50000))
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+
+async def test_client_header_from_untrusted_peer_is_ignored(client, limits):
+    async with peer_client(next(_peers)) as http:
+        statuses = [
+            (await http.get("/api/v1/users/", headers={"X-Client-ID": f"rotating-{i}"})).status_code
+            for i in range(4)
+        ]
+    assert statuses == [200, 200, 200, 429]
+
+
+async def test_client_header_from_trusted_proxy_keys_the_bucket(client, limits, monkeypatch):
+    proxy = next(_peers)
+    monkeypatch.setattr(limits, "rate_limit_trusted_proxies", [proxy])
+    async with peer_client(proxy) as http:
+        first = [(await http.get("/api/v1/users/", headers={"X-Client-ID": "bot-a"})).status_code for _ in range(4)]
+        other = (await http.get("/api/v1/users/", headers={"X-Client-ID": "bot-b"})).status_code
+    assert first == [200, 200, 200, 429]
+    assert other == 200
+
+
+async def test_batch_pays_one_token_per_call(client, limits):
+    reads = {"requests": [{"path": "/users/"} for _ in range(3)]}
+    async with peer_client(next(_peers)) as http:
+        batch = await http.post("/api/v1/batch", json=reads)
+        after = await http.get("/api/v1/users/")
+    assert batch.status_code == 200
+    assert after.status_code == 429
+
+
+async def test_batch_larger_than_the_burst_leaves_the_bucket_in_debt(client, limits):
+    reads = {"requests": [{"path": "/users/"} for _ in range(8)]}
+    async with peer_client(next(_peers)) as http:
+        first = await http.post("/api/v1/batch", json=reads)
+        second = await http.post("/api/v1/batch", json={"requests": [{"path": "/users/"}]})
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) > 1
+
+
+async def test_read_only_batch_leaves_the_write_bucket_alone(client, limits, monkeypatch):
+    monkeypatch.setattr(limits, "rate_limit_write_burst", 1)
+    async with peer_client(next(_peers)) as http:
+        reads = [(await http.post("/api/v1/batch", json={"requests": [{"path": "/users/"}]})).status_code for _ in range(2)]
+        write = await http.post("/api/v1/batch", json={"requests": [
+            {"method": "POST", "path": "/users/", "body": {"teams_user_id": "t-x", "name": "X", "email": "x@example.com"}},
+        ]})
+        again = await http.post("/api/v1/users/", json={"teams_user_id": "t-y", "name": "Y", "email": "y@example.com"})
+    assert reads == [200, 200]
+    assert write.status_code == 200
+    assert write.json()["results"][0]["status"] == 201
+    assert again.status_code == 429
@@ -0,0 +1,116 @@
+"""The repository contract, run unchanged against every storage backend"""
+from datetime import date, timedelta
+import pytest
+from app.core.database import db_manager
+from app.repositories.greeting_repository import GreetingRepository
+from app.repositories.moment_repository import MomentRepository
+from app.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.anyio
+
+users = UserRepository()
+moments = MomentRepository()
+greetings = GreetingRepository()
+
+
+def day(value) -> str:
+    return str(value)[:10]
+
+
+async def add_user(name: str, is_admin: bool = False):
+    teams_id = f"teams-{name.lower().replace(' ', '-')}"
+    return await users.create({
+        "teams_user_id": teams_id, "name": name, "email": f"{teams_id}@example.com", "is_admin": is_admin,
+    })
+
+
+async def add_moment(person_name: str, moment_type: str, moment_date: date, created_by: str):
+    return await moments.create({
+        "person_name": person_name, "moment_type": moment_type, "moment_date": moment_date,
+        "description": f"{person_name} {moment_type}", "created_by": created_by,
+    })
+
+
+async def test_user_create_find_update(database):
+    alice = await add_user("Alice Smith", is_admin=True)
+    await add_user("Bob Jones")
+
+    assert alice["id"] and alice["name"] == "Alice Smith"
+    assert (await users.find_by_teams_user_id("teams-alice-smith"))["id"] == alice["id"]
+    assert (await users.find_by_email("teams-bob-jones@example.com"))["name"] == "Bob Jones"
+    # Name search is case-insensitive on both backends
+    assert (await users.find_by_name("alice"))["id"] == alice["id"]
+    assert [u["name"] for u in await users.find_by_admin_status(True)] == ["Alice Smith"]
+
+    updated = await users.update(alice["id"], {"name": "Alice Brown", "email": None})
+    assert updated["name"] == "Alice Brown"
+    assert updated["email"] == "teams-alice-smith@example.com"
+    assert await users.find_by_id(10_000) is None
+
+
+async def test_moment_requires_existing_celebrant(database):
+    alice = await add_user("Alice Smith")
+    with pytest.raises(ValueError):
+        await add_moment("Nobody", "birthday", date.today(), alice["teams_user_id"])
+
+
+async def test_moment_queries(database):
+    alice = await add_user("Alice Smith")
+    bob = await add_user("Bob Jones")
+    today = date.today()
+    birthday = await add_moment("Alice Smith", "birthday", today + timedelta(days=2), bob["teams_user_id"])
+    await add_moment("Bob Jones", "new_hire", today + timedelta(days=20), alice["teams_user_id"])
+    farewell = await add_moment("Bob Jones", "lwd", today - timedelta(days=5), alice["teams_user_id"])
+    await moments.update(farewell["id"], {"is_active": False})
+
+    assert [m["id"] for m in await moments.find_upcoming(7)] == [birthday["id"]]
+    assert [m["moment_type"] for m in await moments.find_by_type("birthday")] == ["birthday"]
+    assert [m["id"] for m in await moments.find_by_status("inactive")] == [farewell["id"]]
+    assert [m["moment_type"] for m in await moments.find_by_category("welcome")] == ["new_hire"]
+    in_range = await moments.find_by_date_range(today - timedelta(days=10), today + timedelta(days=10))
+    assert [day(m["moment_date"]) for m in in_range] == [day(today - timedelta(days=5)), day(today + timedelta(days=2))]
+    assert [m["person_name"] for m in await moments.find_by_user_id(bob["id"])] == ["Bob Jones", "Bob Jones"]
+    assert (await moments.count_by_user_id(bob["id"])).value == 2
+    assert (await moments.count_by_type("lwd")).value == 1
+    assert (await moments.count_by_status("active")).value == 2
+
+
+async def test_greetings(database):
+    alice = await add_user("Alice Smith")
+    bob = await add_user("Bob Jones")
+    moment = await add_moment("Alice Smith", "birthday", date.today(), bob["teams_user_id"])
+
+    first = await greetings.create({
+        "moment_id": moment["id"], "user_id": bob["teams_user_id"], "greeting_text": "Happy birthday!",
+        "moment_type": "birthday",
+    })
+    assert first["greeting_text"] == "Happy birthday!"
+    assert await greetings.check_existing_greeting(moment["id"], bob["teams_user_id"])
+    assert not await greetings.check_existing_greeting(moment["id"], alice["teams_user_id"])
+
+    await greetings.create({
+        "moment_id": moment["id"], "user_id": alice["teams_user_id"], "greeting_text": "Thanks all",
+        "moment_type": "birthday",
+    })
+    assert [g["greeting_text"] for g in await greetings.find_by_moment_id(moment["id"])] == [
+        "Happy birthday!", "Thanks all",
+    ]
+    assert [g["id"] for g in await greetings.find_by_user_id(bob["teams_user_id"])] == [first["id"]]
+    assert (await greetings.count_by_moment_id(moment["id"])).value == 2
+    assert await greetings.count_greetings_for_moment(moment["id"]) == 2
+    card = await greetings.find_for_card(moment["id"], after_id=first["id"])
+    assert [(g["greeting_text"], g["sender_name"]) for g in card] == [("Thanks all", "Alice Smith")]
+
+
+async def test_transaction_commits_once_and_rolls_back(database):
+    async with db_manager.transaction():
+        await add_user("Alice Smith")
+        await add_user("Bob Jones")
+    assert await users.count() == 2
+
+    with pytest.raises(RuntimeError):
+        async with db_manager.transaction():
+            await add_user("Carol White")
+            raise RuntimeError("abort")
+    assert await users.find_by_name("Carol") is None
+    assert await users.count() == 2
@@ -0,0 +1,74 @@
+"""Multi-tenant routing: the tenant header picks the database, new tenants are provisioned on demand and idle ones evicted"""
+import asyncio
+import pytest
+from app.core import cache
+from app.core.database import db_manager
+
+pytestmark = pytest.mark.anyio
+
+
+def tenant(tenant_id: str):
+    return {"X-Tenant-ID": tenant_id}
+
+
+async def test_requests_are_routed_to_their_tenant(client, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "multi_tenant_enabled", True)
+    monkeypatch.setattr(test_settings, "tenant_auto_provision", True)
+
+    response = await client.post("/api/v1/users/", headers=tenant("acme"), json={
+        "teams_user_id": "t-priya", "name": "Priya", "email": "priya@example.com",
+    })
+    assert response.status_code == 201, response.text
+
+    names = lambda response: [user["name"] for user in response.json()]
+    assert names(await client.get("/api/v1/users/", headers=tenant("acme"))) == ["Priya"]
+    assert names(await client.get("/api/v1/users/", headers=tenant("beta"))) == []
+    # No header: the default database, which never saw the user
+    assert names(await client.get("/api/v1/users/")) == []
+    assert {"acme", "beta"} <= set(db_manager.open_tenants())
+
+
+async def test_unknown_and_invalid_tenants_are_refused(client, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "multi_tenant_enabled", True)
+    monkeypatch.setattr(test_settings, "tenant_auto_provision", False)
+
+    assert (await client.get("/api/v1/users/", headers=tenant("acme"))).status_code == 404
+    assert (await client.get("/api/v1/users/", headers=tenant("no/such"))).status_code == 400
+
+    assert (await client.post("/api/v1/admin/tenants/acme")).status_code == 201
+    assert (await client.get("/api/v1/users/", headers=tenant("acme"))).status_code == 200
+
+
+async def test_concurrent_first_requests_share_one_initialized_pool(sqlite_file, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "multi_tenant_enabled", True)
+    monkeypatch.setattr(test_settings, "tenant_auto_provision", True)
+
+    opens = db_manager.metrics_for("acme").pool_opens
+    pools = await asyncio.gather(*(db_manager._get_pool("acme") for _ in range(5)))
+    assert all(pool is pools[0] for pool in pools)
+    assert db_manager.metrics_for("acme").pool_opens == opens + 1
+    async with pools[0].connection() as connection:
+        # The schema upgrades ran before anyone got the pool
+        assert await connection.fetch_value("SELECT name FROM sqlite_master WHERE name = 'table_versions'")
+
+
+async def test_evicting_a_tenant_releases_its_state(sqlite_file, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "multi_tenant_enabled", True)
+    monkeypatch.setattr(test_settings, "tenant_auto_provision", True)
+    monkeypatch.setattr(test_settings, "max_open_tenants", 1)
+
+    evictions = db_manager.metrics_for("acme").evictions
+    token = db_manager.set_current_tenant("acme")
+    try:
+        assert await cache.current_table_versions() is not None
+    finally:
+        db_manager.reset_current_tenant(token)
+    tracker = cache._caches.get("acme").tracker
+    assert tracker._connection is not None
+
+    # Opening a second tenant pushes acme out
+    await db_manager._get_pool("beta")
+    assert "acme" not in db_manager.open_tenants()
+    assert db_manager.metrics_for("acme").evictions == evictions + 1
+    assert "acme" not in dict(cache._caches.items())
+    assert tracker._connection is None